@@ -1,2 +1,3 @@
 from . import games
+from . import nodes
 from . import users
@@ -2,6 +2,7 @@ from flask import Flask
 from .config import *
 from gamedb.mongo import MongoUserRepository, MongoGameRepository
 from pymongo import MongoClient
+from .game_directory import GameDirectory
 
 MONGO_URL = MONGO_URL
 
@@ -10,3 +11,6 @@ app = Flask(__name__)
 mongo_client = MongoClient(MONGO_URL)
 user_repository = MongoUserRepository(mongo_client)
 game_repository = MongoGameRepository(mongo_client)
+# Games are placed on the server in GAME_SERVER_* while no game server reports its load
+game_directory = GameDirectory(mongo_client, GAME_SERVER_HEARTBEAT_TTL, GAME_CODE_TTL, GAME_DIRECTORY_CACHE_TTL,
+                               f"{GAME_SERVER_WS_SCHEME}://{GAME_SERVER_HOST}:{GAME_SERVER_WS_PORT}")
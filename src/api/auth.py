@@ -1,3 +1,4 @@
+import hmac
 from functools import wraps
 
 from flask import request, g, Response
@@ -5,6 +6,7 @@ from gameauth import is_valid_password
 from gamedb import NoSuchUserError
 
 from .app import user_repository
+from .config import GAME_NODE_SECRET
 
 AUTH_REALM = "game-db"
 
@@ -53,3 +55,19 @@ def authenticate(f):
         return f(*args, **kwargs)
 
     return wrapper
+
+
+def authenticate_node(f):
+    """ Use this function as a decorator for API functions that only game servers may call; they must send the
+        GAME_NODE_SECRET as a bearer token. """
+
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+        # Compared in constant time, so the secret can't be guessed from how long a refusal takes
+        if not GAME_NODE_SECRET or scheme != "Bearer" or not hmac.compare_digest(token.strip().encode(),
+                                                                                 GAME_NODE_SECRET.encode()):
+            return Response("", 401, {"WWW-Authenticate": f"Bearer realm=\"{AUTH_REALM}\""})
+        return f(*args, **kwargs)
+
+    return wrapper
@@ -11,3 +11,13 @@ PRIVATE_KEY_PASSPHRASE = os.environ.get("PRIVATE_KEY_PASSPHRASE", "secret")
 GAME_SERVER_HOST = os.environ.get("GAME_SERVER_HOST", "localhost")
 GAME_SERVER_WS_SCHEME = os.environ.get("GAME_SERVER_WS_SCHEME", "ws")
 GAME_SERVER_WS_PORT = os.environ.get("GAME_SERVER_WS_PORT", "10020")
+
+# Secret game servers send with their load reports, as "Authorization: Bearer <secret>"; reports are refused if unset,
+# so nobody can have games placed on a server of their own
+GAME_NODE_SECRET = os.environ.get("GAME_NODE_SECRET")
+# Time (in seconds) a game server's load report counts for; servers that haven't reported for longer get no new games
+GAME_SERVER_HEARTBEAT_TTL = float(os.environ.get("GAME_SERVER_HEARTBEAT_TTL", "30"))
+# Time (in seconds) a join code is kept for, after which it may be given to another game
+GAME_CODE_TTL = float(os.environ.get("GAME_CODE_TTL", str(6 * 3600)))
+# Time (in seconds) each API worker caches the placement of a game it looked up
+GAME_DIRECTORY_CACHE_TTL = float(os.environ.get("GAME_DIRECTORY_CACHE_TTL", "60"))
@@ -0,0 +1,156 @@
+"""
+File: game_directory.py
+Purpose: Place new games on the game-server nodes, and find them again, from
+every API worker alike. Each game server reports its load on a heartbeat;
+a new game goes to the least loaded node that reported lately, under a
+short join code players can type, and the directory answers with the full
+WebSocket URL of the game. Heartbeats and placements are kept in MongoDB,
+so every API worker sees the same nodes and codes, and each worker caches
+the placements it looks up, as they never change once made.
+"""
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from logging import getLogger
+
+from pymongo import MongoClient
+from pymongo.errors import DuplicateKeyError
+
+logger = getLogger(__name__)
+
+_NODES_COLLECTION_NAME = "game_nodes"
+_PLACEMENTS_COLLECTION_NAME = "game_placements"
+
+CODE_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"  # Join code characters; no 0/O or 1/I, which are easily mixed up
+CODE_LENGTH = 5  # Characters in a join code; 32^5 is about 33 million codes
+CODE_ATTEMPTS = 8  # Codes drawn for a game before giving up, should every one be taken
+CACHE_SIZE = 10000  # Placements each API worker keeps cached
+
+
+@dataclass(frozen=True)
+class Placement:
+    """ Where a game is hosted. """
+
+    code: str
+    """ The join code players find the game by. """
+
+    game_id: str
+    """ The game's id, the last segment of its URL's path. """
+
+    ws_url: str
+    """ The full WebSocket URL of the game, on the node hosting it. """
+
+
+class GameDirectory:
+    """
+    The game-server nodes and the games placed on them. A node is the base
+    WebSocket URL players connect to, e.g. "wss://games-2.example.com:443";
+    it may report through several processes, such as the workers of one
+    server, whose loads are added up.
+    """
+
+    def __init__(self, mongo: MongoClient, heartbeat_ttl: float, code_ttl: float, cache_ttl: float,
+                 fallback_url: str):
+        """
+        Parameters:
+            mongo (MongoClient): The database the directory is kept in.
+            heartbeat_ttl (float): Time (in seconds) a node's load report counts for.
+            code_ttl (float): Time (in seconds) a join code is kept for, after which it may go to another game.
+            cache_ttl (float): Time (in seconds) a placement that was looked up is cached for.
+            fallback_url (str): The node games are placed on while no node is reporting.
+        """
+        database = mongo.get_default_database()
+        self.heartbeat_ttl = heartbeat_ttl
+        self.cache_ttl = cache_ttl
+        self.fallback_url = fallback_url
+
+        # One document per reporting process; MongoDB removes the ones that stopped reporting a while ago
+        self.nodes = database.get_collection(_NODES_COLLECTION_NAME)
+        self.nodes.create_index("heartbeat_at", expireAfterSeconds=max(int(heartbeat_ttl * 10), 60))
+
+        self.placements = database.get_collection(_PLACEMENTS_COLLECTION_NAME)
+        self.placements.create_index("code", unique=True)
+        self.placements.create_index("created_at", expireAfterSeconds=int(code_ttl))
+
+        self._cache = OrderedDict[str, tuple[float, Placement]]()
+        """ The placements this worker looked up lately, by code, with the time they expire at. """
+
+        self._cache_lock = threading.Lock()
+
+    def report(self, reporter_id: str, ws_url: str, games: int, connections: int, max_games: int) -> None:
+        """ Records the load a game-server process reported for its node. """
+        self.nodes.replace_one({"_id": reporter_id}, {
+            "ws_url": ws_url.rstrip("/"),
+            "games": games,
+            "connections": connections,
+            "max_games": max_games,
+            "placed": 0,  # The games placed on the node since this report, which it doesn't count yet
+            "heartbeat_at": datetime.now(timezone.utc),
+        }, upsert=True)
+
+    def _loads(self, fresh_since: datetime) -> list[dict]:
+        """ The load of every node that reported since a time, with the games placed since added to its own. """
+        return list(self.nodes.aggregate([
+            {"$match": {"heartbeat_at": {"$gte": fresh_since}}},
+            {"$group": {"_id": "$ws_url",
+                        "games": {"$sum": {"$add": ["$games", "$placed"]}},
+                        "connections": {"$sum": "$connections"},
+                        "max_games": {"$sum": "$max_games"}}},
+        ]))
+
+    def _pick_node(self) -> str:
+        """ The node with the smallest share of its games in use, and the fewest connections if that's a tie. """
+        fresh_since = datetime.now(timezone.utc) - timedelta(seconds=self.heartbeat_ttl)
+        loads = self._loads(fresh_since)
+        if not loads:
+            return self.fallback_url
+        node = min(loads, key=lambda load: (load["games"] / max(load["max_games"], 1), load["connections"]))
+        # Counted against the node until its next report, so a burst of new games doesn't all land on it
+        self.nodes.update_one({"ws_url": node["_id"], "heartbeat_at": {"$gte": fresh_since}},
+                              {"$inc": {"placed": 1}})
+        return node["_id"]
+
+    def place(self, game_id: str) -> Placement:
+        """
+        Puts a new game on the least loaded node, under a join code of its own.
+
+        Raises:
+            RuntimeError: If no unused code could be found.
+        """
+        node = self._pick_node()
+        placement_doc = {"game_id": game_id, "ws_url": f"{node}/ws/{game_id}",
+                         "created_at": datetime.now(timezone.utc)}
+        for _ in range(CODE_ATTEMPTS):
+            code = "".join(secrets.choice(CODE_ALPHABET) for _ in range(CODE_LENGTH))
+            try:
+                self.placements.insert_one({"code": code, **placement_doc})
+            except DuplicateKeyError:
+                continue
+            logger.info(f"placed game {game_id} on {node} as {code}")
+            return Placement(code, game_id, placement_doc["ws_url"])
+        raise RuntimeError(f"no unused join code found in {CODE_ATTEMPTS} attempts")
+
+    def locate(self, code: str) -> Placement | None:
+        """ Where the game with a join code is hosted, or None if there is no such game. """
+        code = code.upper()
+        now = time.monotonic()
+        with self._cache_lock:
+            cached = self._cache.get(code)
+            if cached is not None and cached[0] > now:
+                self._cache.move_to_end(code)
+                return cached[1]
+
+        placement_doc = self.placements.find_one({"code": code})
+        if placement_doc is None:
+            # Not cached, as another worker may place a game under the code any moment
+            return None
+        placement = Placement(code, placement_doc["game_id"], placement_doc["ws_url"])
+        with self._cache_lock:
+            self._cache[code] = now + self.cache_ttl, placement
+            self._cache.move_to_end(code)
+            if len(self._cache) > CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return placement
@@ -1,26 +1,34 @@
-from threading import Thread
-
 from flask import request
 from gamedb import DuplicateUserIdError, NoSuchGameError
 
-from .app import app, game_repository
+from .app import app, game_directory, game_repository
 from .errors import NotFoundError, ValidationError
+from .game_directory import Placement
 from .props import *
 
-active_games: dict[str, str] = {}
+
+def placement_to_dict(placement: Placement) -> dict:
+    return {GAME_ID: placement.game_id, JOIN_CODE: placement.code, WS_URL: placement.ws_url}
 
 
 @app.route(f"{GAMES_PATH}", methods=["POST"])
 def create_game():
     """
-    Create a new (persistent) Game object.
+    Create a new (persistent) Game object, and place it on the least loaded
+    game server under a join code.
 
     Sample POST:
     {
         "creator": "Nolan",
-        "game_id": "XDFG",
         "creator_id": "435"
     }
+
+    Sample response:
+    {
+        "game_id": "0f8e...",
+        "code": "K7QXM",
+        "ws_url": "ws://127.0.0.1:10020/ws/0f8e..."
+    }
     """
 
     if not request.is_json:
@@ -28,36 +36,50 @@ def create_game():
 
     input_data = request.get_json()
     creator = input_data.get(CREATOR)
-    custom_id = input_data.get(GAME_ID)
     creator_id = input_data.get(CREATOR_ID)
-    game = game_repository.create_game(creator=creator, players=[creator_id])
 
     if not creator or not creator_id:
         raise ValidationError("request must include a creator and their assigned ID")
 
-    game_id = game.gid
+    game = game_repository.create_game(creator=creator, players=[creator_id])
+    placement = game_directory.place(game.gid)
+    return placement_to_dict(placement), 201, {"Location": f"{GAMES_PATH}/{placement.code}"}
 
-    # Store the mapping of the custom_id to the game_id, this will allow players to easily reference it.
-    active_games[custom_id] = game_id
 
-    return {"game_id": game_id}, 201
+@app.route(f"{GAMES_PATH}/<code>")
+def find_game(code: str):
+    """ Where the game with a join code is hosted. """
 
+    placement = game_directory.locate(code)
+    if placement is None:
+        raise NotFoundError(f"no game has the code {code}")
+    return placement_to_dict(placement), 200
 
-@app.route(f"{GAMES_PATH}/<custom_id>", methods=['POST'])
-def join_game(custom_id: str):
+
+@app.route(f"{GAMES_PATH}/<code>", methods=['POST'])
+def join_game(code: str):
     """
-    Adds a player to a game
+    Adds a player to the game with a join code, and tells them where it is hosted
 
     Sample POST:
     {
         "player_id": "466"
     }
     """
+    if not request.is_json:
+        raise ValidationError("request body must be JSON")
+
+    placement = game_directory.locate(code)
+    if placement is None:
+        raise NotFoundError(f"no game has the code {code}")
+
+    player_id = request.get_json().get(PLAYER_ID)
+    if not player_id:
+        raise ValidationError("request must include the player's ID")
+
+    game_id = placement.game_id
     try:
-        input_data = request.get_json()
-        game_id = active_games[custom_id]
-        player_id = input_data[PLAYER_ID]
-        game = game_repository.find_game(game_id)  # Just make sure the game exists
+        game_repository.find_game(game_id)  # Just make sure the game exists
         players = game_repository.games.find_one({'gid': game_id}).get("players", [])
 
         if player_id in players:
@@ -65,8 +87,8 @@ def join_game(custom_id: str):
         game_repository.games.find_one_and_update({'gid': game_id}, {"$push": {"players": player_id}})
 
     except NoSuchGameError as e:
-        return NotFoundError(f"{e}")
-    except DuplicateUserIdError as e:
-        return ValidationError(f"{e}")
+        raise NotFoundError(f"{e}")
+    except DuplicateUserIdError:
+        raise ValidationError(f"player {player_id} already joined the game")
 
-    return {"game_id": "random id"}, 200
+    return placement_to_dict(placement), 200
@@ -0,0 +1,39 @@
+from flask import request
+
+from .app import app, game_directory
+from .auth import authenticate_node
+from .errors import ValidationError
+from .props import *
+
+
+@app.route(f"{NODES_PATH}/<reporter_id>", methods=["PUT"])
+@authenticate_node
+def report_load(reporter_id: str):
+    """
+    Records the load of a game-server process, on its heartbeat. Processes
+    reporting the same WebSocket URL, like the workers of one server, make
+    up one node. Only game servers holding the GAME_NODE_SECRET may report.
+
+    Sample PUT:
+    {
+        "ws_url": "ws://10.0.0.12:10020",
+        "games": 42,
+        "connections": 310,
+        "max_games": 1000
+    }
+    """
+
+    if not request.is_json:
+        raise ValidationError("request body must be JSON")
+
+    input_data = request.get_json()
+    ws_url = input_data.get(WS_URL)
+    try:
+        load = {key: int(input_data[key]) for key in (GAMES, CONNECTIONS, MAX_GAMES)}
+    except (KeyError, TypeError, ValueError):
+        raise ValidationError(f"request must include {GAMES}, {CONNECTIONS} and {MAX_GAMES} as integers")
+    if not ws_url:
+        raise ValidationError("request must include the node's WebSocket URL")
+
+    game_directory.report(reporter_id, ws_url, **load)
+    return "", 204
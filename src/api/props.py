@@ -25,6 +25,14 @@ GAME_ID = "game_id"
 CREATOR = "creator"
 CREATOR_ID = "creator_id"
 PLAYER_ID = "player_id"
+JOIN_CODE = "code"
+WS_URL = "ws_url"
+
+# Game server nodes
+NODES_PATH = "/nodes"
+GAMES = "games"
+CONNECTIONS = "connections"
+MAX_GAMES = "max_games"
 
 
 def user_to_dict(user: User) -> dict:
@@ -0,0 +1,77 @@
+"""
+File: codec.py
+Purpose: Measure what turning an event into its message costs with the
+compiled encoders of quip_model.codec, against copying its fields one by
+one the generic way, and what decoding it back costs.
+
+Run from the src folder:
+    python3 -m benchmarks.codec [--rounds N]
+"""
+import argparse
+import dataclasses
+import json
+import timeit
+
+from quip_model import codec
+from quip_model.events import *
+from quip_model.prompt import Prompt
+
+
+def sample_events() -> list[GameEvent]:
+    """ One event of each type, with fields the size of a game of 8. """
+    prompt = Prompt(7, "The worst thing to hear from your pilot", (3, 5))
+    prompt.responses[3] = "Has anyone seen my glasses?"
+    prompt.responses[5] = "Hold my drink"
+    names = [f"player {index}" for index in range(8)]
+    return [
+        PlayerJoinEvent(3), PlayerLeaveEvent(3), VIPLeaveEvent(3), PlayerNicknameEvent(3, "player 3"),
+        PlayerResponseEvent(3), PlayerVoteEvent("player 3", 1), PlayerVIPEvent(3), RoundStartedEvent(1, 60.0),
+        DistributePromptEvent(3, "The worst thing to hear from your pilot", "A bad name for a boat", 7, 8, 60.0),
+        StopAnsweringPrompts(), BeginVotingEvent(1), BeginPromptVotingEvent(prompt, 15.0),
+        ClientEndPromptVotingEvent(),
+        EndPromptVotingEvent("player 3", names[:4], 400, "player 5", names[4:], 400, True, "", "", 12, 12),
+        ScoreboardEvent(names, [1500, 1400, 1300, 1200, 1100, 1000, 900, 800]), NicknameAlreadyExistsEvent(3),
+        GameFullEvent(1), AudienceJoinEvent(12), AudienceLeaveEvent(12), PlayerReconnectEvent(9, 3),
+    ]
+
+
+def generic_encode(event: GameEvent) -> dict:
+    """ Copies an event's fields into a message one by one, the way hand-written code does. """
+    message = {"event": event.__class__.__name__}
+    for field in dataclasses.fields(event):
+        message[field.name] = getattr(event, field.name)
+    return message
+
+
+def _nanoseconds(function, argument, rounds: int) -> float:
+    return min(timeit.repeat(lambda: function(argument), number=rounds, repeat=5)) / rounds * 1e9
+
+
+def run(rounds: int) -> dict[str, dict[str, float]]:
+    """ The nanoseconds each step takes, per event type. """
+    results = dict[str, dict[str, float]]()
+    for event in sample_events():
+        message = codec.encode(event)
+        generic = not isinstance(event, BeginPromptVotingEvent)  # A prompt isn't sent as it is
+        results[event.__class__.__name__] = {
+            "generic_ns": _nanoseconds(generic_encode, event, rounds) if generic else float("nan"),
+            "encode_ns": _nanoseconds(codec.encode, event, rounds),
+            "decode_ns": _nanoseconds(codec.decode, message, rounds),
+            "encode_json_ns": _nanoseconds(lambda item: json.dumps(codec.encode(item)), event, rounds),
+        }
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-r", "--rounds", type=int, default=20000, help="encodes timed per event type")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = run(args.rounds)
+    print(f"{'event':>28} {'generic ns':>11} {'encode ns':>10} {'decode ns':>10} {'encode+json ns':>15}")
+    for name, result in results.items():
+        print(f"{name:>28} {result['generic_ns']:>11.0f} {result['encode_ns']:>10.0f} {result['decode_ns']:>10.0f} "
+              f"{result['encode_json_ns']:>15.0f}")
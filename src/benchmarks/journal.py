@@ -0,0 +1,113 @@
+"""
+File: journal.py
+Purpose: Measure what journaling costs the games that are being journaled,
+how fast the journals are written, and how fast they replay.
+
+Run from the src folder:
+    python3 -m benchmarks.journal [--games N] [--players N] [--miss-rate R]
+"""
+import argparse
+import gc
+import os
+import tempfile
+import time
+from random import Random
+
+from quip_model.clock import FakeClock
+from quip_model.journal import JournalHeader
+from quip_model.prompt_corpus import default_corpus
+from quip_model.simulator import SimulatedGame, simulate
+from quip_server.journal_writer import JournalWriter
+from quip_server.replay import replay
+
+
+def play_journaled(writer: JournalWriter, num_games: int, num_players: int, miss_rate: float) -> float:
+    """ Plays the games with every input and event journaled. Returns the time the games took. """
+    scheduler = FakeClock()
+    games = list[SimulatedGame]()
+    for index in range(num_games):
+        rng = Random(index)
+        seed = rng.getrandbits(64)
+        header = JournalHeader(f"bench-{index}", seed, default_corpus().fingerprint, time.time())
+        journal = writer.open(header, clock=scheduler.now)
+        games.append(SimulatedGame(scheduler, num_players, rng, miss_rate, seed,
+                                   recorder=journal.record_input, observer=journal.record_event))
+
+    start = time.perf_counter()
+    for simulated in games:
+        simulated.game.play_round()
+    scheduler.run()
+    return time.perf_counter() - start
+
+
+def run(num_games: int, num_players: int, miss_rate: float) -> dict[str, float]:
+    simulate(num_games // 10 + 1, num_players, miss_rate=miss_rate)  # Warm up
+
+    # The garbage collector is off while the games are timed: the writer normally drains the records every
+    # FLUSH_INTERVAL, but here they pile up until the games are over and would make the collector run far more
+    gc.collect()
+    gc.disable()
+    start = time.perf_counter()
+    games = simulate(num_games, num_players, miss_rate=miss_rate)
+    baseline = time.perf_counter() - start
+    gc.enable()
+    events = sum(simulated.events_seen for simulated in games)
+    del games
+
+    with tempfile.TemporaryDirectory() as directory:
+        # The writer only starts once the games are over, so the games are timed with just the cost of
+        # queueing the records, which is what journaling adds to publish; the encoding and writing is timed apart
+        writer = JournalWriter(directory)
+        gc.collect()
+        gc.disable()
+        journaled = play_journaled(writer, num_games, num_players, miss_rate)
+        gc.enable()
+
+        start = time.perf_counter()
+        writer.start()
+        writer.stop()
+        write_time = time.perf_counter() - start
+
+        paths = [os.path.join(directory, name) for name in os.listdir(directory)]
+        journal_bytes = sum(os.path.getsize(path) for path in paths)
+
+        replay_time = 0.0
+        replayed_events = 0
+        diverged = 0
+        for path in paths:
+            with open(path, "rb") as journal_file:
+                result = replay(journal_file.read())
+            replay_time += result.elapsed
+            replayed_events += result.events
+            diverged += result.diverged_at is not None
+
+    return {
+        "overhead_us_per_event": (journaled - baseline) / events * 1e6,
+        "overhead_percent": (journaled - baseline) / baseline * 100,
+        "bytes_per_game": journal_bytes / num_games,
+        "write_mb_per_second": journal_bytes / write_time / 1e6,
+        "write_us_per_event": write_time / events * 1e6,
+        "replay_events_per_second": replayed_events / replay_time,
+        "diverged_games": diverged,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-g", "--games", type=int, default=500, help="number of games to play")
+    parser.add_argument("-p", "--players", type=int, default=8, help="bots per game")
+    parser.add_argument("-m", "--miss-rate", type=float, default=0.05, help="chance that a bot misses a deadline")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = run(args.games, args.players, args.miss_rate)
+    print(f"{args.games} games of {args.players} players")
+    print(f"  journaling overhead: {results['overhead_us_per_event']:.2f} us/event "
+          f"({results['overhead_percent']:.1f}% of game time)")
+    print(f"  journal bytes/game:  {results['bytes_per_game']:,.0f}")
+    print(f"  journal writes:      {results['write_mb_per_second']:,.1f} MB/s "
+          f"({results['write_us_per_event']:.2f} us/event on the writer thread)")
+    print(f"  replay:              {results['replay_events_per_second']:,.0f} events/s through GamePublisher")
+    print(f"  diverged replays:    {results['diverged_games']}")
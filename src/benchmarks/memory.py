@@ -0,0 +1,83 @@
+"""
+File: memory.py
+Purpose: Measure how much memory a game's model objects take once a full
+round's worth of players, prompts, responses, votes and events exist.
+
+Run from the src folder:
+    python3 -m benchmarks.memory [--games N] [--players N]
+"""
+import argparse
+import gc
+import tracemalloc
+from random import Random
+
+from quip_model.events import GameEvent
+from quip_model.game_master import GameMaster
+from quip_model.response import PromptResponse, VoteResponse
+
+
+class NullScheduler:
+    """ A scheduler that never fires, since only the objects are measured. """
+
+    def now(self) -> float:
+        return 0.0
+
+    def call_later(self, delay, callback, *args):
+        return self
+
+    def cancel(self):
+        pass
+
+
+def build_game(num_players: int, seed: int) -> tuple[GameMaster, list[GameEvent]]:
+    """ Builds a game that has been through every phase of one round. """
+    events = list[GameEvent]()
+    game = GameMaster(events.append, NullScheduler(), rng=Random(seed))
+
+    for index in range(num_players):
+        player_id = game.add_connection()
+        game.accept_new_player(player_id, f"player-{index}")
+
+    game.play_round()
+
+    for prompt in game.prompts:
+        for player_id in prompt.player_ids:
+            prompt.receive_response(PromptResponse(prompt.id, player_id, f"answer from {player_id}"))
+
+    for index, prompt in enumerate(game.prompts):
+        for player in game.players:
+            if player.id not in prompt.player_ids:
+                prompt.receive_vote(VoteResponse(prompt.id, player.id, (player.id + index) % 2))
+        game.calculate_points(prompt)
+
+    game.handle_scoreboard()
+    return game, events
+
+
+def measure(num_games: int, num_players: int) -> float:
+    """ Returns the average number of bytes allocated per game. """
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+
+    games = [build_game(num_players, seed) for seed in range(num_games)]
+
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    del games
+    return (after - before) / num_games
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-g", "--games", type=int, default=1000, help="number of games to build")
+    parser.add_argument("-p", "--players", type=int, default=8, help="players per game")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    bytes_per_game = measure(args.games, args.players)
+    print(f"{args.games} games of {args.players} players: {bytes_per_game:,.0f} bytes per game")
@@ -0,0 +1,96 @@
+"""
+File: registry.py
+Purpose: Measure how fast the game registry admits a burst of connections
+spread over many games, e.g. a venue full of players joining at once,
+with one shard (a single lock, as before the registry was sharded) and
+with more. Every connection joins from a thread of its own pool, like the
+threaded server's handlers; games are created for real, and journaled
+with --journal, so creating one costs what it does on a server.
+
+Run from the src folder:
+    python3 -m benchmarks.registry [--connections N] [--games N] [--threads N] [--shards 1 16] [--journal]
+"""
+import argparse
+import gc
+import tempfile
+import threading
+import time
+from queue import Queue
+from random import Random
+
+from quip_model.prompt_corpus import default_corpus
+from quip_server.audience_broadcaster import AudienceBroadcaster
+from quip_server.event_bus import EventBus
+from quip_server.game_registry import GameRegistry
+from quip_server.journal_writer import JournalWriter
+from quip_server.metrics import EventMetrics
+from quip_server.scheduler import GameScheduler
+from quip_server.server import GameServer
+
+
+class _HeadlessUI:
+    """ Stands in for the server's GUI. """
+
+    def __init__(self):
+        self.event_queue = Queue()
+
+
+def run(num_connections: int, num_games: int, num_threads: int, shards: int,
+        journal_dir: str = None) -> dict[str, float]:
+    """ The connections admitted per second, and the slowest admission in milliseconds. """
+    ui, scheduler, broadcaster, bus = _HeadlessUI(), GameScheduler(), AudienceBroadcaster(), EventBus()
+    metrics, corpus = EventMetrics(), default_corpus()
+    journals = JournalWriter(journal_dir) if journal_dir else None
+
+    def create(game_id: str) -> GameServer:
+        return GameServer(game_id, ui, scheduler, broadcaster, bus, metrics, corpus, journals=journals)
+
+    registry = GameRegistry(create, scheduler, max_games=num_games, shards=shards)
+    game_ids = [f"game-{index}" for index in range(num_games)]
+    per_thread = num_connections // num_threads
+    joined = [list[GameServer]() for _ in range(num_threads)]
+    slowest = [0.0] * num_threads
+    start_line = threading.Barrier(num_threads + 1)
+    gc.collect()  # Of the games of the previous run, so they aren't collected during this one
+
+    def admit(index: int):
+        rng = Random(index)
+        start_line.wait()
+        for _ in range(per_thread):
+            start = time.perf_counter()
+            joined[index].append(registry.join(rng.choice(game_ids)))
+            slowest[index] = max(slowest[index], time.perf_counter() - start)
+
+    threads = [threading.Thread(target=admit, args=(index,)) for index in range(num_threads)]
+    for thread in threads:
+        thread.start()
+    start_line.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    for servers in joined:
+        for server in servers:
+            registry.leave(server)
+    return {"per_second": per_thread * num_threads / elapsed, "games": len(registry),
+            "slowest_ms": max(slowest) * 1e3}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-c", "--connections", type=int, default=20000, help="connections admitted")
+    parser.add_argument("-g", "--games", type=int, default=2000, help="games the connections are spread over")
+    parser.add_argument("-t", "--threads", type=int, default=32, help="threads admitting connections at once")
+    parser.add_argument("-s", "--shards", type=int, nargs="+", default=[1, 16], help="shard counts to compare")
+    parser.add_argument("-j", "--journal", action="store_true", help="journal the games to a temporary directory")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    print(f"{'shards':>6} {'games':>7} {'conn/s':>9} {'slowest ms':>11}")
+    for shard_count in args.shards:
+        with tempfile.TemporaryDirectory() as directory:
+            results = run(args.connections, args.games, args.threads, shard_count, directory if args.journal else None)
+        print(f"{shard_count:>6} {results['games']:>7,} {results['per_second']:>9,.0f} {results['slowest_ms']:>11.2f}")
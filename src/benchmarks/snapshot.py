@@ -0,0 +1,78 @@
+"""
+File: snapshot.py
+Purpose: Measure how large GameMaster snapshots are and how long they take
+to encode and restore, at every phase boundary of a simulated round.
+
+Run from the src folder:
+    python3 -m benchmarks.snapshot [--players N ...] [--repeat N]
+"""
+import argparse
+import time
+from random import Random
+
+from quip_model import snapshot
+from quip_model.clock import FakeClock
+from quip_model.game_master import GameMaster
+from quip_model.simulator import SimulatedGame
+
+
+def capture(num_players: int) -> list[bytes]:
+    """ Plays a round and snapshots the game at each phase boundary. """
+    scheduler = FakeClock()
+    simulated = SimulatedGame(scheduler, num_players, Random(0), miss_rate=0.05)
+    snapshots = list[bytes]()
+    simulated.game.checkpoint = lambda game: snapshots.append(snapshot.encode(game))
+    simulated.game.play_round()
+    scheduler.run()
+    return snapshots
+
+
+def run(num_players: int, repeat: int) -> dict[str, float]:
+    snapshots = capture(num_players)
+    games = [snapshot.restore(GameMaster(lambda event: None, FakeClock()), data) for data in snapshots]
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for game in games:
+            snapshot.encode(game)
+    encode_time = (time.perf_counter() - start) / (repeat * len(games))
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for data in snapshots:
+            snapshot.restore(GameMaster(lambda event: None, FakeClock()), data)
+    restore_time = (time.perf_counter() - start) / (repeat * len(snapshots))
+
+    # GameMaster's own setup is part of every restore, so report it on its own too
+    start = time.perf_counter()
+    for _ in range(repeat * len(snapshots)):
+        GameMaster(lambda event: None, FakeClock())
+    create_time = (time.perf_counter() - start) / (repeat * len(snapshots))
+
+    sizes = [len(data) for data in snapshots]
+    return {
+        "snapshots": len(snapshots),
+        "mean_bytes": sum(sizes) / len(sizes),
+        "max_bytes": max(sizes),
+        "encode_us": encode_time * 1e6,
+        "restore_us": restore_time * 1e6,
+        "create_us": create_time * 1e6,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-p", "--players", type=int, nargs="+", default=[3, 8, 100], help="bots per game")
+    parser.add_argument("-r", "--repeat", type=int, default=200, help="times to encode and restore each snapshot")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    print(f"{'players':>8} {'snapshots':>10} {'mean B':>8} {'max B':>8} {'encode us':>10} {'restore us':>11}"
+          f" {'(new game us)':>14}")
+    for num_players in args.players:
+        results = run(num_players, args.repeat)
+        print(f"{num_players:>8} {results['snapshots']:>10} {results['mean_bytes']:>8,.0f}"
+              f" {results['max_bytes']:>8,} {results['encode_us']:>10,.1f} {results['restore_us']:>11,.1f}"
+              f" {results['create_us']:>14,.1f}")
@@ -0,0 +1,195 @@
+"""
+File: sockets.py
+Purpose: Compare the threaded and asyncio server modes with many players
+connected: the server's memory, threads and idle CPU, and how long a
+request takes to be answered, alone and when every socket sends at once.
+
+The server runs in a child process, so its memory is measured on its own.
+Both processes need a file descriptor per socket; the soft limit is raised
+to the hard limit, so at 10k sockets check `ulimit -Hn`.
+
+Run from the src folder:
+    python3 -m benchmarks.sockets [--sockets 1000 10000] [--modes threads asyncio]
+"""
+import argparse
+import asyncio
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from queue import Queue
+
+import websockets
+
+CONNECT_CONCURRENCY = 200  # Handshakes the benchmark has in flight at once
+CONNECT_DEADLINE = 180  # Time (in seconds) allowed to connect every socket; the ones still connecting are given up
+IDLE_SECONDS = 5  # Time (in seconds) the server's CPU use is measured for with every socket connected and quiet
+LATENCY_SAMPLES = 500  # Requests sent one at a time to measure the round trip
+REQUEST_TIMEOUT = 60  # Time (in seconds) after which an unanswered request counts as never answered
+
+
+def _raise_fd_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+class _HeadlessUI:
+    """ Stands in for the server's GUI. """
+
+    def __init__(self):
+        self.event_queue = Queue()
+
+
+def serve(port: int):
+    """ Runs a game server without a GUI; the mode is taken from SERVER_MODE like on a real server. """
+    _raise_fd_limit()
+    from quip_server import server_listener
+    server_listener.LOCAL_PORT = port
+    server_listener.GameListener(_HeadlessUI()).run()
+
+
+def _process_status(pid: int) -> dict[str, int]:
+    status = dict[str, int]()
+    with open(f"/proc/{pid}/status") as status_file:
+        for line in status_file:
+            name, _, value = line.partition(":")
+            if name in ("VmRSS", "Threads"):
+                status[name] = int(value.split()[0])
+    return status
+
+
+def _cpu_seconds(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as stat_file:
+        fields = stat_file.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+class _Client:
+    """ One socket; keeps the replies to its requests and drops the game's events. """
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.replies = asyncio.Queue()
+        self.reader = asyncio.create_task(self._read())
+
+    async def _read(self):
+        try:
+            async for message_text in self.websocket:
+                if '"status"' in message_text:
+                    self.replies.put_nowait(message_text)
+        except websockets.ConnectionClosed:
+            pass
+
+    async def request(self) -> float:
+        """
+        Sends a request the server answers without doing anything.
+
+        Returns:
+            The round trip, in seconds, or infinity if the request wasn't answered.
+        """
+        start = time.perf_counter()
+        try:
+            await self.websocket.send('{"type": "ping"}')
+            await asyncio.wait_for(self.replies.get(), REQUEST_TIMEOUT)
+        except (asyncio.TimeoutError, websockets.ConnectionClosed):
+            return float("inf")
+        return time.perf_counter() - start
+
+
+async def _connect(url: str, count: int) -> list[_Client]:
+    """ Connects up to count sockets; a server that can't keep up gets fewer. """
+    limit = asyncio.Semaphore(CONNECT_CONCURRENCY)
+
+    async def connect_one() -> _Client:
+        async with limit:
+            return _Client(await websockets.connect(url, open_timeout=60, ping_interval=None))
+
+    tasks = [asyncio.create_task(connect_one()) for _ in range(count)]
+    done, pending = await asyncio.wait(tasks, timeout=CONNECT_DEADLINE)
+    for task in pending:
+        task.cancel()
+    return [task.result() for task in done if task.exception() is None]
+
+
+async def _measure(pid: int, url: str, count: int) -> dict[str, float]:
+    baseline = _process_status(pid)
+
+    start = time.perf_counter()
+    clients = await _connect(url, count)
+    connect_time = time.perf_counter() - start
+    await asyncio.sleep(1)
+
+    connected = _process_status(pid)
+    cpu_before = _cpu_seconds(pid)
+    await asyncio.sleep(IDLE_SECONDS)
+    idle_cpu = (_cpu_seconds(pid) - cpu_before) / IDLE_SECONDS
+
+    rng = random.Random(0)
+    round_trips = sorted([await client.request() for client in rng.choices(clients, k=LATENCY_SAMPLES)])
+
+    burst = sorted(await asyncio.gather(*(client.request() for client in clients)))
+
+    # Drop the sockets without closing handshakes; the server is killed next anyway
+    for client in clients:
+        client.reader.cancel()
+        client.websocket.transport.abort()
+
+    return {
+        "connected": len(clients),
+        "connect_per_second": len(clients) / connect_time,
+        "rss_mb": connected["VmRSS"] / 1024,
+        "kb_per_socket": (connected["VmRSS"] - baseline["VmRSS"]) / len(clients),
+        "threads": connected["Threads"],
+        "idle_cpu_percent": idle_cpu * 100,
+        "p50_ms": statistics.median(round_trips) * 1000,
+        "p99_ms": round_trips[int(len(round_trips) * 0.99)] * 1000,
+        "burst_p50_ms": statistics.median(burst) * 1000,
+        "burst_p99_ms": burst[int(len(burst) * 0.99)] * 1000,
+        "unanswered": sum(round_trip == float("inf") for round_trip in burst),
+    }
+
+
+def run(mode: str, count: int, port: int) -> dict[str, float]:
+    """ Starts a server in the given mode, connects count sockets to it and measures it. """
+    env = dict(os.environ, SERVER_MODE=mode, PYTHONPATH=os.getcwd())
+    server = subprocess.Popen([sys.executable, "-m", "benchmarks.sockets", "--serve", str(port)], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        time.sleep(2)  # Let the server start listening
+        return asyncio.run(_measure(server.pid, f"ws://127.0.0.1:{port}/ws/bench", count))
+    finally:
+        server.kill()
+        server.wait()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-s", "--sockets", type=int, nargs="+", default=[1000, 10000], help="sockets to connect")
+    parser.add_argument("-m", "--modes", nargs="+", default=["threads", "asyncio"], help="server modes to compare")
+    parser.add_argument("-p", "--port", type=int, default=10600, help="first port to run the servers on")
+    parser.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.serve is not None:
+        serve(args.serve)
+        sys.exit()
+
+    _raise_fd_limit()
+    print(f"{'mode':>8} {'sockets':>8} {'connected':>10} {'conn/s':>7} {'RSS MB':>8} {'KB/sock':>8} {'threads':>8} "
+          f"{'idle CPU':>9} {'p50 ms':>7} {'p99 ms':>7} {'burst p50':>10} {'burst p99':>10} {'lost':>5}")
+    port = args.port
+    for count in args.sockets:
+        for mode in args.modes:
+            results = run(mode, count, port)
+            port += 1
+            print(f"{mode:>8} {count:>8,} {results['connected']:>10,} {results['connect_per_second']:>7,.0f} "
+                  f"{results['rss_mb']:>8.1f} {results['kb_per_socket']:>8.1f} "
+                  f"{results['threads']:>8,} {results['idle_cpu_percent']:>8.1f}% "
+                  f"{results['p50_ms']:>7.2f} {results['p99_ms']:>7.2f} "
+                  f"{results['burst_p50_ms']:>10.1f} {results['burst_p99_ms']:>10.1f} {results['unanswered']:>5,}")
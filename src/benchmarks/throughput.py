@@ -0,0 +1,59 @@
+"""
+File: throughput.py
+Purpose: Measure how many games per second GameMaster can push through,
+using the headless simulator so no clients or real time are involved.
+
+Run from the src folder:
+    python3 -m benchmarks.throughput [--games N] [--players N] [--miss-rate R]
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from quip_model.simulator import simulate
+
+
+def run(num_games: int, num_players: int, miss_rate: float) -> dict[str, float]:
+    """ Plays the games once for timing and once more to trace allocations. """
+    gc.collect()
+    start = time.perf_counter()
+    games = simulate(num_games, num_players, miss_rate=miss_rate)
+    elapsed = time.perf_counter() - start
+
+    events = sum(simulated.events_seen for simulated in games)
+    unfinished = sum(not simulated.finished for simulated in games)
+    del games
+
+    gc.collect()
+    tracemalloc.start()
+    simulate(num_games, num_players, miss_rate=miss_rate)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "games_per_second": num_games / elapsed,
+        "events_per_second": events / elapsed,
+        "events_per_game": events / num_games,
+        "peak_bytes_per_game": peak / num_games,
+        "unfinished_games": unfinished,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-g", "--games", type=int, default=1000, help="number of games to play")
+    parser.add_argument("-p", "--players", type=int, default=8, help="bots per game")
+    parser.add_argument("-m", "--miss-rate", type=float, default=0.05, help="chance that a bot misses a deadline")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = run(args.games, args.players, args.miss_rate)
+    print(f"{args.games} games of {args.players} players")
+    print(f"  games/s:        {results['games_per_second']:,.1f}")
+    print(f"  events/s:       {results['events_per_second']:,.0f}")
+    print(f"  events/game:    {results['events_per_game']:,.1f}")
+    print(f"  peak bytes/game {results['peak_bytes_per_game']:,.0f}")
+    print(f"  unfinished:     {results['unfinished_games']}")
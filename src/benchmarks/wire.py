@@ -0,0 +1,49 @@
+"""
+File: wire.py
+Purpose: Measure, for every event type, the size of its message in each
+wire format of quip_model.wire, and what encoding and parsing it costs.
+Formats whose package isn't installed are left out.
+
+Run from the src folder:
+    python3 -m benchmarks.wire [--rounds N]
+"""
+import argparse
+import timeit
+
+from quip_model import codec
+from quip_model.wire import WIRE_FORMATS
+from .codec import sample_events
+
+
+def _nanoseconds(function, argument, rounds: int) -> float:
+    return min(timeit.repeat(lambda: function(argument), number=rounds, repeat=5)) / rounds * 1e9
+
+
+def run(rounds: int) -> dict[str, dict[str, tuple[int, float, float]]]:
+    """ The bytes of each event type's message, and the nanoseconds encoding and parsing it take, by wire format. """
+    results = dict[str, dict[str, tuple[int, float, float]]]()
+    for event in sample_events():
+        message = codec.encode(event)
+        results[event.__class__.__name__] = {
+            name: (len(wire_format.dumps(message)), _nanoseconds(wire_format.dumps, message, rounds),
+                   _nanoseconds(wire_format.loads, wire_format.dumps(message), rounds))
+            for name, wire_format in WIRE_FORMATS.items()
+        }
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-r", "--rounds", type=int, default=20000, help="encodes and parses timed per event type")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = run(args.rounds)
+    print(f"{'event':>28}" + "".join(f" {name + ' B':>10} {'enc ns':>7} {'parse ns':>8}" for name in WIRE_FORMATS))
+    for event_name, result in results.items():
+        print(f"{event_name:>28}" + "".join(f" {size:>10} {encode_ns:>7.0f} {parse_ns:>8.0f}"
+                                            for size, encode_ns, parse_ns in result.values()))
+    totals = {name: sum(result[name][0] for result in results.values()) for name in WIRE_FORMATS}
+    print(f"{'total bytes':>28}" + "".join(f" {size:>10} {'':>7} {'':>8}" for size in totals.values()))
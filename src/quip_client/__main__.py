@@ -1,4 +1,6 @@
+from .api_client import GamesApiClient
 from .client_ui import GameUI
+from quip_model.wire import WIRE_FORMATS, with_format
 import argparse
 import sys
 
@@ -9,11 +11,18 @@ def parse_args():
     parser = argparse.ArgumentParser()
     parser.add_argument("-g", "--game-url", default=WS_URL, help="URL for the game")
     parser.add_argument("-a", "--api-url", default=API_URL, help="URL for the api")
+    parser.add_argument("-j", "--join", metavar="CODE", help="join code of the game, to look its URL up with the api")
+    parser.add_argument("-f", "--wire-format", choices=WIRE_FORMATS, help="wire format to ask the game for")
     args = parser.parse_args()
     return args
 
 
 if __name__ == "__main__":
     args = parse_args()
-    ui = GameUI(url=args.game_url, api_url=args.api_url)
+    game_url = args.game_url
+    if args.join:
+        game_url = GamesApiClient(args.api_url).find_game(args.join)["ws_url"]
+    # Without a join code, the player creates a game through the api, and is connected to wherever it is placed
+    ui = GameUI(url=with_format(game_url, args.wire_format), api_url=args.api_url, join_code=args.join,
+                wire_format=args.wire_format)
     ui.run()
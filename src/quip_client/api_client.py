@@ -87,8 +87,7 @@ class GamesApiClient:
         url = urljoin(self.base_url, href)
         data = {
             "creator": creator,
-            "creator_id": creator_id,
-            "game_id": "placeholder"
+            "creator_id": creator_id
         }
         headers = {
             'Content-Type': 'application/json'
@@ -96,3 +95,10 @@ class GamesApiClient:
         response = requests.post(url, data=json.dumps(data), headers=headers)
         response.raise_for_status()
         return response.json(), response.headers.get("ETag")
+
+    def find_game(self, code: str) -> dict:
+        """ The game with a join code: its "game_id", "code" and the "ws_url" to connect to. """
+        url = urljoin(self.base_url, f"{self.GAMES_PATH}/{code}")
+        response = requests.get(url)
+        response.raise_for_status()
+        return response.json()
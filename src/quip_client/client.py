@@ -1,10 +1,61 @@
+import logging
+import time
+from typing import Callable
+from urllib.parse import urlencode, urlparse
+
+import websockets
 from gamecomm import client
+from gamecomm.client import ConnectionClosed, WsGameConnection
+
+from quip_model.protocol import SEQ, SESSION
+from quip_model.wire import JSON, requested_format
+
+logger = logging.getLogger(__name__)
+
+RESUME_ATTEMPTS = 6  # Times the client tries to reconnect after its connection drops, before giving up
+RESUME_BACKOFF = 0.05  # Time (in seconds) before the second try; it doubles with each try after
+SYNC_TIMEOUT = 5  # Time (in seconds) an unanswered sync is waited on before it is sent again
 
 
 class GameClient(client.GameClient):
+    """
+    gamecomm's GameClient, speaking the wire format its URL asks for, e.g.
+    ws://host:10020/ws/<game-id>?format=msgpack. Requests are sent as JSON
+    until the server's first binary frame shows it speaks that format.
+
+    Events are numbered by the game; one the client already has is ignored.
+    Each also carries the number of the event the client was sent before
+    it, and if the client doesn't have that one, it catches up with sync(),
+    as it missed some. Once the player has joined, a dropped WebSocket
+    connection is reconnected, resuming the player's session; the server
+    sends the events missed meanwhile, and requests that couldn't be sent
+    are sent once it has.
+    """
 
     def __init__(self, url, token=None, on_event=None):
         super().__init__(url, token, on_event)
+        query = urlparse(url).query
+        if query and isinstance(self._connection, WsGameConnection):
+            # gamecomm leaves the query out of the URL it connects to
+            self._connection.url += f"?{query}"
+        self._game_url = getattr(self._connection, "url", None)
+        self.wire_format = requested_format(url)
+        self._send_format = JSON
+
+        self.seq = 0
+        """ The sequence number of the latest event handled. """
+
+        self.session: str | None = None
+        """ The token of the player's session, once they have joined. """
+
+        self._resuming = False
+        """ True from reconnecting until the server's first message, which tells whether the session resumed. """
+
+        self._sync_sent_at: float | None = None
+        """ The monotonic time the unanswered sync was sent at, if there is one. """
+
+        self._unsent = list[tuple[str | bytes, Callable, Callable]]()
+        """ Requests that couldn't be sent because the connection dropped, with their callbacks. """
 
     def is_event(self, message: dict):
         return "event" in message
@@ -12,8 +63,126 @@ class GameClient(client.GameClient):
     def is_success(self, response: dict):
         return response["status"] == "ok"
 
+    def _run(self):
+        payload = None
+        while not self._shutdown.is_set():
+            try:
+                payload = self._connection.recv(self.RECV_TIMEOUT_SECONDS)
+                if payload:
+                    if isinstance(payload, bytes):
+                        self._send_format = self.wire_format
+                    message = self.wire_format.loads(payload)
+                    if self._resuming:
+                        self._resuming = False
+                        if "deltas" not in message:
+                            # The session is gone, e.g. the server restarted; the client was seated as someone new
+                            logger.warning("the server didn't resume the session")
+                            self.session = None
+                            self.seq = 0
+                    if self.is_event(message):
+                        self._handle_event(message)
+                    elif "deltas" in message:
+                        self._handle_sync_response(message)
+                    else:
+                        self.session = message.get("session", self.session)
+                        self._handle_response(message)
+            except KeyError as err:
+                logger.error(f"error processing message: {err}: {payload!r}")
+            except ValueError as err:
+                logger.error(f"error decoding message: {err}: {payload!r}")
+            except ConnectionClosed:
+                if not self._resume():
+                    break
+        logger.debug("client shutdown")
+
+    def _resume(self) -> bool:
+        """ Reconnects, resuming the player's session. Returns False if there is none or it can't be resumed. """
+        if self.session is None or self._game_url is None:
+            return False
+
+        delay = 0
+        for _ in range(RESUME_ATTEMPTS):
+            if self._shutdown.wait(delay):
+                return False
+            delay = delay * 2 if delay else RESUME_BACKOFF
+
+            query = urlencode({SESSION: self.session, SEQ: self.seq})
+            self._connection.url = f"{self._game_url}{'&' if '?' in self._game_url else '?'}{query}"
+            with self._lock:
+                try:
+                    self._connection.open()
+                except (OSError, ConnectionClosed, websockets.WebSocketException) as err:
+                    logger.debug(f"error resuming session: {err}")
+                    continue
+
+                # The responses to requests still pending were lost with the old connection, and so was any sync's;
+                # the server catches the client up on its own
+                self._pending_requests.clear()
+                self._sync_sent_at = None
+                self._resuming = True
+                unsent, self._unsent = self._unsent, []
+                for payload, on_success, on_error in unsent:
+                    self._connection.send(payload)
+                    self._pending_requests.append((on_success, on_error))
+            logger.info(f"resumed session after {self.seq}")
+            return True
+
+        logger.error(f"gave up resuming the session after {RESUME_ATTEMPTS} tries")
+        return False
+
+    def _handle_event(self, event: dict):
+        seq = event.get("seq", 0)
+        if seq and seq <= self.seq:
+            return
+        if event.get("prev", 0) > self.seq or self._sync_sent_at is not None:
+            # Events are handled in order, so this one waits for the catch-up, which holds it and any missed before
+            if self._sync_sent_at is None or time.monotonic() - self._sync_sent_at >= SYNC_TIMEOUT:
+                self.sync()
+            return
+        self._dispatch(event)
+
+    def _dispatch(self, event: dict):
+        self.seq = max(self.seq, event.get("seq", 0))
+        if self.on_event:
+            self.on_event(event)
+
+    def _handle_sync_response(self, response: dict):
+        self._sync_sent_at = None
+        # A snapshot stands for everything before it; the events in it the client already handled aren't handled again
+        for event in (*response.get("snapshot", ()), *response["deltas"]):
+            if event.get("seq", 0) > self.seq:
+                self._dispatch(event)
+        self.seq = max(self.seq, response["seq"])
+
+    def sync(self):
+        """ Asks the server for the events missed, e.g. after reconnecting or lagging, and handles them. """
+        # The response is told apart by its deltas rather than matched to the request, since the server doesn't
+        # answer every request that fails
+        payload = self._send_format.dumps({"type": "sync", "seq": self.seq})
+        with self._lock:
+            self._sync_sent_at = time.monotonic()
+            try:
+                self._connection.send(payload)
+            except ConnectionClosed:
+                # Resuming the session catches the client up
+                self._sync_sent_at = None
+
+    def send(self, message: dict, on_success=None, on_error=None):
+        payload = self._send_format.dumps(message)
+        with self._lock:
+            try:
+                self._connection.send(payload)
+            except ConnectionClosed:
+                if self.session is None:
+                    raise
+                self._unsent.append((payload, on_success, on_error))
+                return
+            self._pending_requests.append((on_success, on_error))
+
     def start(self):
         super().start()
 
     def stop(self):
+        # Before the connection closes, so it isn't taken for a dropped one and resumed
+        self._shutdown.set()
         super().stop()
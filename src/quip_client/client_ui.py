@@ -7,6 +7,7 @@ import pygame
 import pyautogui
 from requests.exceptions import *
 
+from quip_model.wire import with_format
 from .api_client import UsersApiClient, GamesApiClient
 from .client_controller import GameController, GameClient
 from .ui_elements.elements import Button, TextBox
@@ -18,7 +19,7 @@ TEXT_COLOR = (255, 255, 255)
 
 class GameUI:
 
-    def __init__(self, url, api_url):
+    def __init__(self, url, api_url, join_code: str = None, wire_format: str = None):
         self.points = None
         self.win = None
         self.client = None
@@ -35,8 +36,11 @@ class GameUI:
         self.previous_screen = None
         self.current_screen: Screen = Screen.HOME
         self.vip = False
+        self.spectating = False
         self.url = url
         self.api_url = api_url
+        self.join_code = join_code  # The code of the game, given to join it or shown once this player created it
+        self.wire_format = wire_format  # The wire format asked for, also from the game this player creates
         self.controller = None
         self.api = UsersApiClient(self.api_url)
         self.games_api = GamesApiClient(self.api_url)
@@ -58,8 +62,8 @@ class GameUI:
         # Set up the clock
         self.clock = pygame.time.Clock()
 
-        # Set up response timer
-        self.response_timer = Timer(59, self.force_response)
+        # Set up response timer; it is armed with the game's countdown when the prompts arrive
+        self.response_timer: Timer | None = None
 
         # The back button
         self.back_button = Button(20, 20, 20, 20, "<", (50, 50, 50), (140, 140, 140), text_color=(255, 255, 255),
@@ -209,9 +213,14 @@ class GameUI:
             case "DistributePromptEvent":
                 self.prompts = [event["prompt_0"], event["prompt_1"]]
                 self.change_screen(Screen.RESPONSE_0)
-                self.response_timer.start()  # Start 60-second timer
+                # Send whatever has been typed a second before the game's deadline
+                if self.response_timer is not None:
+                    self.response_timer.cancel()
+                self.response_timer = Timer(max(event.get("countdown", 60) - 1, 0), self.force_response)
+                self.response_timer.start()
             case "BeginPromptVotingEvent":
-                self.response_timer.cancel()
+                if self.response_timer is not None:
+                    self.response_timer.cancel()
                 self.response_0 = event["response_0"]
                 self.response_1 = event["response_1"]
                 self.prompt_to_vote = event["prompt"]
@@ -227,6 +236,11 @@ class GameUI:
             case "PlayerJoinEvent":
                 if not self.vip:
                     self.change_screen(Screen.WAITING_SCREEN)
+            case "AudienceJoinEvent":
+                # The game was full or already started, so we watch and vote from the audience
+                self.spectating = True
+                self.id = event["audience_num"]
+                self.change_screen(Screen.WAITING_SCREEN)
             case "GameFullEvent":
                 self.change_screen(Screen.HOME)
                 self.error = "The game is full!"
@@ -236,20 +250,21 @@ class GameUI:
         print("Button clicked!")
 
     def submit_nickname(self, nickname):
-        try:
-            if nickname == "" and self.login_uid is not None:
-                self.create_game(self.login_uid)
-            elif nickname != "":
-                self.create_game(nickname)
-                self.username = nickname
-            else:
-                self.error = "You must specify a nickname since you're not logged in!"
-                self.display_error()
-                self.current_screen = Screen.HOME
-                return
-        except OSError:
-            # If the server is already running, do nothing.
-            pass
+        if nickname == "" and self.login_uid is None:
+            self.error = "You must specify a nickname since you're not logged in!"
+            self.display_error()
+            self.current_screen = Screen.HOME
+            return
+        if nickname != "":
+            self.username = nickname
+
+        # A player without a join code creates the game, unless they already did
+        if self.join_code is None and not self.client_running:
+            try:
+                self.create_game(self.login_uid if nickname == "" else nickname)
+            except OSError as e:
+                # Without the api, play the game at the URL we were started with
+                print(f"Could not create a game, joining {self.url}: {e}")
 
         # Launch the client
         if not self.client_running:
@@ -297,7 +312,12 @@ class GameUI:
         self.change_screen(Screen.HOME)
 
     def create_game(self, creator):
-        self.games_api.create_game(GamesApiClient.GAMES_PATH, creator=creator, creator_id=str(self.id))
+        """ Creates a game through the api, and connects to the game server it was placed on. """
+        game, _ = self.games_api.create_game(GamesApiClient.GAMES_PATH, creator=creator, creator_id=str(self.id))
+        self.join_code = game["code"]
+        self.url = with_format(game["ws_url"], self.wire_format)
+        self.client = GameClient(self.url, on_event=self.controller.handle_event)
+        print(f"Created game {self.join_code}")
 
     def record_response_0(self, response):
         self.response_0 = response
@@ -405,6 +425,7 @@ class GameUI:
         self.screen.fill(BACKGROUND_COLOR)  # Set background color as needed
         self.vip_start_button.draw(self.screen)
         self.display_nickname()
+        self.display_join_code()
         # Render text
         text = self.font.render("Start the Game When All Players Have Joined", True,
                                 TEXT_COLOR)  # Change the text and color as needed
@@ -423,6 +444,7 @@ class GameUI:
         text = self.font.render("STAND BY", True, TEXT_COLOR)  # Change the text and color as needed
         text_rect = text.get_rect(center=(self.width // 2, (self.height // 2) - 100))
         self.display_nickname()
+        self.display_join_code()
 
         # Blit the text onto the screen
         self.screen.blit(text, text_rect)
@@ -568,12 +590,24 @@ class GameUI:
             text_rect = text.get_rect(center=(self.width // 2, 10))
             self.screen.blit(text, text_rect)
 
+    def display_join_code(self):
+        if self.join_code is not None:
+            font = pygame.font.Font(None, 36)
+            text = font.render(f'Join code: {self.join_code}', True, TEXT_COLOR)
+            text_rect = text.get_rect(center=(self.width // 2, self.height - 60))
+            self.screen.blit(text, text_rect)
+
     def display_error(self):
         if self.error:
             pyautogui.alert(self.error)
             self.error = None
 
     def handle_scoreboard_event(self, event):
+        if self.spectating:
+            # Spectators don't score, so there is nothing to record
+            self.change_screen(Screen.HOME)
+            return
+
         names = event["names_in_order"]
         points = event["points_in_order"]
         index = 0
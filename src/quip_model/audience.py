@@ -0,0 +1,71 @@
+"""
+File: audience.py
+Purpose: Keep track of the spectators watching a game. Spectators are given
+dense seat numbers so that each prompt can record who has voted in a bitset
+instead of a list of voter ids.
+"""
+from .exceptions import *
+
+MAX_AUDIENCE = 10000  # The largest number of spectators a single game will seat
+
+
+class Audience:
+    """
+    The spectators of a game. Seats are handed out from 0 upward and reused
+    once their spectator leaves, so the seat numbers stay dense.
+    """
+
+    __slots__ = ("capacity", "_seated", "_free_seats", "_next_seat")
+
+    def __init__(self, capacity: int = MAX_AUDIENCE):
+        """
+        Creates a new, empty audience.
+
+        Parameters:
+            capacity (int): The most spectators that can be seated at once.
+        """
+        self.capacity = capacity
+        """ The most spectators that can be seated at once. """
+
+        self._seated = set[int]()
+        """ The seats that are currently taken. """
+
+        self._free_seats = list[int]()
+        """ Seats given back by spectators who left, reused before new ones. """
+
+        self._next_seat = 0
+        """ The lowest seat that has never been handed out. """
+
+    def join(self) -> int:
+        """
+        Seats a new spectator.
+
+        Returns:
+            The spectator's seat number.
+            If the audience is full, an exception is thrown.
+        """
+        if len(self._seated) >= self.capacity:
+            raise AudienceFull(f"The audience is full ({self.capacity} spectators).")
+
+        if self._free_seats:
+            seat = self._free_seats.pop()
+        else:
+            seat = self._next_seat
+            self._next_seat += 1
+
+        self._seated.add(seat)
+        return seat
+
+    def leave(self, seat: int) -> None:
+        """ Frees a spectator's seat. If the seat is not taken, an exception is thrown. """
+        if seat not in self._seated:
+            raise AudienceMemberNotFound(f"Seat {seat} is not taken!")
+
+        self._seated.remove(seat)
+        self._free_seats.append(seat)
+
+    def __len__(self) -> int:
+        return len(self._seated)
+
+    def __contains__(self, seat: int) -> bool:
+        return seat in self._seated
@@ -0,0 +1,119 @@
+"""
+File: clock.py
+Purpose: Define the clocks games are paced by: real time for live games,
+an accelerated clock for soak runs, and a fake clock that only moves when
+it is told to, for tests, simulations and replays.
+"""
+import heapq
+import itertools
+import time
+from typing import Callable, Protocol
+
+
+class Clock(Protocol):
+    """ A source of time for the scheduler that paces the games. """
+
+    rate: float
+    """ The number of clock seconds that pass per real second. """
+
+    def now(self) -> float:
+        """ The current time, in clock seconds. Only differences between two readings mean anything. """
+        ...
+
+
+class RealClock:
+    """ Real time. """
+
+    rate = 1.0
+
+    def now(self) -> float:
+        return time.monotonic()
+
+
+class AcceleratedClock:
+    """ A clock that runs rate times faster than real time, so games can be played through quickly. """
+
+    def __init__(self, rate: float):
+        if rate <= 0:
+            raise ValueError(f"Clock rate must be positive, not {rate}.")
+        self.rate = rate
+        self._origin = time.monotonic()
+
+    def now(self) -> float:
+        return self._origin + (time.monotonic() - self._origin) * self.rate
+
+
+class FakeCall:
+    """ A call waiting in a FakeClock. """
+
+    __slots__ = ("callback", "args", "cancelled")
+
+    def __init__(self, callback: Callable[..., None], args: tuple):
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+class FakeClock:
+    """
+    A clock that is also its own Scheduler, and whose time only moves when
+    advance() or run() is called. Scheduled calls run on the thread that
+    moves the clock, so a round that would take minutes finishes as fast as
+    the calls can run.
+    """
+
+    rate = float("inf")  # No real time has to pass for clock time to pass
+
+    def __init__(self, start: float = 0.0):
+        self._now = start
+        self._heap: list[tuple[float, int, FakeCall]] = []
+        self._sequence = itertools.count()  # Keeps calls with equal deadlines in FIFO order
+
+    def now(self) -> float:
+        return self._now
+
+    def call_later(self, delay: float, callback: Callable[..., None], *args) -> FakeCall:
+        call = FakeCall(callback, args)
+        heapq.heappush(self._heap, (self._now + delay, next(self._sequence), call))
+        return call
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def _run_until(self, until: float) -> int:
+        calls_run = 0
+        while self._heap and self._heap[0][0] <= until:
+            deadline, _, call = heapq.heappop(self._heap)
+            if call.cancelled:
+                continue
+
+            self._now = deadline
+            call.callback(*call.args)
+            calls_run += 1
+        return calls_run
+
+    def advance(self, seconds: float) -> int:
+        """
+        Moves the clock forward, running every call that falls due on the
+        way, including ones scheduled along the way, at its deadline.
+
+        Returns:
+            The number of calls that ran.
+        """
+        until = self._now + seconds
+        calls_run = self._run_until(until)
+        self._now = until
+        return calls_run
+
+    def run(self) -> int:
+        """
+        Runs every scheduled call, including ones scheduled along the way,
+        jumping the clock straight to each deadline, until nothing is left.
+
+        Returns:
+            The number of calls that ran.
+        """
+        return self._run_until(float("inf"))
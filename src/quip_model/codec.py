@@ -0,0 +1,108 @@
+"""
+File: codec.py
+Purpose: Turn game events into the messages sent to clients, and messages
+back into events. An encoder and a decoder are compiled for every event
+dataclass in quip_model.events when this module loads, so encoding an
+event is a single dict display, and a new event is sent without any code
+written for it.
+
+A message is a dict holding the event's class name under "event" and each
+field under its own name, except for the fields in _FIELD_SCHEMAS.
+"""
+import dataclasses
+from typing import Any, Callable
+
+from . import events
+from .events import BeginPromptVotingEvent, GameEvent, GameFullEvent
+from .prompt import Prompt
+
+EventEncoder = Callable[[GameEvent], dict[str, Any]]
+EventDecoder = Callable[[dict[str, Any]], GameEvent]
+
+
+def _prompt_from_message(message: dict[str, Any]) -> Prompt:
+    """ Rebuilds a prompt being voted on. Its players' ids aren't sent, so 0 and 1 stand in for them. """
+    prompt = Prompt(message["prompt_id"], message["prompt"], (0, 1))
+    prompt.responses[0] = message["response_0"]
+    prompt.responses[1] = message["response_1"]
+    return prompt
+
+
+_FIELD_SCHEMAS = {
+    (BeginPromptVotingEvent, "prompt"): (
+        (("prompt", "event.prompt.prompt"),
+         ("prompt_id", "event.prompt.id"),
+         # A player that missed the response deadline has no response
+         ("response_0", "event.prompt.responses.get(event.prompt.player_ids[0], '')"),
+         ("response_1", "event.prompt.responses.get(event.prompt.player_ids[1], '')")),
+        "_prompt_from_message(message)"),
+    (GameFullEvent, "game_id"): ((("game-id", "event.game_id"),), "message['game-id']"),
+}
+"""
+The fields that aren't sent as they are, by event type and field name:
+the message keys each is sent as with the expression each is encoded from,
+and the expression the field is decoded from.
+"""
+
+
+def _field_schema(event_type: type, field: dataclasses.Field) -> tuple[tuple[tuple[str, str], ...], str]:
+    schema = _FIELD_SCHEMAS.get((event_type, field.name))
+    if schema is not None:
+        return schema
+
+    encoded = ((field.name, f"event.{field.name}"),)
+    if field.default is dataclasses.MISSING:
+        return encoded, f"message[{field.name!r}]"
+    return encoded, f"message.get({field.name!r}, {field.default!r})"
+
+
+def _compile(event_type: type) -> tuple[EventEncoder, EventDecoder, tuple[str, ...]]:
+    """ Generates and compiles the encoder and decoder of an event type, and lists the keys of its messages. """
+    name = event_type.__name__
+    keys = ["event"]
+    entries = [f"'event': {name!r}"]
+    arguments = []
+    for field in dataclasses.fields(event_type):
+        encoded, decoded = _field_schema(event_type, field)
+        keys.extend(key for key, _ in encoded)
+        entries.extend(f"{key!r}: {expression}" for key, expression in encoded)
+        arguments.append(decoded)
+
+    source = (f"def encode(event):\n"
+              f"    return {{{', '.join(entries)}}}\n"
+              f"def decode(message):\n"
+              f"    return {name}({', '.join(arguments)})\n")
+    namespace = {name: event_type, "_prompt_from_message": _prompt_from_message}
+    exec(compile(source, f"<codec for {name}>", "exec"), namespace)
+    encode, decode = namespace["encode"], namespace["decode"]
+    encode.__qualname__ = f"encode_{name}"
+    decode.__qualname__ = f"decode_{name}"
+    return encode, decode, tuple(keys)
+
+
+EVENT_TYPES = tuple(value for value in vars(events).values()
+                    if isinstance(value, type) and dataclasses.is_dataclass(value)
+                    and value.__module__ == events.__name__)
+""" Every event dataclass in quip_model.events. """
+
+ENCODERS = dict[type, EventEncoder]()
+""" The encoder of each event type. """
+
+DECODERS = dict[str, EventDecoder]()
+""" The decoder of each event type, by the name messages carry under "event". """
+
+MESSAGE_KEYS = dict[type, tuple[str, ...]]()
+""" The keys of each event type's messages. """
+
+for _event_type in EVENT_TYPES:
+    ENCODERS[_event_type], DECODERS[_event_type.__name__], MESSAGE_KEYS[_event_type] = _compile(_event_type)
+
+
+def encode(event: GameEvent) -> dict[str, Any]:
+    """ Turns an event into the message sent to clients. """
+    return ENCODERS[type(event)](event)
+
+
+def decode(message: dict[str, Any]) -> GameEvent:
+    """ Turns a message sent to clients back into its event. """
+    return DECODERS[message["event"]](message)
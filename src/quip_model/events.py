@@ -4,78 +4,81 @@ from typing import Union, Callable
 from quip_model.prompt import Prompt
 
 
-@dataclass(eq=True, frozen=True)
+@dataclass(eq=True, frozen=True, slots=True)
 class PlayerJoinEvent:
     player_num: int
 
 
-@dataclass(eq=True, frozen=True)
+@dataclass(eq=True, frozen=True, slots=True)
 class PlayerLeaveEvent:
     player_num: int
 
 
-@dataclass(eq=True, frozen=True)
+@dataclass(eq=True, frozen=True, slots=True)
 class VIPLeaveEvent:
     player_num: int
 
 
-@dataclass(eq=True, frozen=True)
+@dataclass(eq=True, frozen=True, slots=True)
 class PlayerNicknameEvent:
     player_num: int
     name: str
 
 
-@dataclass(eq=True, frozen=True)
+@dataclass(eq=True, frozen=True, slots=True)
 class PlayerResponseEvent:
     player_num: int
 
 
-@dataclass(eq=True, frozen=True)
+@dataclass(eq=True, frozen=True, slots=True)
 class PlayerVoteEvent:
     nickname: str
     vote: int
 
 
-@dataclass(eq=True, frozen=True)
+@dataclass(eq=True, frozen=True, slots=True)
 class PlayerVIPEvent:
     player_num: int
 
 
-@dataclass(eq=True, frozen=True)
+@dataclass(eq=True, frozen=True, slots=True)
 class RoundStartedEvent:
     round_num: int
+    countdown: float  # Time (in clock seconds) that the players have to respond to their prompts
 
 
-@dataclass(eq=True, frozen=True)
+@dataclass(eq=True, frozen=True, slots=True)
 class DistributePromptEvent:
     player_num: int
     prompt_0: str
     prompt_1: str
     prompt_0_id: int
     prompt_1_id: int
+    countdown: float  # Time (in clock seconds) left to respond
 
 
-@dataclass(eq=True, frozen=True)
+@dataclass(eq=True, frozen=True, slots=True)
 class StopAnsweringPrompts:
     pass
 
 
-@dataclass(eq=True, frozen=True)
+@dataclass(eq=True, frozen=True, slots=True)
 class BeginVotingEvent:
     round: int
 
 
-@dataclass(eq=True, frozen=True)
+@dataclass(eq=True, frozen=True, slots=True)
 class BeginPromptVotingEvent:
     prompt: Prompt
+    countdown: float  # Time (in clock seconds) that the players have to vote
 
 
-@dataclass(eq=True, frozen=True)
+@dataclass(eq=True, frozen=True, slots=True)
 class ClientEndPromptVotingEvent:
     pass
 
 
-@dataclass(eq=True, frozen=True)
+@dataclass(eq=True, frozen=True, slots=True)
 class EndPromptVotingEvent:
     player_0_name: str
     player_0_voter_names: list[str]
@@ -90,26 +93,46 @@ class EndPromptVotingEvent:
     winner: str
     quiplasher: str
 
+    # Spectator totals for each response
+    player_0_audience_votes: int = 0
+    player_1_audience_votes: int = 0
 
-@dataclass(eq=True, frozen=True)
+
+@dataclass(eq=True, frozen=True, slots=True)
 class ScoreboardEvent:
     names_in_order: list[str]
     points_in_order: list[int]
 
-@dataclass(eq=True, frozen=True)
+@dataclass(eq=True, frozen=True, slots=True)
 class NicknameAlreadyExistsEvent:
     player_num: int
 
 
-@dataclass(eq=True, frozen=True)
+@dataclass(eq=True, frozen=True, slots=True)
 class GameFullEvent:
     game_id: int
 
 
+@dataclass(eq=True, frozen=True, slots=True)
+class AudienceJoinEvent:
+    audience_num: int
+
+
+@dataclass(eq=True, frozen=True, slots=True)
+class AudienceLeaveEvent:
+    audience_num: int
+
+
+@dataclass(eq=True, frozen=True, slots=True)
+class PlayerReconnectEvent:
+    pending_num: int
+    player_num: int
+
+
 GameEvent = Union[
     PlayerJoinEvent, PlayerLeaveEvent, PlayerResponseEvent, PlayerVoteEvent, PlayerVIPEvent,
     PlayerNicknameEvent, RoundStartedEvent, DistributePromptEvent, BeginVotingEvent,
     BeginPromptVotingEvent, EndPromptVotingEvent, VIPLeaveEvent, ScoreboardEvent, ClientEndPromptVotingEvent,
-    NicknameAlreadyExistsEvent]
+    NicknameAlreadyExistsEvent, AudienceJoinEvent, AudienceLeaveEvent, PlayerReconnectEvent]
 
 GameObserver = Callable[[GameEvent], None]
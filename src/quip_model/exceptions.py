@@ -35,6 +35,10 @@ class NotEnoughPlayers(PlayerException):
     pass
 
 
+class IdSpaceExhausted(PlayerException):
+    pass
+
+
 # PlayerList Exceptions
 class PlayerListException(Exception):
     pass
@@ -59,3 +63,30 @@ class PromptListEmpty(PromptListException):
 
 class PromptNotFound(PromptListException):
     pass
+
+
+# Audience Exceptions
+class AudienceException(Exception):
+    pass
+
+
+class AudienceFull(AudienceException):
+    pass
+
+
+class AudienceMemberNotFound(AudienceException):
+    pass
+
+
+# Snapshot Exceptions
+class SnapshotError(Exception):
+    pass
+
+
+# Server Exceptions
+class ServerException(Exception):
+    pass
+
+
+class TooManyGames(ServerException):
+    pass
@@ -1,53 +1,104 @@
 import threading
-import time
-from random import shuffle, randint, sample
+from enum import IntEnum
+from logging import getLogger
+from random import Random
+from typing import Callable
 
+from .audience import Audience
 from .events import *
 from .exceptions import *
+from .id_allocator import IdAllocator
+from .phase_barrier import PhaseBarrier, PhaseResult
 from .player import Player, PlayerList
+from .pacing import DEFAULT_PACING, GamePacing
 from .prompt import Prompt, PromptList
-from .prompts_list import prompts
+from .prompt_assignment import assign_prompts
+from .prompt_corpus import PromptCorpus, default_corpus
+from .response import PromptResponse, VoteResponse
+from .scheduler import Scheduler
 
-RESPONSE_COUNTDOWN = 60  # Time (in seconds) that the players have to respond to their prompts
-VOTE_COUNTDOWN = 15  # Time (in seconds) that the players have to vote
+logger = getLogger(__name__)
+
+AUDIENCE_VOTE_WEIGHT = 2  # The number of player votes the whole audience's vote on a prompt is worth
+
+
+class GamePhase(IntEnum):
+    """ Where a game is in its round. Stored in snapshots, so values must never be reused. """
+    LOBBY = 0  # Waiting for players to join and the VIP to start
+    RESPONSES = 1  # Players are answering their prompts
+    VOTING_START = 2  # Every answer is in, voting starts after a pause
+    VOTING = 3  # Players are voting on prompt phase_index
+    RESULTS = 4  # The results of the vote on prompt phase_index are being shown
+    SCOREBOARD = 5  # The scoreboard is being shown
+    FINISHED = 6  # The round is over
 
 
 class GameMaster:
-    def __init__(self, observer: GameObserver):
+    def __init__(self, observer: GameObserver, scheduler: Scheduler, rng: Random = None,
+                 corpus: PromptCorpus = None, checkpoint: Callable[["GameMaster"], None] = None,
+                 recorder: Callable[[str, tuple], None] = None, pacing: GamePacing = DEFAULT_PACING,
+                 ids: IdAllocator = None):
         self.players = PlayerList()
         self.pending_players = PlayerList()  # Players that have connections but nothing else
-        self.prompt_strs = prompts
         self.prompts = PromptList()
+        self.voting_prompt: Prompt | None = None  # The prompt being voted on, if any
+        self.audience = Audience()
+        self.audience_lock = threading.Lock()  # Spectator votes arrive on many threads at once
         self.round = 1
         self.observer = observer  # How we send events to the user
-        self.timer = None
+        self.scheduler = scheduler  # Runs the phase deadlines and pauses, shared by every game in the process
+        self.timer = None  # Handle to the deadline or pause of the current phase
+        self.deadline = 0.0  # The scheduler's clock time at which the responses are due, during RESPONSES
+        self.pacing = pacing  # How long each phase of this game lasts
+        self.rng = rng if rng is not None else Random()  # Pass a seeded Random to make games reproducible
+        # Where this game is in the prompt corpus shared by every game in the process
+        self.prompt_cursor = (corpus if corpus is not None else default_corpus()).cursor(self.rng)
+        # Hands out the player ids; pass one allocator to every game to make ids unique across the process
+        self.ids = ids if ids is not None else IdAllocator(rng=self.rng)
         self.is_playing = False
+        self.phase = GamePhase.LOBBY
+        self.phase_index = 0  # The prompt being voted on or shown, during VOTING and RESULTS
+        self.checkpoint = checkpoint  # Called whenever the game reaches a phase boundary, e.g. to take a snapshot
+        self.reconnecting = set[int]()  # Players restored from a snapshot that haven't reconnected yet
+        # Called with the name and arguments of every input the game receives, so it can be journaled and replayed
+        self.recorder = recorder
 
-        self.responses_received = int()
-        self.responses_received_lock = threading.Lock()
+        self.response_barrier = PhaseBarrier()  # Released once every player has answered their prompts
+        self.vote_barrier = PhaseBarrier()  # Released once every eligible player has voted on the current prompt
 
-        self.votes_received = int()
-        self.votes_received_lock = threading.Lock()
+    def _record(self, name: str, *args) -> None:
+        if self.recorder is not None:
+            self.recorder(name, args)
 
     def add_connection(self) -> int:
-        random_id = randint(1, 10000)
-
-        taken_nums = [player.id for player in self.players]
-        taken_nums.extend([player.id for player in self.pending_players])
-
-        # Prevents duplicate ID's
-        while random_id in taken_nums:
-            random_id = randint(1, 10000)
+        self._record("add_connection")
+        random_id = self.ids.allocate()
 
         # When player connects to game server, this is executed, player then needs to authenticate and enter their name
         self.pending_players.append(Player(random_id))  # Only add player to pending players list, name to be set later
         return random_id
 
-    def accept_new_player(self, player_id: int, name: str):
+    def accept_new_player(self, player_id: int, name: str) -> int:
+        """
+        Names a pending player and adds them to the game. If the name belongs
+        to a player restored from a snapshot, the connection takes that
+        player's place instead.
+
+        Returns:
+            The id of the player in the game.
+        """
+        self._record("accept_new_player", player_id, name)
         if self.players.has_player_by_name(name):  # Nicknames must be unique
+            existing = self.players.get_player_by_name(name)
+            if existing.id in self.reconnecting:
+                return self._reconnect_player(player_id, existing)
+
             self.observer(NicknameAlreadyExistsEvent(player_id))
             raise PlayerNameAlreadyInUse(f"tried to use nickname already in use: {name}.")
 
+        if self.is_playing:
+            raise PlayerNicknameError(f"{name} can't join, the game has already started.")
+
         # Get player object
         player = self.pending_players.get_player_by_id(player_id)
 
@@ -67,6 +118,30 @@ class GameMaster:
 
         # Send join event
         self.observer(PlayerJoinEvent(player_id))
+        self._checkpoint()
+        return player_id
+
+    def _reconnect_player(self, pending_id: int, player: Player) -> int:
+        """ Hands a restored player to a new connection and catches them up. """
+        self.pending_players.remove_player_by_id(pending_id)
+        self.ids.release(pending_id)
+        self.reconnecting.discard(player.id)
+        self.observer(PlayerReconnectEvent(pending_id, player.id))
+
+        if player.is_vip:
+            self.observer(PlayerVIPEvent(player.id))
+        self.observer(PlayerJoinEvent(player.id))
+
+        # Send the prompts again if the player still has to answer them
+        if self.phase == GamePhase.RESPONSES and any(player.id not in prompt.responses
+                                                     for prompt in player.current_prompts):
+            self.observer(DistributePromptEvent(player.id,
+                                                player.current_prompts[0].prompt,
+                                                player.current_prompts[1].prompt,
+                                                player.current_prompts[0].id,
+                                                player.current_prompts[1].id,
+                                                max(self.deadline - self.scheduler.now(), 0)))
+        return player.id
 
     def _handle_vip_leave(self, player: Player):
         # Publish VIP leave event
@@ -74,14 +149,14 @@ class GameMaster:
 
         # Choose a new VIP
         for new_vip in self.players:
-            print(f"trying {new_vip.name}")
+            logger.debug(f"trying {new_vip.name}")
             if new_vip.id == player.id:
-                print("rejected")
+                logger.debug("rejected")
                 continue
 
             new_vip.is_vip = True
             self.observer(PlayerVIPEvent(new_vip.id))
-            print("new vip made")
+            logger.debug("new vip made")
             break
 
     def remove_player(self, player_num: int):
@@ -93,15 +168,13 @@ class GameMaster:
         Parameters:
             player_num (int): The number/id of the player to remove.
         """
-
-        player_nums = [player.id for player in self.players]
-        pending_player_nums = [player.id for player in self.pending_players.players]
+        self._record("remove_player", player_num)
 
         player_pending = False
 
-        if player_num in player_nums:
+        if self.players.has_player_by_id(player_num):
             player = self.players.get_player_by_id(player_num)
-        elif player_num in pending_player_nums:
+        elif self.pending_players.has_player_by_id(player_num):
             player = self.pending_players.get_player_by_id(player_num)
             player_pending = True
         else:
@@ -110,75 +183,134 @@ class GameMaster:
         if player.is_vip:
             self._handle_vip_leave(player)
 
+        self.ids.release(player_num)
         if player_pending:
             self.pending_players.remove_player_by_id(player_num)
         else:
             self.players.remove_player_by_id(player_num)
+            self.reconnecting.discard(player_num)
 
-    def _choose_two_prompts(self, player: Player, available_prompts: list[str],
-                            prompt_pairings: dict[str, list[int]]) -> None:
+            # Don't hold the current phase open for a player that is gone
+            self.response_barrier.discard(player_num)
+            self.vote_barrier.discard(player_num)
+            self._checkpoint()
 
-        choices_made = 0
+    def receive_responses(self, player_id: int, responses: tuple[PromptResponse, PromptResponse]) -> None:
+        """
+        Stores a player's answers to their two prompts and checks them in for
+        the response phase.
 
-        while choices_made < 2:
-            random_prompt = sample(available_prompts, k=1)[0]
-            if player.id in prompt_pairings[random_prompt] or len(prompt_pairings[random_prompt]) == 2:
-                continue
+        Parameters:
+            player_id (int): The player who answered.
+            responses (tuple[PromptResponse, PromptResponse]): The answers, one per prompt.
+        """
+        self._record("receive_responses", player_id, *((response.prompt_id, response.player_response)
+                                                       for response in responses))
+        self.observer(PlayerResponseEvent(player_id))
 
-            empty_available = False
+        player = self.players.get_player_by_id(player_id)
+        answered_prompts = [self.prompts.get_prompt_by_id(response.prompt_id) for response in responses]
+        for prompt, response in zip(answered_prompts, responses):
+            prompt.receive_response(response)
+        player.current_prompts = answered_prompts
 
-            for id_list in prompt_pairings.values():
-                if len(id_list) == 0:
-                    empty_available = True
-                    break
+        self.response_barrier.arrive(player_id)
 
-            if empty_available and len(prompt_pairings[random_prompt]) != 0:
-                continue
+    def receive_vote(self, vote: VoteResponse) -> None:
+        """
+        Stores a player's vote and checks them in for the current vote, so
+        the game moves on as soon as the last vote is in.
+        """
+        self._record("receive_vote", vote.prompt_id, vote.player_id, vote.vote)
+        player = self.players.get_player_by_id(vote.player_id)
+        prompt = self.prompts.get_prompt_by_id(vote.prompt_id)
 
-            prompt_pairings[random_prompt].append(player.id)
-            choices_made += 1
-            print(f"choices made: {choices_made}")
+        prompt.receive_vote(vote)
 
-    def distribute_prompts(self) -> None:
+        # Publish vote event with player name and vote, once the vote is known to count
+        self.observer(PlayerVoteEvent(player.name, vote.vote))
+        self.vote_barrier.arrive(vote.player_id)
+
+    def add_audience_member(self) -> int:
         """
-        Create prompt assignments and distribute them.
+        Seats a new spectator. Spectators can watch and vote but do not play.
+
+        Returns:
+            The spectator's seat number.
+        """
+        self._record("add_audience_member")
+        with self.audience_lock:
+            return self.audience.join()
+
+    def remove_audience_member(self, seat: int) -> None:
+        self._record("remove_audience_member", seat)
+        with self.audience_lock:
+            self.audience.leave(seat)
+            # A spectator's vote only counts while they watch; the seat may go to someone else, or back to them
+            if self.voting_prompt is not None:
+                self.voting_prompt.release_audience_seat(seat)
+        self.observer(AudienceLeaveEvent(seat))
+
+    def receive_audience_vote(self, seat: int, prompt_id: int, vote: int) -> None:
         """
+        Counts a spectator's vote on the prompt currently being voted on.
 
-        available_prompts = sample(list(self.prompt_strs), k=len(self.players))
+        Parameters:
+            seat (int): The seat of the spectator who voted.
+            prompt_id (int): The prompt the spectator voted on.
+            vote (int): The response that the spectator voted for (0 or 1).
+        """
+        self._record("receive_audience_vote", seat, prompt_id, vote)
+        with self.audience_lock:
+            if seat not in self.audience:
+                raise PlayerVoteError(f"Spectator {seat} is not in the audience!")
 
-        prompt_pairings = dict[str, list[int]]()
+            prompt = self.voting_prompt
+            if prompt is None or prompt.id != prompt_id:
+                raise PlayerVoteError(f"Prompt {prompt_id} is not open for voting!")
 
-        for prompt in available_prompts:
-            prompt_pairings[prompt] = list[int]()
+            prompt.receive_audience_vote(seat, vote)
 
-        shuffle(self.players.players)
+    def distribute_prompts(self) -> None:
+        """
+        Create prompt assignments and distribute them.
+        """
 
-        for player in self.players.players:
-            self._choose_two_prompts(player, available_prompts, prompt_pairings)
+        player_pairs = assign_prompts([player.id for player in self.players], self.rng)
+        available_prompts = self.prompt_cursor.draw(len(player_pairs))
 
-        for index, prompt in enumerate(prompt_pairings.keys()):
-            prompt_object = Prompt(index, prompt, prompt_pairings[prompt])
+        for index, (prompt, player_ids) in enumerate(zip(available_prompts, player_pairs)):
+            prompt_object = Prompt(index, prompt, player_ids)
             self.prompts.append(prompt_object)
-            for player_id in prompt_pairings[prompt]:
+            for player_id in player_ids:
                 player = self.players.get_player_by_id(player_id)
                 player.current_prompts.append(prompt_object)
 
-        for player in self.players.players:
+        for player in self.players:
             self.observer(DistributePromptEvent(player.id,
                                                 player.current_prompts[0].prompt,
                                                 player.current_prompts[1].prompt,
                                                 player.current_prompts[0].id,
-                                                player.current_prompts[1].id))
+                                                player.current_prompts[1].id,
+                                                self.pacing.response_countdown))
 
     def calculate_points(self, prompt: Prompt) -> None:
         # Get player objects
         player_0 = self.players.get_player_by_id(prompt.player_ids[0])
         player_1 = self.players.get_player_by_id(prompt.player_ids[1])
 
-        # Get the number of votes for each player
+        # Get the number of votes for each player, with the audience's share folded in
         player_0_votes = len(prompt.votes[player_0.id])
         player_1_votes = len(prompt.votes[player_1.id])
 
+        with self.audience_lock:
+            player_0_audience_votes, player_1_audience_votes = prompt.audience_votes
+
+        total_audience_votes = player_0_audience_votes + player_1_audience_votes
+        if total_audience_votes > 0:
+            player_0_votes += AUDIENCE_VOTE_WEIGHT * player_0_audience_votes / total_audience_votes
+            player_1_votes += AUDIENCE_VOTE_WEIGHT * player_1_audience_votes / total_audience_votes
+
         # Get the names of the voters for each player
         player_0_voter_names = list[str]()
         for voter_num in prompt.votes[player_0.id]:
@@ -230,11 +362,12 @@ class GameMaster:
         # Add the points to the event
         self.observer(EndPromptVotingEvent(player_0.name, player_0_voter_names, player_0_points_awarded,
                                            player_1.name, player_1_voter_names, player_1_points_awarded,
-                                           tie, winner, quiplasher))
+                                           tie, winner, quiplasher,
+                                           player_0_audience_votes, player_1_audience_votes))
 
     def handle_scoreboard(self):
         # Gets the list of players sorted by descending points order
-        sorted_players = sorted(self.players.players, key=lambda player: player.points, reverse=True)
+        sorted_players = sorted(self.players, key=lambda player: player.points, reverse=True)
 
         # Get separate lists of names and points from ordered list
         sorted_player_names = [player.name for player in sorted_players]
@@ -243,67 +376,125 @@ class GameMaster:
         # Publish scoreboard event
         self.observer(ScoreboardEvent(sorted_player_names, sorted_player_points))
 
-    def wait_for_responses(self):
-        countdown = 60
-        while countdown > 0:
-            with self.responses_received_lock:
-                if self.responses_received == len(self.players):
-                    self.responses_received = 0
-                    break
-            countdown -= 1
-            time.sleep(1)
-        
-        with self.responses_received_lock:
-            self.responses_received = 0
-
-
-    def wait_for_votes(self):
-        countdown = 15
-        while countdown > 0:
-            with self.votes_received_lock:
-                if self.votes_received == len(self.players) - 2:
-                    self.votes_received = 0
-                    break
-
-            time.sleep(1)
-            countdown -= 1
-        with self.votes_received_lock:
-            self.votes_received = 0
-        self.observer(ClientEndPromptVotingEvent())
+    def _cancel_timer(self) -> None:
+        """ Cancels the deadline of the phase that just ended, if it hasn't fired yet. """
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+    def stop(self) -> None:
+        """ Stops the game where it is, e.g. because the server dropped it; its pending deadline never fires. """
+        self._cancel_timer()
+
+    def _checkpoint(self) -> None:
+        if self.checkpoint is not None:
+            # A snapshot that fails is logged and skipped; it mustn't keep the game from moving on
+            try:
+                self.checkpoint(self)
+            except Exception:
+                logger.exception("checkpoint failed")
+
+    def _enter_phase(self, phase: GamePhase, index: int = 0) -> None:
+        self.phase = phase
+        self.phase_index = index
+        self._checkpoint()
+
+    def resume(self) -> None:
+        """
+        Picks a game restored from a snapshot back up where it left off,
+        re-arming the deadline or pause of the phase it was in. Players
+        that already answered or voted are not asked again.
+        """
+        match self.phase:
+            case GamePhase.RESPONSES:
+                unanswered = {player_id for prompt in self.prompts for player_id in prompt.player_ids
+                              if player_id not in prompt.responses and self.players.has_player_by_id(player_id)}
+                self.response_barrier.open(unanswered, self._end_responses, on_open=self._arm_response_deadline)
+            case GamePhase.VOTING_START:
+                self.timer = self.scheduler.call_later(self.pacing.voting_start_pause, self._begin_voting)
+            case GamePhase.VOTING:
+                self._begin_prompt_vote(self.phase_index)
+            case GamePhase.RESULTS:
+                self.timer = self.scheduler.call_later(self.pacing.results_pause, self._begin_prompt_vote,
+                                                       self.phase_index + 1)
+            case GamePhase.SCOREBOARD:
+                self.timer = self.scheduler.call_later(self.pacing.scoreboard_pause, self._end_round)
 
     def play_round(self):
+        """
+        Starts a round and returns right away. Each phase ends when its
+        barrier is released, either by the last player checking in or by the
+        deadline the scheduler fires, and then schedules the next one.
+        """
+        self._record("play_round")
         # Start the round
-        self.observer(RoundStartedEvent(self.round))
+        self.observer(RoundStartedEvent(self.round, self.pacing.response_countdown))
         self.is_playing = True
+        self.phase = GamePhase.RESPONSES
 
-        # Distribute prompts
+        # Distribute prompts, listening for answers before anyone can send one
+        self.response_barrier.open((player.id for player in self.players), self._end_responses,
+                                   on_open=self._arm_response_deadline)
         self.distribute_prompts()
+        self._checkpoint()
 
-        print("ALL PROMPTS DISTRIBUTED")
+        logger.debug("ALL PROMPTS DISTRIBUTED")
 
-        # Wait for responses to come back
-        self.wait_for_responses()
+    def _arm_response_deadline(self, generation: int) -> None:
+        self.deadline = self.scheduler.now() + self.pacing.response_countdown
+        self.timer = self.scheduler.call_later(self.pacing.response_countdown, self.response_barrier.expire,
+                                               generation)
 
-        time.sleep(2)
+    def _end_responses(self, result: PhaseResult):
+        self._cancel_timer()
+        if result.timed_out:
+            logger.debug(f"PLAYERS {sorted(result.missing)} DID NOT RESPOND IN TIME")
 
-        print("ALL RESPONSES RECEIVED")
+        logger.debug("ALL RESPONSES RECEIVED")
 
-        self.observer(BeginVotingEvent(self.round))
-
-        for prompt in self.prompts:
-            # Start the voting for this prompt
-            self.observer(BeginPromptVotingEvent(prompt))
-
-            self.wait_for_votes()
+        self._enter_phase(GamePhase.VOTING_START)
+        self.timer = self.scheduler.call_later(self.pacing.voting_start_pause, self._begin_voting)
 
-            self.calculate_points(prompt)
-
-            time.sleep(5)
+    def _begin_voting(self):
+        self.observer(BeginVotingEvent(self.round))
+        self._begin_prompt_vote(0)
+
+    def _begin_prompt_vote(self, index: int):
+        if index == len(self.prompts):
+            self.handle_scoreboard()
+            self._enter_phase(GamePhase.SCOREBOARD)
+            self.timer = self.scheduler.call_later(self.pacing.scoreboard_pause, self._end_round)
+            return
+
+        prompt = self.prompts[index]
+
+        # Start the voting for this prompt; the players who wrote the responses, or already voted, don't vote
+        voter_ids = (player.id for player in self.players
+                     if player.id not in prompt.player_ids and player.id not in prompt.voters)
+        self.voting_prompt = prompt
+        self._enter_phase(GamePhase.VOTING, index)
+        # Announced, and its deadline armed, before the barrier opens, as it is released on the spot if nobody votes
+        self.observer(BeginPromptVotingEvent(prompt, self.pacing.vote_countdown))
+        self.vote_barrier.open(voter_ids, lambda result: self._end_prompt_vote(index, result),
+                               on_open=self._arm_vote_deadline)
+
+    def _arm_vote_deadline(self, generation: int) -> None:
+        self.timer = self.scheduler.call_later(self.pacing.vote_countdown, self.vote_barrier.expire, generation)
+
+    def _end_prompt_vote(self, index: int, result: PhaseResult):
+        self._cancel_timer()
+        self.voting_prompt = None
+        if result.timed_out:
+            logger.debug(f"PLAYERS {sorted(result.missing)} DID NOT VOTE IN TIME")
 
-            print("PROMPT VOTE DONE")
+        self.observer(ClientEndPromptVotingEvent())
+        self.calculate_points(self.prompts[index])
 
-        self.handle_scoreboard()
+        logger.debug("PROMPT VOTE DONE")
 
-        time.sleep(5)
+        self._enter_phase(GamePhase.RESULTS, index)
+        self.timer = self.scheduler.call_later(self.pacing.results_pause, self._begin_prompt_vote, index + 1)
 
-        print("ALL VOTING DONE")
+    def _end_round(self):
+        logger.debug("ALL VOTING DONE")
+        self._enter_phase(GamePhase.FINISHED)
@@ -0,0 +1,114 @@
+"""
+File: id_allocator.py
+Purpose: Hand out player ids that can't be guessed from the ones already
+given out, in constant time no matter how many are taken.
+"""
+import threading
+from random import Random
+
+from .exceptions import IdSpaceExhausted
+
+PLAYER_ID_SPACE = 10000  # Player ids are drawn from 1 to this, per game
+PROCESS_ID_SPACE = 2 ** 31 - 1  # Player ids are drawn from 1 to this when one allocator is shared by every game
+
+
+class IdAllocator:
+    """
+    Draws ids uniformly at random from the ids in 1..capacity that are not
+    taken. The free ids are kept in a Fisher-Yates style array: an id is
+    drawn by picking a random slot among the free ones and moving the last
+    free id into it, and given back by appending it. Only the slots that
+    have been touched are stored, so a large id space costs nothing up
+    front, and allocate, release and reserve all take constant time.
+    """
+
+    __slots__ = ("capacity", "_rng", "_free", "_slot_ids", "_id_slots", "_lock")
+
+    def __init__(self, capacity: int = PLAYER_ID_SPACE, rng: Random = None):
+        """
+        Parameters:
+            capacity (int): The largest id; ids are drawn from 1 to capacity.
+            rng (Random): Draws the ids. Pass the game's seeded Random to make them reproducible.
+        """
+        self.capacity = capacity
+        self._rng = rng if rng is not None else Random()
+
+        self._free = capacity
+        """ The number of free ids, which are the ones in slots 0 to _free - 1. """
+
+        self._slot_ids = dict[int, int]()
+        """ The id in each slot that no longer holds its own id; slot n starts out holding id n + 1. """
+
+        self._id_slots = dict[int, int]()
+        """ The inverse of _slot_ids, for the ids that have moved. Taken ids sit in slots at or past _free. """
+
+        self._lock = threading.Lock()  # A process-wide allocator is shared by games running on different threads
+
+    def _id_at(self, slot: int) -> int:
+        return self._slot_ids.get(slot, slot + 1)
+
+    def _slot_of(self, id_: int) -> int:
+        return self._id_slots.get(id_, id_ - 1)
+
+    def _place(self, slot: int, id_: int) -> None:
+        if id_ == slot + 1:
+            self._slot_ids.pop(slot, None)
+            self._id_slots.pop(id_, None)
+        else:
+            self._slot_ids[slot] = id_
+            self._id_slots[id_] = slot
+
+    def _take(self, slot: int) -> int:
+        """ Swaps the id in a free slot with the last free id, and marks it taken. """
+        self._free -= 1
+        last = self._free
+        id_ = self._id_at(slot)
+        self._place(slot, self._id_at(last))
+        self._place(last, id_)
+        return id_
+
+    def allocate(self) -> int:
+        """ Takes a random free id. If every id is taken, an exception is thrown. """
+        with self._lock:
+            if self._free == 0:
+                raise IdSpaceExhausted(f"All {self.capacity} ids are taken.")
+            return self._take(self._rng.randrange(self._free))
+
+    def reserve(self, id_: int) -> bool:
+        """
+        Takes a particular id, e.g. one restored from a snapshot.
+
+        Returns:
+            False if the id was already taken.
+        """
+        with self._lock:
+            if not 1 <= id_ <= self.capacity:
+                raise ValueError(f"Id {id_} is outside of 1 to {self.capacity}.")
+            slot = self._slot_of(id_)
+            if slot >= self._free:
+                return False
+            self._take(slot)
+            return True
+
+    def release(self, id_: int) -> None:
+        """ Gives an id back. If the id is not taken, an exception is thrown. """
+        with self._lock:
+            if not 1 <= id_ <= self.capacity or self._slot_of(id_) < self._free:
+                raise ValueError(f"Id {id_} is not taken.")
+            slot = self._slot_of(id_)
+
+            # Swap it with the first taken id, then count that slot as free
+            first_taken = self._free
+            other = self._id_at(first_taken)
+            self._place(slot, other)
+            self._place(first_taken, id_)
+            self._free += 1
+
+    def __contains__(self, id_: int) -> bool:
+        """ Whether an id is taken. """
+        with self._lock:
+            return 1 <= id_ <= self.capacity and self._slot_of(id_) >= self._free
+
+    def __len__(self) -> int:
+        """ The number of ids taken. """
+        return self.capacity - self._free
@@ -0,0 +1,163 @@
+"""
+File: journal.py
+Purpose: Define the record format of game journals. A journal holds the
+inputs a GameMaster received and the events it published, each stamped
+with the time since the game started, so a game can be replayed exactly.
+
+A journal is a sequence of records, each a u32 little-endian length
+followed by a marshalled tuple:
+    (RECORD_HEADER, version, game id, seed, corpus fingerprint, wall clock start, snapshot or None,
+     pacing)
+    (RECORD_INPUT, elapsed, input code, arguments)
+    (RECORD_EVENT, elapsed, event code, fields)
+Input and event codes are indexes into INPUTS and EVENT_TYPES, which may
+only ever be appended to.
+"""
+import marshal
+import struct
+from dataclasses import astuple, dataclass, fields
+from operator import attrgetter
+from typing import Callable, Iterator
+
+from .events import *
+from .pacing import DEFAULT_PACING, GamePacing
+from .response import PromptResponse, VoteResponse
+
+JOURNAL_VERSION = 2
+
+RECORD_HEADER = 0
+RECORD_INPUT = 1
+RECORD_EVENT = 2
+
+INPUTS = ("add_connection", "accept_new_player", "remove_player", "receive_responses", "receive_vote",
+          "add_audience_member", "remove_audience_member", "receive_audience_vote", "play_round")
+""" The GameMaster methods that are journaled as inputs. """
+
+EVENT_TYPES = (PlayerJoinEvent, PlayerLeaveEvent, VIPLeaveEvent, PlayerNicknameEvent, PlayerResponseEvent,
+               PlayerVoteEvent, PlayerVIPEvent, RoundStartedEvent, DistributePromptEvent, BeginVotingEvent,
+               BeginPromptVotingEvent, ClientEndPromptVotingEvent, EndPromptVotingEvent, ScoreboardEvent,
+               NicknameAlreadyExistsEvent, GameFullEvent, AudienceJoinEvent, AudienceLeaveEvent,
+               PlayerReconnectEvent)
+""" The events that can be journaled. """
+
+_LENGTH = struct.Struct("<I")
+_INPUT_CODES = {name: code for code, name in enumerate(INPUTS)}
+_EVENT_CODES = {event_type: code for code, event_type in enumerate(EVENT_TYPES)}
+
+
+def _fields_getter(event_type: type) -> Callable[[GameEvent], tuple]:
+    """ Builds a function that gets an event's fields as a tuple, in one C call where possible. """
+    names = tuple(field.name for field in fields(event_type))
+    if not names:
+        return lambda event: ()
+
+    getter = attrgetter(*names)
+    if len(names) == 1:
+        return lambda event: (getter(event),)
+    return getter
+
+
+_EVENT_FIELDS = {event_type: _fields_getter(event_type) for event_type in EVENT_TYPES}
+# The prompt is stood in for by its id
+_EVENT_FIELDS[BeginPromptVotingEvent] = lambda event: (event.prompt.id, event.countdown)
+
+
+@dataclass(eq=True, frozen=True, slots=True)
+class JournalHeader:
+    """ The first record of a journal, with what is needed to rebuild the game. """
+
+    game_id: str | None
+    """ The game the journal belongs to. """
+
+    seed: int
+    """ The seed of the game's Random, so the replay draws the same ids and prompts. """
+
+    corpus_fingerprint: int
+    """ The fingerprint of the prompt corpus the game drew from. """
+
+    started: float
+    """ The wall clock time the journal was started, for people reading it. """
+
+    snapshot: bytes | None = None
+    """ The snapshot the game was restored from, if it didn't start empty. """
+
+    pacing: GamePacing = DEFAULT_PACING
+    """ The game's deadlines and pauses, so the replay's fall at the same times. """
+
+
+def _frame(record: tuple) -> bytes:
+    payload = marshal.dumps(record)
+    return _LENGTH.pack(len(payload)) + payload
+
+
+def encode_header(header: JournalHeader) -> bytes:
+    return _frame((RECORD_HEADER, JOURNAL_VERSION, header.game_id, header.seed, header.corpus_fingerprint,
+                   header.started, header.snapshot, astuple(header.pacing)))
+
+
+def encode_input(elapsed: float, name: str, args: tuple) -> bytes:
+    return _frame((RECORD_INPUT, elapsed, _INPUT_CODES[name], args))
+
+
+def event_fields(event: GameEvent) -> tuple:
+    """ Flattens an event into plain values; a prompt is stood in for by its id. """
+    return _EVENT_FIELDS[type(event)](event)
+
+
+def encode_event(elapsed: float, event: GameEvent) -> bytes:
+    event_type = type(event)
+    return _frame((RECORD_EVENT, elapsed, _EVENT_CODES[event_type], _EVENT_FIELDS[event_type](event)))
+
+
+def event_code(event: GameEvent) -> int:
+    return _EVENT_CODES[type(event)]
+
+
+def read_records(data: bytes) -> Iterator[tuple]:
+    """
+    Decodes the records in a journal. A record cut short, e.g. by a crash
+    before the last write finished, ends the journal.
+
+    Returns:
+        The records, with input codes turned back into method names.
+    """
+    view = memoryview(data)
+    offset = 0
+    while offset + _LENGTH.size <= len(view):
+        (length,) = _LENGTH.unpack_from(view, offset)
+        offset += _LENGTH.size
+        if offset + length > len(view):
+            return
+
+        record = marshal.loads(view[offset:offset + length])
+        offset += length
+        if record[0] == RECORD_INPUT:
+            record = (RECORD_INPUT, record[1], INPUTS[record[2]], record[3])
+        yield record
+
+
+def read_header(record: tuple) -> JournalHeader:
+    if record[0] != RECORD_HEADER:
+        raise ValueError("Journal does not start with a header.")
+    if record[1] != JOURNAL_VERSION:
+        raise ValueError(f"Can't read version {record[1]} journals, only version {JOURNAL_VERSION}.")
+    game_id, seed, corpus_fingerprint, started, snapshot, pacing = record[2:]
+    return JournalHeader(game_id, seed, corpus_fingerprint, started, snapshot, GamePacing(*pacing))
+
+
+def apply_input(game, name: str, args: tuple):
+    """
+    Calls the GameMaster method a journaled input came from.
+
+    Returns:
+        What the method returned.
+    """
+    match name:
+        case "receive_responses":
+            player_id, (prompt_0_id, response_0), (prompt_1_id, response_1) = args
+            return game.receive_responses(player_id, (PromptResponse(prompt_0_id, player_id, response_0),
+                                                      PromptResponse(prompt_1_id, player_id, response_1)))
+        case "receive_vote":
+            return game.receive_vote(VoteResponse(*args))
+        case _:
+            return getattr(game, name)(*args)
@@ -0,0 +1,40 @@
+"""
+File: pacing.py
+Purpose: Define how long each phase of a game lasts. Every game carries its
+own pacing, so games with different timings can share a server.
+"""
+from dataclasses import dataclass, replace
+
+
+@dataclass(eq=True, frozen=True, slots=True)
+class GamePacing:
+    """ The deadlines and pauses of a game, in clock seconds. """
+
+    response_countdown: float = 60
+    """ Time that the players have to respond to their prompts. """
+
+    vote_countdown: float = 15
+    """ Time that the players have to vote on a prompt. """
+
+    voting_start_pause: float = 2
+    """ Time between the last response and the start of voting. """
+
+    results_pause: float = 5
+    """ Time that the results of a prompt vote are shown. """
+
+    scoreboard_pause: float = 5
+    """ Time that the scoreboard is shown at the end of a round. """
+
+DEFAULT_PACING = GamePacing()
+
+
+def parse_pacing(config: str, base: GamePacing = DEFAULT_PACING) -> GamePacing:
+    """
+    Parses a pacing from text like "response_countdown=90,vote_countdown=20".
+    Anything not mentioned is taken from base.
+    """
+    settings = dict[str, float]()
+    for entry in filter(None, (entry.strip() for entry in config.split(","))):
+        name, _, seconds = entry.partition("=")
+        settings[name.strip()] = float(seconds)
+    return replace(base, **settings)
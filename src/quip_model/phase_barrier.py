@@ -0,0 +1,138 @@
+"""
+File: phase_barrier.py
+Purpose: Define a barrier that ends a game phase as soon as every expected
+player has checked in, or once the phase deadline passes.
+"""
+import threading
+from dataclasses import dataclass
+from typing import Callable, Iterable
+
+
+@dataclass(eq=True, frozen=True, slots=True)
+class PhaseResult:
+    """ The outcome of a phase once its barrier has been released. """
+
+    arrived: frozenset[int]
+    """ The ids of the players that checked in before the phase ended. """
+
+    missing: frozenset[int]
+    """ The ids of the players that missed the deadline. """
+
+    timed_out: bool
+    """ True if the phase ended because the deadline passed. """
+
+
+PhaseCallback = Callable[[PhaseResult], None]
+
+
+class PhaseBarrier:
+    """
+    A PhaseBarrier is opened at the start of a phase with the ids of the
+    players that are expected to check in and a callback to run when the
+    phase ends. Network handlers call arrive() as messages come in and the
+    game's scheduler calls expire() when the deadline passes. Whichever
+    happens first releases the barrier; the callback runs exactly once, on
+    the thread that released it.
+    """
+
+    def __init__(self):
+        """ Creates a new, closed PhaseBarrier. """
+        self._lock = threading.Lock()
+
+        self._expected = set[int]()
+        """ The ids of the players that have not yet checked in. """
+
+        self._arrived = set[int]()
+        """ The ids of the players that have checked in. """
+
+        self._on_release: PhaseCallback | None = None
+        """ Called once the phase ends. None while the barrier is closed. """
+
+        self._generation = 0
+        """ Counts the phases, so a deadline from an old phase can't end a new one. """
+
+    def open(self, player_ids: Iterable[int], on_release: PhaseCallback,
+             on_open: Callable[[int], None] = None) -> int:
+        """
+        Starts a new phase, forgetting any arrivals from the previous one.
+
+        Parameters:
+            player_ids (Iterable[int]): The players expected to check in.
+            on_release (PhaseCallback): Called with the PhaseResult once the phase ends.
+            on_open (Callable): Called with the generation of the new phase before the barrier can be released, e.g.
+                to arm its deadline, so on_release always comes after it; even when nobody is expected.
+
+        Returns:
+            The generation of the new phase, to be passed to expire().
+        """
+        with self._lock:
+            self._expected = set(player_ids)
+            self._arrived = set[int]()
+            self._on_release = on_release
+            self._generation += 1
+            generation = self._generation
+            if on_open is not None:
+                on_open(generation)
+
+        # Nobody to wait for, e.g. every other player left the game
+        self._release_if_complete()
+        return generation
+
+    def arrive(self, player_id: int) -> bool:
+        """
+        Records that a player has checked in for the current phase. Releases
+        the barrier if this was the last expected player.
+
+        Returns:
+            True if the arrival was counted, False if the barrier is closed or
+            the player was not expected.
+        """
+        with self._lock:
+            if self._on_release is None or player_id not in self._expected:
+                return False
+
+            self._expected.discard(player_id)
+            self._arrived.add(player_id)
+
+        self._release_if_complete()
+        return True
+
+    def discard(self, player_id: int) -> None:
+        """ Stops waiting on a player, e.g. because they left the game. """
+        with self._lock:
+            self._expected.discard(player_id)
+
+        self._release_if_complete()
+
+    def expire(self, generation: int) -> None:
+        """
+        Ends the phase because its deadline has passed. Does nothing if the
+        phase has already ended.
+
+        Parameters:
+            generation (int): The generation returned by open() for this phase.
+        """
+        with self._lock:
+            if generation != self._generation:
+                return
+            callback, result = self._close(timed_out=True)
+
+        if callback is not None:
+            callback(result)
+
+    def _close(self, timed_out: bool) -> tuple[PhaseCallback | None, PhaseResult | None]:
+        """ Closes the barrier. Must be called with the lock held. """
+        callback, self._on_release = self._on_release, None
+        if callback is None:
+            return None, None
+
+        return callback, PhaseResult(frozenset(self._arrived), frozenset(self._expected), timed_out)
+
+    def _release_if_complete(self) -> None:
+        with self._lock:
+            if self._expected:
+                return
+            callback, result = self._close(timed_out=False)
+
+        if callback is not None:
+            callback(result)
@@ -4,6 +4,8 @@ from .response import PromptResponse
 
 
 class Player:
+    __slots__ = ("id", "name", "points", "ready", "current_prompts", "is_vip")
+
     def __init__(self, id: int):
         self.id = id
         self.name: str = None
@@ -37,11 +39,42 @@ class Player:
 class PlayerList:
     """
     Custom list class to provide extra methods for referencing Players.
+    Players are kept in a dict keyed by id, which preserves insertion order,
+    alongside an index of case-folded nicknames, so lookups, membership
+    checks and removals are constant-time. Lookups by position go through
+    a list of the players and their positions, which a removal or a sort
+    only marks stale; it is rebuilt when next needed.
     """
 
+    __slots__ = ("_players", "_names", "_ordered")
+
     def __init__(self) -> None:
-        """ Creates a new PlayerList initialized with a blank list. """
-        self.players: list[Player] = list()
+        """ Creates a new, empty PlayerList. """
+        self._players: dict[int, Player] = dict()
+        """ The players in insertion (or last sorted) order, keyed by id. """
+
+        self._names: dict[str, Player] = dict()
+        """ The named players, keyed by case-folded nickname. """
+
+        self._ordered: tuple[list[Player], dict[int, int]] | None = ([], {})
+        """ The players in order, and the position of each by id; None while stale. """
+
+    @property
+    def players(self) -> list[Player]:
+        """ A snapshot of the players, in order. """
+        return list(self._players.values())
+
+    def _index(self) -> tuple[list[Player], dict[int, int]]:
+        """ The players in order, and the position of each by id, rebuilt if a removal or sort made them stale. """
+        ordered = self._ordered
+        if ordered is None:
+            order = list(self._players.values())
+            ordered = self._ordered = order, {player.id: index for index, player in enumerate(order)}
+        return ordered
+
+    @staticmethod
+    def _name_key(nickname: str) -> str:
+        return nickname.casefold()
 
     def get_player_by_id(self, player_id: int) -> Player:
         """
@@ -54,18 +87,18 @@ class PlayerList:
             The specified player.
             If the player is not in the list, an exception is thrown.
         """
-        if len(self.players) == 0:
+        if len(self._players) == 0:
             raise PlayerListEmpty()
 
-        for player in self.players:
-            if player.id == player_id:
-                return player
-
-        raise PlayerNotFound(f"Player {player_id} does not exist!")
+        try:
+            return self._players[player_id]
+        except KeyError:
+            raise PlayerNotFound(f"Player {player_id} does not exist!") from None
 
     def get_player_by_name(self, nickname: str) -> Player:
         """
-        Gets a player from a PlayerList by the player's nickname.
+        Gets a player from a PlayerList by the player's nickname. Nicknames
+        are compared case-insensitively.
 
         Parameters:
             nickname (str): The name of the player to get.
@@ -74,61 +107,69 @@ class PlayerList:
             The specified player.
             If the player is not in the list, an exception is thrown.
         """
-        if len(self.players) == 0:
+        if len(self._players) == 0:
             raise PlayerListEmpty()
 
-        for player in self.players:
-            if player.name == nickname:
-                return player
-
-        raise PlayerNotFound(f"Player {nickname} does not exist!")
+        try:
+            return self._names[self._name_key(nickname)]
+        except KeyError:
+            raise PlayerNotFound(f"Player {nickname} does not exist!") from None
 
     def __len__(self) -> int:
-        return len(self.players)
+        return len(self._players)
 
     def append(self, player: Player) -> None:
-        self.players.append(player)
+        self._players[player.id] = player
+        ordered = self._ordered
+        if ordered is not None:
+            order, positions = ordered
+            if player.id in positions:
+                # A player with the same id is replaced where it stands
+                order[positions[player.id]] = player
+            else:
+                positions[player.id] = len(order)
+                order.append(player)
+        if player.name is not None:
+            self._names[self._name_key(player.name)] = player
 
     def __contains__(self, player: Player) -> bool:
-        return player in self.players
+        return self._players.get(player.id) is player
 
     def __iter__(self):
+        # Iterate over a snapshot so another thread can add or remove players meanwhile
         return iter(self.players)
 
     def __getitem__(self, index: int) -> Player:
-        if isinstance(index, slice):
-            return [self.players[i] for i in range(*index.indices(len(self.players)))]
-        else:
-            return self.players[index]
+        return self._index()[0][index]
 
     def pop(self, index: int) -> Player:
-        return self.players.pop(index)
+        return self.remove_player_by_id(self._index()[0][index].id)
 
     def has_player_by_name(self, name: str) -> bool:
-        try:
-            self.get_player_by_name(name)
-            return True
-        except PlayerListException:
-            return False
+        return self._name_key(name) in self._names
 
     def has_player_by_id(self, player_id: int) -> bool:
-        try:
-            self.get_player_by_id(player_id)
-            return True
-        except PlayerListException:
-            return False
+        return player_id in self._players
 
     def get_index_by_id(self, player_id: int) -> int:
-        for index in range(len(self.players)):
-            if self.players[index].id == player_id:
-                return index
+        if player_id not in self._players:
+            raise PlayerNotFound(f"Player {player_id} not found!")
 
-        raise PlayerNotFound(f"Player {player_id} not found!")
+        return self._index()[1][player_id]
 
     def remove_player_by_id(self, player_id: int) -> Player:
-        index = self.get_index_by_id(player_id)
-        return self.pop(index)
+        try:
+            player = self._players.pop(player_id)
+        except KeyError:
+            raise PlayerNotFound(f"Player {player_id} not found!") from None
+
+        if player.name is not None and self._names.get(self._name_key(player.name)) is player:
+            del self._names[self._name_key(player.name)]
+        self._ordered = None
+        return player
 
     def sort(self):
         """ Sorts by score. """
-        self.players.sort(key=lambda player: player.points, reverse=True)
+        ordered = sorted(self._players.values(), key=lambda player: player.points, reverse=True)
+        self._players = {player.id: player for player in ordered}
+        self._ordered = None
@@ -3,6 +3,8 @@ File: prompt.py
 Author: Jason Dech (jasonmdech@vt.edu)
 Created: 4 November 2023
 """
+from array import array
+
 from .exceptions import *
 from .response import *
 
@@ -13,7 +15,10 @@ class Prompt:
     well as the players involved in the prompt and their involvement.
     """
 
-    def __init__(self, id: int, prompt: str, player_ids: list[int]):
+    __slots__ = ("id", "prompt", "player_ids", "responses", "votes", "voters", "audience_votes", "audience_voters",
+                 "audience_choices")
+
+    def __init__(self, id: int, prompt: str, player_ids: tuple[int, int]):
         """
         Creates a new Prompt. A freshly created prompt should only have the
         prompt itself as well as the players involved in it. All other
@@ -22,7 +27,7 @@ class Prompt:
         Args:
             id (int): The prompt's unique ID for the game.
             prompt (str): The prompt that the players will answer.
-            player_ids (list[int]): The list of players assigned to the prompt.
+            player_ids (tuple[int, int]): The pair of players assigned to the prompt.
         """
         self.id: int = id
         """ The prompt's unique ID for the game. """
@@ -30,17 +35,29 @@ class Prompt:
         self.prompt: str = prompt
         """ The prompt that the players will answer. """
 
-        self.player_ids: list[int] = player_ids
-        """ The list of player ids assigned to the prompt. """
+        self.player_ids: tuple[int, int] = player_ids
+        """ The pair of player ids assigned to the prompt. """
 
         self.responses = dict[int, str]()  # Player ID: Response
         """ Dictionary that holds the responses of each player """
 
         self.votes = dict[
-            int, list[int]]()  # Player ID that submitted the response : List of player IDs that voted on the response
+            int, array]()  # Player ID that submitted the response : Array of player IDs that voted on the response
         """ Dictionary that holds the votes received by each response."""
-        self.votes[player_ids[0]] = list[int]()
-        self.votes[player_ids[1]] = list[int]()
+        self.votes[player_ids[0]] = array("I")
+        self.votes[player_ids[1]] = array("I")
+
+        self.voters = dict[int, int]()  # Voter ID : Index of the response they voted for
+        """ Every player that has voted on the prompt, for O(1) duplicate checks. """
+
+        self.audience_votes = array("I", [0, 0])
+        """ The number of spectators that voted for each response. """
+
+        self.audience_voters = bytearray()
+        """ Bitset of the audience seats that have voted, grown as higher seats vote. """
+
+        self.audience_choices = bytearray()
+        """ Bitset of the audience seats that voted for response 1, the same size as audience_voters. """
 
     def receive_response(self, response: PromptResponse):
         """
@@ -53,7 +70,7 @@ class Prompt:
         if response.player_id not in self.player_ids:
             raise PlayerResponseError(f"Player {response.player_id} is not part of this prompt!")
 
-        if response.player_id in self.responses.keys():
+        if response.player_id in self.responses:
             raise PlayerResponseError(f"Player {response.player_id} has already responded!")
 
         if response.prompt_id != self.id:
@@ -69,25 +86,96 @@ class Prompt:
         if vote.prompt_id != self.id:
             raise PlayerVoteError(f"This vote was for a different prompt!")
 
+        if vote.vote not in (0, 1):
+            raise PlayerVoteError(f"Player {vote.player_id} voted for a response that doesn't exist!")
+
         if vote.player_id in self.player_ids:
             raise PlayerVoteError(f"Player {vote.player_id} is not allowed to vote on their own prompt!")
 
-        for l in self.votes.values():
-            for player_id in l:
-                if player_id == vote.player_id:
-                    raise PlayerVoteError(f"Player {player_id} has already voted!")
+        if vote.player_id in self.voters:
+            raise PlayerVoteError(f"Player {vote.player_id} has already voted!")
 
         self.votes[self.player_ids[vote.vote]].append(vote.player_id)
+        self.voters[vote.player_id] = vote.vote
+
+    def receive_audience_vote(self, seat: int, vote: int):
+        """
+        Counts a vote from a spectator. Only the totals are kept, so each vote
+        costs one bit and one increment no matter how large the audience is.
+
+        Parameters:
+            seat (int): The audience seat of the spectator who voted.
+            vote (int): The response that the spectator voted for (0 or 1).
+        """
+        if vote not in (0, 1):
+            raise PlayerVoteError(f"Spectator {seat} voted for a response that doesn't exist!")
+
+        byte_index, bit = seat >> 3, 1 << (seat & 7)
+        if byte_index >= len(self.audience_voters):
+            padding = bytes(byte_index + 1 - len(self.audience_voters))
+            self.audience_voters.extend(padding)
+            self.audience_choices.extend(padding)
+
+        if self.audience_voters[byte_index] & bit:
+            raise PlayerVoteError(f"Spectator {seat} has already voted!")
+
+        self.audience_voters[byte_index] |= bit
+        if vote:
+            self.audience_choices[byte_index] |= bit
+        self.audience_votes[vote] += 1
+
+    def release_audience_seat(self, seat: int):
+        """
+        Takes back the vote of a seat whose spectator left, so the seat can go
+        to someone else, and a spectator who comes back votes only once.
+        """
+        byte_index, bit = seat >> 3, 1 << (seat & 7)
+        if byte_index >= len(self.audience_voters) or not self.audience_voters[byte_index] & bit:
+            return
+
+        self.audience_votes[1 if self.audience_choices[byte_index] & bit else 0] -= 1
+        self.audience_voters[byte_index] &= ~bit & 0xFF
+        self.audience_choices[byte_index] &= ~bit & 0xFF
+
+    def clear_audience_votes(self):
+        """ Takes back every spectator's vote, as when the whole audience has left. """
+        self.audience_votes[0] = self.audience_votes[1] = 0
+        self.audience_voters = bytearray()
+        self.audience_choices = bytearray()
 
 
 class PromptList:
     """
     Custom list class to provide extra methods for referencing Prompts.
+    Prompts are kept in an insertion-ordered dict keyed by id, so lookups,
+    membership checks and removals are constant-time. Lookups by position,
+    which voting makes once per prompt, go through a list of the prompts
+    and their positions, which a removal only marks stale; it is rebuilt
+    when next needed.
     """
 
+    __slots__ = ("_prompts", "_ordered")
+
     def __init__(self) -> None:
-        """ Creates a new PromptList initialized with a blank list. """
-        self.prompts: list[Prompt] = list()
+        """ Creates a new, empty PromptList. """
+        self._prompts: dict[int, Prompt] = dict()
+        """ The prompts in insertion order, keyed by id. """
+
+        self._ordered: tuple[list[Prompt], dict[int, int]] | None = ([], {})
+        """ The prompts in order, and the position of each by id; None while stale. """
+
+    @property
+    def prompts(self) -> list[Prompt]:
+        """ A snapshot of the prompts, in order. """
+        return list(self._prompts.values())
+
+    def _index(self) -> tuple[list[Prompt], dict[int, int]]:
+        """ The prompts in order, and the position of each by id, rebuilt if a removal made them stale. """
+        ordered = self._ordered
+        if ordered is None:
+            order = list(self._prompts.values())
+            ordered = self._ordered = order, {prompt.id: index for index, prompt in enumerate(order)}
+        return ordered
 
     def get_prompt_by_id(self, prompt_id: int) -> Prompt:
         """
@@ -100,50 +188,54 @@ class PromptList:
             The specified prompt.
             If the prompt is not in the list, an exception is thrown.
         """
-        if len(self.prompts) == 0:
+        if len(self._prompts) == 0:
             raise PromptListEmpty()
 
-        for prompt in self.prompts:
-            if prompt.id == prompt_id:
-                return prompt
-
-        raise PromptNotFound(f"Prompt {prompt_id} does not exist!")
+        try:
+            return self._prompts[prompt_id]
+        except KeyError:
+            raise PromptNotFound(f"Prompt {prompt_id} does not exist!") from None
 
     def __len__(self) -> int:
-        return len(self.prompts)
+        return len(self._prompts)
 
     def append(self, prompt: Prompt) -> None:
-        self.prompts.append(prompt)
+        self._prompts[prompt.id] = prompt
+        ordered = self._ordered
+        if ordered is not None:
+            order, positions = ordered
+            if prompt.id in positions:
+                # A prompt with the same id is replaced where it stands
+                order[positions[prompt.id]] = prompt
+            else:
+                positions[prompt.id] = len(order)
+                order.append(prompt)
 
     def __contains__(self, prompt: Prompt) -> bool:
-        return prompt in self.prompts
+        return self._prompts.get(prompt.id) is prompt
 
     def __iter__(self):
         return iter(self.prompts)
 
     def __getitem__(self, index: int) -> Prompt:
-        if isinstance(index, slice):
-            return [self.prompts[i] for i in range(*index.indices(len(self.prompts)))]
-        else:
-            return self.prompts[index]
+        return self._index()[0][index]
 
     def pop(self, index: int) -> Prompt:
-        return self.prompts.pop(index)
+        return self.remove_prompt_by_id(self._index()[0][index].id)
 
     def has_prompt_by_id(self, prompt_id: int) -> bool:
-        try:
-            self.get_prompt_by_id(prompt_id)
-            return True
-        except PromptListException:
-            return False
+        return prompt_id in self._prompts
 
     def get_index_by_id(self, prompt_id: int) -> int:
-        for index in range(len(self.prompts)):
-            if self.prompts[index].id == prompt_id:
-                return index
+        if prompt_id not in self._prompts:
+            raise PromptNotFound(f"Prompt {prompt_id} not found!")
 
-        raise PromptNotFound(f"Prompt {prompt_id} not found!")
+        return self._index()[1][prompt_id]
 
     def remove_prompt_by_id(self, prompt_id: int) -> Prompt:
-        index = self.get_index_by_id(prompt_id)
-        return self.pop(index)
+        try:
+            prompt = self._prompts.pop(prompt_id)
+        except KeyError:
+            raise PromptNotFound(f"Prompt {prompt_id} not found!") from None
+        self._ordered = None
+        return prompt
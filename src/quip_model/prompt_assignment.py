@@ -0,0 +1,30 @@
+"""
+File: prompt_assignment.py
+Purpose: Pair players with prompts so that every player answers exactly two
+prompts and every prompt is answered by exactly two different players.
+"""
+from random import Random
+
+from .exceptions import NotEnoughPlayers
+
+
+def assign_prompts(player_ids: list[int], rng: Random) -> list[tuple[int, int]]:
+    """
+    Builds the pairings for a round in linear time. The players are shuffled
+    into a ring and prompt i goes to the i-th player and the one after them,
+    so each player ends up on the prompt they start and the one before it.
+
+    Parameters:
+        player_ids (list[int]): The ids of the players in the round.
+        rng (Random): The source of randomness.
+
+    Returns:
+        One pair of player ids per player; the pair at index i answers prompt i.
+    """
+    if len(player_ids) < 2:
+        raise NotEnoughPlayers(f"Need at least 2 players to pair prompts, only have {len(player_ids)}.")
+
+    ring = list(player_ids)
+    rng.shuffle(ring)
+
+    return [(ring[index], ring[(index + 1) % len(ring)]) for index in range(len(ring))]
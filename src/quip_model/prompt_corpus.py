@@ -0,0 +1,130 @@
+"""
+File: prompt_corpus.py
+Purpose: Hold the prompts every game in the process draws from, and give
+each game a cheap cursor that never repeats a prompt until the whole corpus
+has been used.
+"""
+import sys
+import zlib
+from array import array
+from math import gcd
+from random import Random
+from typing import Iterable
+
+from .prompts_list import prompts
+
+
+class PromptCorpus:
+    """
+    A read-only store of prompts. The prompts are de-duplicated and interned
+    once, and a shuffled permutation of them is computed once, when the
+    corpus is loaded; games only ever hold a PromptCursor into it, so memory
+    does not grow with the number of games.
+    """
+
+    __slots__ = ("_prompts", "_order", "fingerprint")
+
+    def __init__(self, prompt_strs: Iterable[str], seed: int = 0):
+        """
+        Creates a corpus from an iterable of prompts.
+
+        Parameters:
+            prompt_strs (Iterable[str]): The prompts. Duplicates are dropped.
+            seed (int): Seeds the shared permutation. Games get their randomness
+                from their cursors, so the default keeps the permutation the
+                same in every process and a restored cursor picks up where it was.
+        """
+        self._prompts: tuple[str, ...] = tuple(dict.fromkeys(sys.intern(prompt) for prompt in prompt_strs))
+        """ The prompts, in the order they were loaded. """
+
+        if not self._prompts:
+            raise ValueError("A prompt corpus needs at least one prompt.")
+
+        order = list(range(len(self._prompts)))
+        Random(seed).shuffle(order)
+        self._order = array("I", order)
+        """ A shuffled permutation of the prompt indexes, shared by every cursor. """
+
+        self.fingerprint = zlib.crc32(self._order.tobytes(), zlib.crc32("\n".join(self._prompts).encode()))
+        """ Identifies the prompts and their permutation, so a snapshot can tell if a cursor still applies. """
+
+    @classmethod
+    def from_files(cls, paths: Iterable[str], seed: int = 0) -> "PromptCorpus":
+        """
+        Loads prompt packs: UTF-8 text files with one prompt per line. Blank
+        lines and lines starting with '#' are skipped.
+        """
+        def read_prompts():
+            for path in paths:
+                with open(path, encoding="utf-8") as pack:
+                    for line in pack:
+                        line = line.strip()
+                        if line and not line.startswith("#"):
+                            yield line
+
+        return cls(read_prompts(), seed)
+
+    def __len__(self) -> int:
+        return len(self._prompts)
+
+    def __getitem__(self, index: int) -> str:
+        return self._prompts[index]
+
+    def permuted(self, index: int) -> str:
+        """ Gets the prompt at the given place in the shared permutation. """
+        return self._prompts[self._order[index % len(self._order)]]
+
+    def cursor(self, rng: Random) -> "PromptCursor":
+        """ Creates a cursor starting at a random place with a random stride. """
+        return PromptCursor(self, rng)
+
+
+class PromptCursor:
+    """
+    A game's position in a PromptCorpus. The cursor walks the corpus'
+    shared permutation with a stride that is coprime to its length, so it
+    visits every prompt exactly once before any repeats, and each draw is
+    O(1) in the size of the corpus.
+    """
+
+    __slots__ = ("corpus", "offset", "stride", "position")
+
+    def __init__(self, corpus: PromptCorpus, rng: Random):
+        size = len(corpus)
+
+        self.corpus = corpus
+        """ The corpus being drawn from. """
+
+        self.offset = rng.randrange(size)
+        """ Where in the permutation this cursor starts. """
+
+        stride = rng.randrange(1, size) if size > 1 else 1
+        while gcd(stride, size) != 1:
+            stride = rng.randrange(1, size)
+
+        self.stride = stride
+        """ How far the cursor moves through the permutation per draw. """
+
+        self.position = 0
+        """ The number of prompts drawn so far. """
+
+    def draw(self, count: int) -> list[str]:
+        """
+        Draws the next count prompts. Prompts only repeat once every prompt in
+        the corpus has been drawn.
+        """
+        drawn = [self.corpus.permuted(self.offset + self.stride * position)
+                 for position in range(self.position, self.position + count)]
+        self.position += count
+        return drawn
+
+
+_default_corpus: PromptCorpus | None = None
+
+
+def default_corpus() -> PromptCorpus:
+    """ The corpus built from the prompts that ship with the game, created on first use. """
+    global _default_corpus
+    if _default_corpus is None:
+        _default_corpus = PromptCorpus(prompts)
+    return _default_corpus
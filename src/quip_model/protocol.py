@@ -12,3 +12,9 @@ RESPONSE = "Response"
 
 """ Client will send a REGISTER message to the server with its unique username """
 REGISTER = "Register"
+
+""" A client whose connection dropped resumes its session by naming it in the SESSION query parameter of its game URL """
+SESSION = "session"
+
+""" A client resuming its session gives the sequence number of the latest message it has in the SEQ query parameter """
+SEQ = "seq"
@@ -12,6 +12,8 @@ class PromptResponse:
     These are created by the network handler and sent to the associated Prompt.
     """
 
+    __slots__ = ("prompt_id", "player_id", "player_response")
+
     def __init__(self, prompt_id: int, player_id: int, player_response: str):
         """
         Creates a PromptResponse object with the response string, the associated 
@@ -38,6 +40,8 @@ class VoteResponse:
     the network handler and passed to the associated Prompt.
     """
 
+    __slots__ = ("prompt_id", "player_id", "vote")
+
     def __init__(self, prompt_id: int, player_id: int, vote: int):
         """
         Creates a VoteResponse object with the prompt id, id of the player who
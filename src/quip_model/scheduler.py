@@ -0,0 +1,32 @@
+"""
+File: scheduler.py
+Purpose: Define the interface GameMaster uses to schedule its phase deadlines
+and pauses without blocking a thread.
+"""
+from typing import Callable, Protocol
+
+
+class TimerHandle(Protocol):
+    """ A handle to a scheduled call that has not run yet. """
+
+    def cancel(self) -> None:
+        """ Prevents the call from running. Cancelling twice does nothing. """
+        ...
+
+
+class Scheduler(Protocol):
+    """ Anything that can run a callback once a delay has passed. """
+
+    def now(self) -> float:
+        """ The current time on the clock the scheduler runs on, in seconds. """
+        ...
+
+    def call_later(self, delay: float, callback: Callable[..., None], *args) -> TimerHandle:
+        """
+        Arranges for callback(*args) to be called after delay seconds.
+
+        Parameters:
+            delay (float): The time (in clock seconds) to wait before the call.
+            callback (Callable): The function to call.
+        """
+        ...
@@ -0,0 +1,110 @@
+"""
+File: simulator.py
+Purpose: Play complete games in-process with bot players and virtual time,
+so GameMaster can be exercised and measured without clients, sockets or
+wall-clock waits. Every simulated game runs on one FakeClock.
+"""
+from random import Random
+from typing import Callable
+
+from .clock import FakeClock
+from .events import *
+from .game_master import GameMaster
+from .pacing import DEFAULT_PACING, GamePacing
+from .response import PromptResponse, VoteResponse
+
+
+class SimulatedGame:
+    """
+    A GameMaster played by bots. The bots react to the game's events the way
+    clients would, answering and voting after a random think time, and
+    inject their messages straight into the GameMaster.
+    """
+
+    def __init__(self, scheduler: FakeClock, num_players: int, rng: Random, miss_rate: float = 0.0,
+                 seed: int = None, recorder: Callable[[str, tuple], None] = None, observer: GameObserver = None,
+                 pacing: GamePacing = DEFAULT_PACING):
+        """
+        Creates a game and seats its bots.
+
+        Parameters:
+            scheduler (FakeClock): The clock that runs every simulated game.
+            num_players (int): The number of bots in the game.
+            rng (Random): The source of randomness for the bots.
+            miss_rate (float): The chance that a bot misses a deadline.
+            seed (int): Seeds the game's own Random. Drawn from rng if not given.
+            recorder (Callable): Passed on to the GameMaster, e.g. to journal the game.
+            observer (GameObserver): Also sent every event the game publishes.
+            pacing (GamePacing): The game's deadlines and pauses.
+        """
+        self.scheduler = scheduler
+        self.rng = rng
+        self.miss_rate = miss_rate
+        self.observer = observer
+
+        self.seed = seed if seed is not None else rng.getrandbits(64)
+        """ The seed of the game's Random, kept apart from the bots' so the game can be replayed without them. """
+
+        self.events_seen = 0
+        """ The number of events the game has published. """
+
+        self.finished = False
+        """ Set once the scoreboard has been published. """
+
+        self.game = GameMaster(self._observe, scheduler, rng=Random(self.seed), recorder=recorder,
+                               pacing=pacing)
+        for index in range(num_players):
+            player_id = self.game.add_connection()
+            self.game.accept_new_player(player_id, f"bot-{index}")
+
+    def _think_time(self, countdown: float) -> float | None:
+        """ How long a bot takes to act, or None if it misses the deadline. """
+        if self.rng.random() < self.miss_rate:
+            return None
+        return self.rng.uniform(countdown / 120, countdown * 0.75)
+
+    def _observe(self, event: GameEvent):
+        self.events_seen += 1
+        if self.observer is not None:
+            self.observer(event)
+        match event:
+            case DistributePromptEvent():
+                delay = self._think_time(event.countdown)
+                if delay is not None:
+                    self.scheduler.call_later(delay, self._respond, event)
+            case BeginPromptVotingEvent():
+                for player in self.game.players:
+                    if player.id in event.prompt.player_ids:
+                        continue
+                    delay = self._think_time(event.countdown)
+                    if delay is not None:
+                        self.scheduler.call_later(delay, self._vote, player.id, event.prompt.id)
+            case ScoreboardEvent():
+                self.finished = True
+
+    def _respond(self, event: DistributePromptEvent):
+        self.game.receive_responses(event.player_num,
+                                    (PromptResponse(event.prompt_0_id, event.player_num, f"answer {event.prompt_0_id}"),
+                                     PromptResponse(event.prompt_1_id, event.player_num, f"answer {event.prompt_1_id}")))
+
+    def _vote(self, player_id: int, prompt_id: int):
+        if self.game.voting_prompt is None or self.game.voting_prompt.id != prompt_id:
+            return  # The bot was too slow; voting has moved on
+        self.game.receive_vote(VoteResponse(prompt_id, player_id, self.rng.randint(0, 1)))
+
+
+def simulate(num_games: int, num_players: int, seed: int = 0, miss_rate: float = 0.0,
+             pacing: GamePacing = DEFAULT_PACING) -> list[SimulatedGame]:
+    """
+    Plays a round of num_games games side by side on one fake clock.
+
+    Returns:
+        The finished games.
+    """
+    scheduler = FakeClock()
+    games = [SimulatedGame(scheduler, num_players, Random(seed + index), miss_rate, pacing=pacing)
+             for index in range(num_games)]
+    for simulated in games:
+        simulated.game.play_round()
+    scheduler.run()
+    return games
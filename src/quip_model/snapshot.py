@@ -0,0 +1,202 @@
+"""
+File: snapshot.py
+Purpose: Encode the state of a GameMaster into a compact, versioned binary
+snapshot and restore it, so a game survives a server restart or can move
+to another process.
+
+Layout (all integers little-endian):
+    header   magic "QSNP", version, phase, phase index, round, flags,
+             prompt cursor (corpus fingerprint, offset, stride, position)
+    pacing   the game's deadlines and pauses, as doubles (since version 2)
+    players  count, then id, points, flags and name for each player
+    prompts  count, then for each prompt: id, the pair of player ids, text,
+             both responses, the voters and their votes, and the audience's
+             vote totals and voter bitset
+Strings are UTF-8 with a u16 length; a length of 0xFFFF marks a missing one.
+"""
+import struct
+
+from .exceptions import SnapshotError
+from .game_master import GameMaster, GamePhase
+from .pacing import GamePacing
+from .player import Player
+from .prompt import Prompt
+
+SNAPSHOT_MAGIC = b"QSNP"
+SNAPSHOT_VERSION = 2
+
+_HEADER = struct.Struct("<4sBBHHBIIII")
+_PACING = struct.Struct("<5d")
+_COUNT = struct.Struct("<H")
+_PLAYER = struct.Struct("<IqB")
+_PROMPT = struct.Struct("<HII")
+_VOTE = struct.Struct("<IB")
+_AUDIENCE = struct.Struct("<IIH")
+
+_MISSING = 0xFFFF
+
+_PLAYING = 0x01
+_VIP = 0x01
+_READY = 0x02
+
+
+def _write_str(buffer: bytearray, value: str | None) -> None:
+    if value is None:
+        buffer += _COUNT.pack(_MISSING)
+        return
+
+    encoded = value.encode()
+    if len(encoded) >= _MISSING:
+        raise SnapshotError(f"String of {len(encoded)} bytes is too long for a snapshot.")
+    buffer += _COUNT.pack(len(encoded))
+    buffer += encoded
+
+
+def _read_str(view: memoryview, offset: int) -> tuple[str | None, int]:
+    (length,) = _COUNT.unpack_from(view, offset)
+    offset += _COUNT.size
+    if length == _MISSING:
+        return None, offset
+    return str(view[offset:offset + length], "utf-8"), offset + length
+
+
+def encode(game: GameMaster) -> bytes:
+    """
+    Encodes a game's players, prompts, responses, votes and phase. Players
+    that are still pending and spectators are left out, since they can only
+    come back by connecting again.
+    """
+    cursor = game.prompt_cursor
+    buffer = bytearray(_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, game.phase, game.phase_index, game.round,
+                                    _PLAYING if game.is_playing else 0,
+                                    cursor.corpus.fingerprint, cursor.offset, cursor.stride, cursor.position))
+    pacing = game.pacing
+    buffer += _PACING.pack(pacing.response_countdown, pacing.vote_countdown, pacing.voting_start_pause,
+                           pacing.results_pause, pacing.scoreboard_pause)
+
+    players = game.players.players
+    buffer += _COUNT.pack(len(players))
+    for player in players:
+        buffer += _PLAYER.pack(player.id, player.points,
+                               (_VIP if player.is_vip else 0) | (_READY if player.ready else 0))
+        _write_str(buffer, player.name)
+
+    prompts = game.prompts.prompts
+    buffer += _COUNT.pack(len(prompts))
+    for prompt in prompts:
+        buffer += _PROMPT.pack(prompt.id, *prompt.player_ids)
+        _write_str(buffer, prompt.prompt)
+        for player_id in prompt.player_ids:
+            _write_str(buffer, prompt.responses.get(player_id))
+
+        voters = list(prompt.voters.items())
+        buffer += _COUNT.pack(len(voters))
+        for voter, vote in voters:
+            buffer += _VOTE.pack(voter, vote)
+
+        audience_voters = bytes(prompt.audience_voters)
+        buffer += _AUDIENCE.pack(*prompt.audience_votes, len(audience_voters))
+        buffer += audience_voters
+
+    return bytes(buffer)
+
+
+def restore(game: GameMaster, data: bytes) -> GameMaster:
+    """
+    Loads a snapshot into a freshly created GameMaster. The restored players
+    are marked as reconnecting, so each can take their place back by joining
+    with the same nickname. Version 1 snapshots, which predate per-game
+    pacing, keep the pacing the game was created with. Call game.resume()
+    once the game is ready to run.
+
+    Returns:
+        The game that was passed in.
+    """
+    view = memoryview(data)
+    try:
+        (magic, version, phase, phase_index, round_num, flags,
+         fingerprint, offset, stride, position) = _HEADER.unpack_from(view, 0)
+    except struct.error:
+        raise SnapshotError("Snapshot is too short to have a header.") from None
+
+    if magic != SNAPSHOT_MAGIC:
+        raise SnapshotError("Data is not a game snapshot.")
+    if not 1 <= version <= SNAPSHOT_VERSION:
+        raise SnapshotError(f"Can't read version {version} snapshots, only up to version {SNAPSHOT_VERSION}.")
+
+    try:
+        game.phase = GamePhase(phase)
+        game.phase_index = phase_index
+        game.round = round_num
+        game.is_playing = bool(flags & _PLAYING)
+
+        # The cursor only means something against the same prompts in the same order
+        if game.prompt_cursor.corpus.fingerprint == fingerprint:
+            game.prompt_cursor.offset = offset
+            game.prompt_cursor.stride = stride
+            game.prompt_cursor.position = position
+
+        index = _HEADER.size
+        if version >= 2:
+            game.pacing = GamePacing(*_PACING.unpack_from(view, index))
+            index += _PACING.size
+
+        (num_players,) = _COUNT.unpack_from(view, index)
+        index += _COUNT.size
+        for _ in range(num_players):
+            player_id, points, player_flags = _PLAYER.unpack_from(view, index)
+            index += _PLAYER.size
+
+            if not game.ids.reserve(player_id):
+                raise SnapshotError(f"Player id {player_id} is already taken.")
+            player = Player(player_id)
+            player.points = points
+            player.is_vip = bool(player_flags & _VIP)
+            player.ready = bool(player_flags & _READY)
+            player.name, index = _read_str(view, index)
+            game.players.append(player)
+            game.reconnecting.add(player_id)
+
+        (num_prompts,) = _COUNT.unpack_from(view, index)
+        index += _COUNT.size
+        for _ in range(num_prompts):
+            prompt_id, player_0_id, player_1_id = _PROMPT.unpack_from(view, index)
+            index += _PROMPT.size
+            text, index = _read_str(view, index)
+
+            prompt = Prompt(prompt_id, text, (player_0_id, player_1_id))
+            for player_id in prompt.player_ids:
+                response, index = _read_str(view, index)
+                if response is not None:
+                    prompt.responses[player_id] = response
+
+            (num_voters,) = _COUNT.unpack_from(view, index)
+            index += _COUNT.size
+            for voter, vote in _VOTE.iter_unpack(view[index:index + num_voters * _VOTE.size]):
+                prompt.votes[prompt.player_ids[vote]].append(voter)
+                prompt.voters[voter] = vote
+            index += num_voters * _VOTE.size
+
+            audience_0, audience_1, bitset_size = _AUDIENCE.unpack_from(view, index)
+            index += _AUDIENCE.size
+            prompt.audience_votes[0], prompt.audience_votes[1] = audience_0, audience_1
+            prompt.audience_voters = bytearray(view[index:index + bitset_size])
+            index += bitset_size
+
+            game.prompts.append(prompt)
+            for player_id in prompt.player_ids:
+                if game.players.has_player_by_id(player_id):
+                    game.players.get_player_by_id(player_id).current_prompts.append(prompt)
+    except (struct.error, ValueError, IndexError) as error:
+        raise SnapshotError(f"Snapshot is corrupt: {error}") from None
+
+    if index != len(view):
+        raise SnapshotError(f"Snapshot has {len(view) - index} unexpected trailing bytes.")
+
+    if game.phase in (GamePhase.VOTING, GamePhase.RESULTS) and game.phase_index >= len(game.prompts):
+        raise SnapshotError(f"Snapshot is voting on prompt {game.phase_index} of {len(game.prompts)}.")
+    if game.phase == GamePhase.VOTING:
+        # The spectators aren't restored, so the votes they cast on the open prompt leave with them
+        game.prompts[game.phase_index].clear_audience_votes()
+
+    return game
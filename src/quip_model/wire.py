@@ -0,0 +1,150 @@
+"""
+File: wire.py
+Purpose: Encode the messages between clients and the server in the wire
+format a client asks for when it connects, with the "format" parameter of
+its URL's query, e.g. ws://host:10020/ws/<game-id>?format=msgpack.
+
+JSON is sent in text frames. The binary formats, MessagePack and CBOR, are
+sent in binary frames, with the keys messages are known to carry and the
+names of events replaced by small ids. A binary format is only offered if
+its package is installed; a client asking for one the server can't speak
+is answered in JSON. Either way, a text frame is JSON and a binary frame
+is the format that was asked for, so each end decodes a message by the
+kind of frame it came in, and a client sends JSON until the server's
+first binary frame tells it the server speaks its format.
+"""
+import json
+from typing import Any
+from urllib.parse import parse_qs, urlparse
+
+from . import codec
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+FORMAT_PARAMETER = "format"  # The query parameter of the game URL naming the wire format the client asks for
+
+# The keys of requests and responses, and of the sequence numbers every message carries
+_PROTOCOL_KEYS = ("type", "status", "content", "player_num", "prompt_0_id", "prompt_1_id", "response_0",
+                  "response_1", "prompt_id", "vote", "seq", "snapshot", "deltas", "session", "prev")
+
+WIRE_KEYS = tuple(dict.fromkeys([*_PROTOCOL_KEYS, *(key for keys in codec.MESSAGE_KEYS.values() for key in keys)]))
+""" The keys the binary formats send as ids, each as its index; any other key is sent as it is. """
+
+WIRE_EVENTS = tuple(event_type.__name__ for event_type in codec.EVENT_TYPES)
+""" The event names the binary formats send as ids under "event", each as its index. """
+
+_KEY_IDS = {key: index for index, key in enumerate(WIRE_KEYS)}
+_EVENT_IDS = {name: index for index, name in enumerate(WIRE_EVENTS)}
+_EVENT_KEY = _KEY_IDS["event"]
+
+
+def compact(message: dict[str, Any]) -> dict[int | str, Any]:
+    """ Replaces the known keys of a message, and the name of its event, with their ids. """
+    compacted = {_KEY_IDS.get(key, key): value for key, value in message.items()}
+    event_id = _EVENT_IDS.get(compacted.get(_EVENT_KEY))
+    if event_id is not None:
+        compacted[_EVENT_KEY] = event_id
+    return compacted
+
+
+def expand(compacted: dict[int | str, Any]) -> dict[str, Any]:
+    """
+    Undoes compact().
+
+    Raises:
+        ValueError: If what was decoded isn't a message.
+    """
+    if not isinstance(compacted, dict):
+        raise ValueError(f"Expected a message, got {type(compacted).__name__}.")
+    message = {WIRE_KEYS[key] if type(key) is int else key: value for key, value in compacted.items()}
+    event = message.get("event")
+    if type(event) is int:
+        message["event"] = WIRE_EVENTS[event]
+    return message
+
+
+class WireFormat:
+    """ How the messages on a connection are encoded. """
+
+    name = "json"
+    """ The name a client asks for the format by. """
+
+    binary = False
+    """ Whether the format is sent in binary frames. """
+
+    def dumps(self, message: dict[str, Any]) -> str | bytes:
+        """ Encodes a message. """
+        return json.dumps(message)
+
+    def loads(self, payload: str | bytes) -> dict[str, Any]:
+        """
+        Decodes a message, as JSON if it came in a text frame.
+
+        Raises:
+            ValueError: If the payload isn't a message in the format it claims to be.
+        """
+        return json.loads(payload)
+
+
+class _MsgpackFormat(WireFormat):
+    name = "msgpack"
+    binary = True
+
+    def dumps(self, message: dict[str, Any]) -> bytes:
+        return msgpack.packb(compact(message))
+
+    def loads(self, payload: str | bytes) -> dict[str, Any]:
+        if isinstance(payload, str):
+            return json.loads(payload)
+        return expand(msgpack.unpackb(payload, strict_map_key=False))
+
+
+class _CborFormat(WireFormat):
+    name = "cbor"
+    binary = True
+
+    def dumps(self, message: dict[str, Any]) -> bytes:
+        return cbor2.dumps(compact(message))
+
+    def loads(self, payload: str | bytes) -> dict[str, Any]:
+        if isinstance(payload, str):
+            return json.loads(payload)
+        try:
+            compacted = cbor2.loads(payload)
+        except cbor2.CBORDecodeError as error:
+            raise ValueError(str(error)) from None
+        return expand(compacted)
+
+
+JSON = WireFormat()
+""" The format every client and server speaks, and the one used unless a client asks for another. """
+
+WIRE_FORMATS = {wire_format.name: wire_format
+                for wire_format, available in ((JSON, True), (_MsgpackFormat(), msgpack is not None),
+                                               (_CborFormat(), cbor2 is not None))
+                if available}
+""" The formats this process can speak, by name. """
+
+
+def requested_format(url: str) -> WireFormat:
+    """ The wire format a connection's URL (or just its path and query) asks for, or JSON if it can't be spoken. """
+    query = urlparse(url).query
+    if not query:
+        return JSON
+    name = parse_qs(query).get(FORMAT_PARAMETER, [JSON.name])[0]
+    return WIRE_FORMATS.get(name, JSON)
+
+
+def with_format(url: str, name: str | None) -> str:
+    """ A game URL that asks for the named wire format, or the URL as it is if no format is named. """
+    if not name:
+        return url
+    return f"{url}{'&' if '?' in url else '?'}{FORMAT_PARAMETER}={name}"
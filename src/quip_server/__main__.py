@@ -1,7 +1,9 @@
 import logging
 import sys
 
+from .config import SERVER_WORKERS
 from .server_listener import GameListener
+from .supervisor import Supervisor
 from .server_ui.server_gui import ServerGUI
 
 UI_WINDOW_WIDTH = 1600
@@ -12,7 +14,10 @@ UI_WINDOW_HEIGHT = 900
 
 if __name__ == "__main__":
     logging.basicConfig(stream=sys.stdout, level=logging.DEBUG)
-    ui = ServerGUI(UI_WINDOW_WIDTH, UI_WINDOW_HEIGHT)
-    ui.thread.start()
-    listener = GameListener(ui)
-    listener.run()
+    if SERVER_WORKERS > 1:
+        Supervisor(SERVER_WORKERS).run()
+    else:
+        ui = ServerGUI(UI_WINDOW_WIDTH, UI_WINDOW_HEIGHT)
+        ui.thread.start()
+        listener = GameListener(ui)
+        listener.run()
@@ -0,0 +1,211 @@
+"""
+File: async_listener.py
+Purpose: Serve game connections as coroutines on one asyncio event loop,
+instead of a thread per connection like gamecomm's WsGameListener, so
+thousands of idle players don't mean thousands of threads waking up.
+"""
+import asyncio
+import socket
+import threading
+from functools import partial
+from logging import getLogger
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict
+from urllib.parse import parse_qs, urlparse
+
+import websockets
+from websockets.datastructures import Headers
+from websockets.server import WebSocketServerProtocol, serve
+
+from gamecomm.server import ConnectionClosedError, ConnectionClosedOK
+
+from quip_model.wire import WireFormat, requested_format
+from .connections import FLUSH_TIMEOUT, WireConnection
+from .outbox import Outbox
+
+logger = getLogger(__name__)
+
+
+class AsyncGameConnection(WireConnection):
+    """
+    A GameConnection served on the event loop. Messages are read with
+    messages() on the loop, or with recv() from another thread. send() and
+    send_encoded() may be called from any thread, like the publisher's and
+    the broadcaster's; they queue the message on the outbox, and the
+    connection's writer task on the loop sends it.
+    """
+
+    def __init__(self, websocket: WebSocketServerProtocol, claims: Dict | None, loop: asyncio.AbstractEventLoop,
+                 wire_format: WireFormat):
+        super().__init__(claims)
+        self.path = websocket.path
+        self.wire_format = wire_format
+        self._websocket = websocket
+        self._loop = loop
+        self._loop_thread = threading.get_ident()
+        self._ready = asyncio.Event()  # Set when messages are queued while the writer has none left
+        self._drained = asyncio.Event()  # Set when the writer has sent every queued message
+        self.outbox = Outbox(on_ready=self._wake_writer, on_lag=self.abort)
+
+    def _call_soon(self, callback: Callable[[], Any]):
+        if threading.get_ident() == self._loop_thread:
+            callback()
+        else:
+            self._loop.call_soon_threadsafe(callback)
+
+    def _wake_writer(self):
+        self._call_soon(self._ready.set)
+
+    def abort(self) -> None:
+        self._call_soon(self._websocket.transport.abort)
+
+    def recv(self, timeout: int = None) -> Any:
+        """
+        Waits on the calling thread for the client's next message, for code
+        that runs off the event loop, such as GameController.run(); on the
+        loop, read with messages() instead. Don't mix the two on one connection.
+
+        Raises:
+            RuntimeError: If called on the event loop's thread, which it would block.
+        """
+        if threading.get_ident() == self._loop_thread:
+            raise RuntimeError(f"recv() would block the event loop that serves {self}; read with messages()")
+        receiving = asyncio.run_coroutine_threadsafe(asyncio.wait_for(self._websocket.recv(), timeout), self._loop)
+        try:
+            payload = receiving.result()
+        except websockets.ConnectionClosedError:
+            self.outbox.close()
+            raise ConnectionClosedError()
+        except websockets.ConnectionClosedOK:
+            self.outbox.close()
+            raise ConnectionClosedOK()
+        return self.wire_format.loads(payload)
+
+    async def messages(self) -> AsyncIterator[Any]:
+        """ Yields the client's messages until the connection closes. """
+        try:
+            async for payload in self._websocket:
+                try:
+                    yield self.wire_format.loads(payload)
+                except ValueError as error:
+                    logger.error(f"{self} sent a message that isn't {self.wire_format.name}: {error}")
+        except websockets.ConnectionClosedError:
+            pass
+        finally:
+            self.outbox.close()
+
+    async def _write(self):
+        """ Sends the queued messages, in order, until the connection closes. """
+        try:
+            while True:
+                await self._ready.wait()
+                self._ready.clear()
+                while (payload := self.outbox.pop()) is not None:
+                    await self._websocket.send(payload)
+                self._drained.set()
+        except websockets.ConnectionClosed:
+            self.outbox.close()
+            self._drained.set()
+
+    async def _flush(self):
+        if self.outbox.idle:
+            return
+        self._drained.clear()
+        try:
+            await asyncio.wait_for(self._drained.wait(), FLUSH_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"{self} closed with {len(self.outbox)} messages unsent")
+
+    def __str__(self):
+        return f"ws {self._websocket.remote_address}"
+
+
+class _GameServerProtocol(WebSocketServerProtocol):
+    """
+    Reads the wire format each connection's opening request asks for, and
+    authenticates its game id and token, if asked to.
+    """
+
+    def __init__(self, *args, on_authenticate: Callable[[str, str], Dict] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.on_authenticate = on_authenticate
+        self.claims: Dict | None = None
+        self.wire_format: WireFormat | None = None
+
+    async def process_request(self, path: str, request_headers: Headers):
+        self.wire_format = requested_format(path)
+        if self.on_authenticate is None:
+            return None
+
+        url_parts = urlparse(path)
+        gid = url_parts.path.split("/")[-1]
+        if not gid:
+            logger.error("authentication failed: no gid")
+            return 400, [], b""
+
+        token = None
+        auth = request_headers.get("Authorization")
+        if auth:
+            if not auth.startswith("Bearer "):
+                logger.error("authentication failed: invalid authorization header value")
+                return 401, [], b""
+            token = auth[len("Bearer "):].strip()
+
+        if not token and url_parts.query:
+            token = parse_qs(url_parts.query).get("token", [None])[0]
+
+        if not token:
+            logger.error("authentication failed: token not present")
+            return 401, [], b""
+
+        self.claims = self.on_authenticate(gid, token)
+        if not self.claims:
+            logger.error("authentication failed: token not valid")
+            return 401, [], b""
+        return None
+
+
+class AsyncGameListener:
+    """
+    Accepts WebSocket connections on an asyncio event loop and hands each
+    to on_connection as a coroutine. Takes the same callbacks as
+    gamecomm's WsGameListener, except that on_connection is async. If sock
+    is given, connections are accepted from it instead of a socket bound to
+    local_ip and local_port.
+    """
+
+    def __init__(self, local_ip: str, local_port: int,
+                 on_connection: Callable[[AsyncGameConnection], Awaitable[None]],
+                 on_authenticate: Callable[[str, str], Dict] = None, sock: socket.socket = None):
+        self.local_ip = local_ip
+        self.local_port = local_port
+        self.on_connection = on_connection
+        self.on_authenticate = on_authenticate
+        self.sock = sock
+
+    async def _handle_connection(self, websocket: _GameServerProtocol):
+        connection = AsyncGameConnection(websocket, websocket.claims, asyncio.get_running_loop(), websocket.wire_format)
+        writer = asyncio.create_task(connection._write())
+        try:
+            await self.on_connection(connection)
+        except Exception:
+            logger.exception(f"error serving {connection}")
+        finally:
+            if not connection.outbox.closed:
+                await connection._flush()
+            connection.outbox.close()
+            writer.cancel()
+
+    async def serve(self):
+        """ Serves connections until cancelled. """
+        protocol = partial(_GameServerProtocol, on_authenticate=self.on_authenticate)
+        address = dict(sock=self.sock) if self.sock is not None else dict(host=self.local_ip, port=self.local_port)
+        async with serve(self._handle_connection, create_protocol=protocol, **address):
+            logger.debug(f"asyncio ws server listening on {self.local_ip}:{self.local_port}")
+            await asyncio.Future()
+
+    def run(self):
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            pass
+        logger.debug("asyncio ws server stopped")
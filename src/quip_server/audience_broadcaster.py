@@ -0,0 +1,45 @@
+from logging import getLogger
+from queue import Queue
+from threading import Thread
+from typing import Sequence
+
+from gamecomm.server import ConnectionClosed
+
+from quip_model.wire import WireFormat
+from .connections import WireConnection
+
+logger = getLogger(__name__)
+
+
+class AudienceBroadcaster:
+    """
+    Sends messages to spectators on a thread of its own, so that fanning a
+    message out to a large audience never holds up the players. A single
+    broadcaster is shared by every game in the process.
+    """
+
+    def __init__(self):
+        self._queue: Queue[tuple[dict[WireFormat, str | bytes], Sequence[WireConnection], str | None]] = Queue()
+        self._thread = Thread(target=self._run, name="AudienceBroadcaster", daemon=True)
+
+    def broadcast(self, payloads: dict[WireFormat, str | bytes], connections: Sequence[WireConnection],
+                  coalesce_key: str = None):
+        """
+        Queues a message for the given spectators and returns right away. The
+        message is already encoded, in each wire format the spectators speak.
+        """
+        if connections:
+            self._queue.put((payloads, connections, coalesce_key))
+
+    def _run(self):
+        while True:
+            payloads, connections, coalesce_key = self._queue.get()
+            for connection in connections:
+                try:
+                    connection.send_encoded(payloads[connection.wire_format], coalesce_key)
+                except (ConnectionClosed, ConnectionError):
+                    # The spectator's controller notices the closed connection and leaves the audience
+                    logger.debug(f"dropped message to closed spectator connection {connection}")
+
+    def start(self):
+        self._thread.start()
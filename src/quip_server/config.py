@@ -3,6 +3,73 @@ import os
 LOCAL_IP = os.environ.get("LOCAL_IP", "127.0.0.1")
 WS_LISTENER_PORT = os.environ.get("WS_LISTENER_PORT", "10020")
 
+# How connections are served: "threads" gives each its own thread, "asyncio" serves them all as coroutines on one
+# event loop
+SERVER_MODE = os.environ.get("SERVER_MODE", "threads")
+# Worker processes the games are spread over, each serving its connections in SERVER_MODE; with more than one, a
+# supervisor process accepts the connections and hands each to the worker that owns its game, and there is no GUI
+SERVER_WORKERS = int(os.environ.get("SERVER_WORKERS", "1"))
+
 ENABLE_AUTH = os.environ.get("ENABLE_AUTH")
 TOKEN_ISSUER_URI = os.environ.get("TOKEN_ISSUER_URI", "urn:ece4564:token-issuer")
 PUBLIC_KEY_FILE = os.environ.get("PUBLIC_KEY_FILE", "public_key.pem")
+
+# Prompt pack files (one prompt per line), separated by the OS path separator; the built-in prompts if unset
+PROMPT_PACKS = [path for path in os.environ.get("PROMPT_PACKS", "").split(os.pathsep) if path]
+
+# How many times faster than real time the games run, for soak runs with bots; clients and the GUI always count
+# down in real time, so leave this at 1 for games with people in them
+CLOCK_RATE = float(os.environ.get("CLOCK_RATE", "1.0"))
+# Deadlines and pauses of new games, as "name=seconds" pairs like "response_countdown=90,vote_countdown=20";
+# anything not set keeps its default
+GAME_PACING = os.environ.get("GAME_PACING", "")
+
+# Whether player ids are unique per "game" or across the whole "process". Games with per-game ids draw them from
+# their seeded Random, so replays of their journals give out the same ids; process-wide ids are drawn apart
+PLAYER_ID_SCOPE = os.environ.get("PLAYER_ID_SCOPE", "game")
+
+# Directory the latest snapshot of each game is kept in, so games survive a restart; snapshots are off if unset
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR")
+
+# Directory each game's journal of inputs and events is written to, for replaying games; journals are off if unset
+JOURNAL_DIR = os.environ.get("JOURNAL_DIR")
+# Time (in seconds) between group fsyncs of the journals
+JOURNAL_FSYNC_INTERVAL = float(os.environ.get("JOURNAL_FSYNC_INTERVAL", "1.0"))
+
+# Worker threads that carry events from the games to their sinks
+EVENT_BUS_WORKERS = int(os.environ.get("EVENT_BUS_WORKERS", "4"))
+# Queue capacity and overflow policy (block, drop-newest or drop-oldest) of each kind of event sink (publisher, gui,
+# metrics or journal), per game, as "sink=capacity:policy" entries like "gui=512:drop-oldest,journal=8192"; sinks
+# not set keep their defaults
+EVENT_SINKS = os.environ.get("EVENT_SINKS", "")
+
+# Messages each connection's outbound queue holds, and the depth past which the connection is lagging
+OUTBOX_CAPACITY = int(os.environ.get("OUTBOX_CAPACITY", "256"))
+OUTBOX_LAG_THRESHOLD = int(os.environ.get("OUTBOX_LAG_THRESHOLD", "64"))
+# What is done with a lagging connection: "coalesce" only keeps the latest of the messages a newer one makes stale,
+# and closes the connection if its queue fills anyway; "drop" drops its new messages; "disconnect" closes it
+OUTBOX_LAG_POLICY = os.environ.get("OUTBOX_LAG_POLICY", "coalesce")
+
+# Messages each game keeps as deltas for clients catching up, before folding them into its snapshot
+HISTORY_LOG_CAPACITY = int(os.environ.get("HISTORY_LOG_CAPACITY", "256"))
+
+# Time (in clock seconds) a game may go without activity in each lifecycle state (created, lobby, playing, finished
+# or empty) before it is evicted, as "state=seconds" pairs like "lobby=3600,empty=600"; states not set keep their
+# defaults
+GAME_IDLE_TTLS = os.environ.get("GAME_IDLE_TTLS", "")
+# Games the server keeps at most; a new game past this evicts the longest idle game nobody is playing, or is refused
+# if there is none
+MAX_GAMES = int(os.environ.get("MAX_GAMES", "1000"))
+# Shards the games are split over by a hash of their id, each with a lock of its own, so connections to different
+# games are admitted in parallel
+GAME_REGISTRY_SHARDS = int(os.environ.get("GAME_REGISTRY_SHARDS", "16"))
+
+# Base URL of the API whose game directory this server reports its load to, so new games are placed on it; no reports
+# are sent if unset
+GAME_DIRECTORY_URL = os.environ.get("GAME_DIRECTORY_URL")
+# Secret the load reports are sent with; it must match the API's GAME_NODE_SECRET, or the reports are refused
+GAME_NODE_SECRET = os.environ.get("GAME_NODE_SECRET")
+# Base WebSocket URL players reach this server at, as the directory hands it out, e.g. "wss://games-2.example.com:443"
+PUBLIC_WS_URL = os.environ.get("PUBLIC_WS_URL", f"ws://127.0.0.1:{WS_LISTENER_PORT}")
+# Time (in seconds) between load reports to the game directory; keep it well under the API's GAME_SERVER_HEARTBEAT_TTL
+HEARTBEAT_INTERVAL = float(os.environ.get("HEARTBEAT_INTERVAL", "10"))
@@ -0,0 +1,152 @@
+"""
+File: connections.py
+Purpose: Give every connection an outbox its messages are queued on and a
+writer of its own that sends them, so sending never waits on the client.
+Each connection speaks the wire format its client asked for (see
+quip_model.wire). Messages already encoded in it can be sent as they are,
+so a message going to many players and spectators is encoded once per
+format instead of once per connection.
+"""
+import logging
+import socket
+import threading
+from abc import abstractmethod
+from typing import Any, Callable, Dict
+from urllib.parse import urlparse
+
+import websockets
+from websockets.sync.server import ServerConnection, serve
+
+from gamecomm.server import ConnectionClosedError, ConnectionClosedOK, GameConnection, WsGameListener
+from gamecomm.server.game_connection import WsGameConnection
+
+from quip_model.wire import JSON, WireFormat, requested_format
+from .outbox import Outbox
+
+logger = logging.getLogger(__name__)
+
+FLUSH_TIMEOUT = 5  # Time (in seconds) a closing connection is given to send the messages still queued for it
+
+
+def path_game_id(path: str) -> str | None:
+    """ The game id in the path of a game URL, /ws/<game-id>, or None if there is none. """
+    return urlparse(path).path.rsplit("/", 1)[-1] or None
+
+
+class WireConnection(GameConnection):
+    """
+    A GameConnection whose messages are queued on its outbox and sent by a
+    writer of its own, in its wire format. Sending only ever queues the
+    message, from any thread, and returns right away.
+    """
+
+    outbox: Outbox
+    wire_format: WireFormat = JSON
+
+    path = ""
+    """ The path and query of the client's opening request, e.g. /ws/<game-id>?format=msgpack. """
+
+    @property
+    def gid(self) -> str | None:
+        """ The game the client's token is for or, if the server doesn't authenticate clients, the one in its path. """
+        if self.claims:
+            return self.claims["aud"]
+        return path_game_id(self.path)
+
+    def send(self, message: Any) -> None:
+        self.send_encoded(self.wire_format.dumps(message))
+
+    def send_encoded(self, payload: str | bytes, coalesce_key: str = None) -> None:
+        """
+        Queues a message already encoded in the connection's wire format, to be sent as it is.
+
+        Parameters:
+            payload (str | bytes): The message; bytes are sent in a binary frame, text in a text frame.
+            coalesce_key (str): Set for messages that a newer one with the same key makes stale.
+
+        Raises:
+            ConnectionClosed: If the connection was closed before the message could be queued.
+        """
+        if self.outbox.closed:
+            raise ConnectionClosedOK()
+        self.outbox.offer(payload, coalesce_key)
+
+    @abstractmethod
+    def abort(self) -> None:
+        """ Drops the connection without a closing handshake, e.g. because the client stopped reading. """
+        pass
+
+
+class WsWireConnection(WireConnection, WsGameConnection):
+    """ gamecomm's WebSocket connection, in the client's wire format, with its messages sent by a writer thread. """
+
+    def __init__(self, connection: ServerConnection):
+        super().__init__(connection)
+        self.path = connection.request.path
+        self.wire_format = requested_format(self.path)
+        self.outbox = Outbox(on_lag=self.abort)
+        self._writer = threading.Thread(target=self._write, name=f"writer {self}", daemon=True)
+        self._writer.start()
+
+    def _write(self):
+        """ Sends the queued messages, in order, until the outbox closes. """
+        while (payload := self.outbox.get()) is not None:
+            try:
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"send {self}: {payload!r}")
+                self._connection.send(payload)
+            except websockets.ConnectionClosed:
+                self.outbox.close()
+
+    def recv(self, timeout: int = None) -> Any:
+        try:
+            payload = self._connection.recv(timeout)
+        except websockets.ConnectionClosedError:
+            raise ConnectionClosedError()
+        except websockets.ConnectionClosedOK:
+            raise ConnectionClosedOK()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"recv {self}: {payload!r}")
+        return self.wire_format.loads(payload)
+
+    def abort(self) -> None:
+        try:
+            self._connection.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def flush(self):
+        """ Sends the messages still queued, waiting up to FLUSH_TIMEOUT, then stops the writer. """
+        if not self.outbox.wait_sent(FLUSH_TIMEOUT):
+            logger.warning(f"{self} closed with {len(self.outbox)} messages unsent")
+        self.outbox.close()
+
+
+class WsWireGameListener(WsGameListener):
+    """
+    gamecomm's WebSocket listener, handing out connections that queue their
+    messages. If sock is given, connections are accepted from it instead of
+    a socket bound to local_ip and local_port.
+    """
+
+    def __init__(self, local_ip: str, local_port: int, on_connection: Callable[[GameConnection], None],
+                 on_authenticate: Callable[[str, str], Dict] = None, on_stop: Callable[[], None] = None,
+                 sock: socket.socket = None):
+        super().__init__(local_ip, local_port, on_connection, on_authenticate, on_stop)
+        self.sock = sock
+
+    def _run(self):
+        if self.sock is None:
+            return super()._run()
+
+        process_request = self._handle_authentication if self.on_authenticate else self._skip_authentication
+        with serve(self._handle_connection, sock=self.sock, process_request=process_request) as server:
+            self._server = server
+            server.serve_forever()
+
+    def _handle_connection(self, ws_conn: ServerConnection):
+        connection = WsWireConnection(ws_conn)
+        try:
+            self.on_connection(connection)
+        finally:
+            connection.flush()
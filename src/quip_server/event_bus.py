@@ -0,0 +1,210 @@
+import threading
+from collections import deque
+from enum import Enum
+from logging import getLogger
+from queue import SimpleQueue
+from typing import Callable, Iterable
+from weakref import WeakSet
+
+from quip_model.events import GameEvent, GameObserver
+
+logger = getLogger(__name__)
+
+DISPATCH_BATCH = 64  # Events a worker delivers to one sink before giving other sinks a turn
+
+
+class OverflowPolicy(Enum):
+    """ What a sink does with a new event when its queue is full. """
+    BLOCK = "block"  # Make the game wait until the sink catches up; nothing is lost
+    DROP_NEWEST = "drop-newest"  # Drop the new event
+    DROP_OLDEST = "drop-oldest"  # Drop the oldest queued event to make room for the new one
+
+
+# Queue capacity and overflow policy of each kind of sink, per game
+DEFAULT_SINKS = {
+    "publisher": (1024, OverflowPolicy.BLOCK),
+    "gui": (256, OverflowPolicy.DROP_OLDEST),
+    "metrics": (1024, OverflowPolicy.DROP_NEWEST),
+    "journal": (4096, OverflowPolicy.BLOCK),
+}
+
+
+class Sink:
+    """
+    A consumer of one game's events, e.g. the game's publisher or the GUI.
+    Each sink has its own bounded queue and is drained by the EventBus'
+    workers, one worker at a time, so it sees the game's events in order
+    no matter how slow the other sinks are.
+    """
+
+    __slots__ = ("name", "handler", "capacity", "policy", "delivered", "dropped", "_events", "_lock", "_not_full",
+                 "_scheduled", "__weakref__")
+
+    def __init__(self, name: str, handler: Callable[[GameEvent], None], capacity: int,
+                 policy: OverflowPolicy = OverflowPolicy.BLOCK):
+        """
+        Parameters:
+            name (str): The kind of sink, e.g. "publisher". The bus totals its counters by name.
+            handler (Callable): Called with each event, on one of the bus' workers.
+            capacity (int): The most events the sink's queue holds.
+            policy (OverflowPolicy): What to do with an event when the queue is full.
+        """
+        self.name = name
+        self.handler = handler
+        self.capacity = capacity
+        self.policy = policy
+
+        self.delivered = 0
+        """ The number of events handed to the handler. """
+
+        self.dropped = 0
+        """ The number of events dropped because the queue was full. """
+
+        self._events = deque[GameEvent]()
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+
+        self._scheduled = False
+        """ True while the sink is waiting for or being drained by a worker. """
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def _offer(self, event: GameEvent) -> bool:
+        """
+        Queues an event, applying the overflow policy if the queue is full.
+
+        Returns:
+            True if the sink needs to be handed to a worker.
+        """
+        with self._lock:
+            if len(self._events) >= self.capacity:
+                match self.policy:
+                    case OverflowPolicy.BLOCK:
+                        while len(self._events) >= self.capacity:
+                            self._not_full.wait()
+                    case OverflowPolicy.DROP_NEWEST:
+                        self.dropped += 1
+                        return False
+                    case OverflowPolicy.DROP_OLDEST:
+                        self._events.popleft()
+                        self.dropped += 1
+
+            self._events.append(event)
+            if self._scheduled:
+                return False
+            self._scheduled = True
+            return True
+
+    def _drain(self) -> bool:
+        """
+        Hands up to DISPATCH_BATCH events to the handler. Only ever called by
+        the one worker the sink was handed to.
+
+        Returns:
+            True if events are left and the sink needs to be handed to a worker again.
+        """
+        for _ in range(DISPATCH_BATCH):
+            with self._lock:
+                if not self._events:
+                    self._scheduled = False
+                    return False
+                event = self._events.popleft()
+                self._not_full.notify()
+
+            try:
+                self.handler(event)
+            except Exception:
+                logger.exception(f"{self.name} sink failed to handle {event.__class__.__name__}")
+            self.delivered += 1
+
+        with self._lock:
+            if not self._events:
+                self._scheduled = False
+                return False
+            return True
+
+
+class EventBus:
+    """
+    Carries events from every game in the process to their sinks. A game
+    only queues an event on each of its sinks and returns; a fixed pool of
+    worker threads delivers them, so a slow sink holds up neither the game
+    nor the other sinks.
+    """
+
+    def __init__(self, workers: int = 4):
+        self._ready = SimpleQueue[Sink | None]()
+        """ Sinks with queued events, waiting for a worker. """
+
+        self._sinks = WeakSet[Sink]()
+        self._sinks_lock = threading.Lock()
+        self._threads = [threading.Thread(target=self._run, name=f"EventBus-{index}", daemon=True)
+                         for index in range(workers)]
+
+    def attach(self, sinks: Iterable[Sink]) -> GameObserver:
+        """
+        Connects a game's sinks to the bus.
+
+        Returns:
+            The game's observer, which queues each event on every sink.
+        """
+        sinks = tuple(sinks)
+        with self._sinks_lock:
+            self._sinks.update(sinks)
+
+        def publish(event: GameEvent):
+            for sink in sinks:
+                if sink._offer(event):
+                    self._ready.put(sink)
+
+        return publish
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """ The queued, delivered and dropped events of the live sinks, totalled by sink name. """
+        with self._sinks_lock:
+            sinks = list(self._sinks)
+
+        totals = dict[str, dict[str, int]]()
+        for sink in sinks:
+            total = totals.setdefault(sink.name, {"sinks": 0, "queued": 0, "delivered": 0, "dropped": 0})
+            total["sinks"] += 1
+            total["queued"] += len(sink)
+            total["delivered"] += sink.delivered
+            total["dropped"] += sink.dropped
+        return totals
+
+    def _run(self):
+        while True:
+            sink = self._ready.get()
+            if sink is None:
+                return
+            if sink._drain():
+                self._ready.put(sink)  # Back of the line, so one busy game can't starve the rest
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """ Stops the workers. Events still queued are not delivered. """
+        for _ in self._threads:
+            self._ready.put(None)
+        for thread in self._threads:
+            thread.join()
+
+
+def parse_sink_config(config: str) -> dict[str, tuple[int, OverflowPolicy]]:
+    """
+    Parses the capacity and overflow policy of each kind of sink from text
+    like "publisher=1024:block,gui=256:drop-oldest". Sinks not mentioned keep
+    their default, and so does the policy of a sink given only a capacity.
+    """
+    sinks = dict[str, tuple[int, OverflowPolicy]](DEFAULT_SINKS)
+    for entry in filter(None, (entry.strip() for entry in config.split(","))):
+        name, _, setting = entry.partition("=")
+        capacity, _, policy = setting.partition(":")
+        name = name.strip()
+        default_policy = sinks.get(name, (0, OverflowPolicy.BLOCK))[1]
+        sinks[name] = (int(capacity), OverflowPolicy(policy.strip()) if policy.strip() else default_policy)
+    return sinks
@@ -0,0 +1,171 @@
+"""
+File: game_history.py
+Purpose: Keep what a game has sent its clients, so a client that fell
+behind or reconnected can catch up from one compact snapshot and the
+deltas after it, instead of from every message the game ever sent.
+
+Every message a game sends carries the game's sequence number under "seq".
+The latest messages are kept as deltas; at each phase boundary, or before
+a message would be lost, they are folded into the snapshot, which keeps
+only the messages that still say something about the game: the latest of
+each kind, e.g. each player's prompts or the scoreboard, minus those a
+later one made moot, e.g. the votes on a prompt that is no longer being
+voted on. A client whose missing messages are all still kept is sent just
+those. A snapshot is made of ordinary messages, so clients rebuild their
+view from it the same way they do from the live stream.
+"""
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable
+
+from quip_model.events import *
+from .config import HISTORY_LOG_CAPACITY
+
+# The messages each of these events makes moot, by event type
+_ANSWERING_EVENTS = (StopAnsweringPrompts, DistributePromptEvent, PlayerResponseEvent)
+_PROMPT_VOTING_EVENTS = (PlayerVoteEvent, ClientEndPromptVotingEvent, EndPromptVotingEvent)
+_BOUNDARIES = {
+    RoundStartedEvent: (*_ANSWERING_EVENTS, BeginVotingEvent, BeginPromptVotingEvent, *_PROMPT_VOTING_EVENTS,
+                        ScoreboardEvent),
+    BeginVotingEvent: _ANSWERING_EVENTS,
+    BeginPromptVotingEvent: _PROMPT_VOTING_EVENTS,
+    ScoreboardEvent: (BeginVotingEvent, BeginPromptVotingEvent, *_PROMPT_VOTING_EVENTS),
+}
+
+# Events about a player that are dropped from the snapshot once the player leaves
+_PLAYER_STATE_EVENTS = (PlayerJoinEvent, PlayerNicknameEvent, PlayerResponseEvent, DistributePromptEvent,
+                        PlayerReconnectEvent)
+
+# Events that only matter when they happen, and aren't kept in the snapshot
+_TRANSIENT_EVENTS = (PlayerLeaveEvent, VIPLeaveEvent, NicknameAlreadyExistsEvent, GameFullEvent, AudienceLeaveEvent)
+
+
+@dataclass(slots=True)
+class HistoryEntry:
+    """ A message the game sent. """
+
+    seq: int
+    """ The message's sequence number in its game. """
+
+    event: GameEvent
+    """ The event it was encoded from. """
+
+    message: dict[str, Any]
+    """ The message, as it was sent. """
+
+    sent_at: float
+    """ The time (on the game's clock) it was sent at, to tell how much of its countdown is left. """
+
+
+def _slot(event: GameEvent) -> Hashable:
+    """ The slot an event's message holds in the snapshot; each slot keeps the latest message put in it. """
+    match event:
+        case PlayerJoinEvent() | PlayerNicknameEvent() | PlayerResponseEvent() | DistributePromptEvent() | \
+             PlayerReconnectEvent():
+            return type(event), event.player_num
+        case PlayerVoteEvent():
+            return PlayerVoteEvent, event.nickname
+        case AudienceJoinEvent():
+            return AudienceJoinEvent, event.audience_num
+        case _:
+            return type(event)
+
+
+def _as_sent_now(entry: HistoryEntry, now: float) -> dict[str, Any]:
+    """ An entry's message, with its countdown, if it has one, reduced by the time since it was sent. """
+    countdown = entry.message.get("countdown")
+    if countdown is None:
+        return entry.message
+    return {**entry.message, "countdown": max(0.0, countdown - (now - entry.sent_at))}
+
+
+class GameHistory:
+    """
+    Numbers a game's messages and keeps its snapshot and the deltas since.
+    The messages are recorded by the game's publisher, one at a time, and
+    read back by the controllers of clients catching up.
+    """
+
+    def __init__(self, log_capacity: int = HISTORY_LOG_CAPACITY, clock: Callable[[], float] = time.monotonic):
+        """
+        Parameters:
+            log_capacity (int): The most deltas kept.
+            clock (Callable): The game's clock, e.g. its scheduler's now(), which its countdowns run on.
+        """
+        self.log_capacity = log_capacity
+        self._clock = clock
+
+        self.seq = 0
+        """ The sequence number of the latest message. """
+
+        self.snapshot_seq = 0
+        """ The sequence number of the latest message folded into the snapshot. """
+
+        self._snapshot = dict[Hashable, HistoryEntry]()
+        self._log = deque[HistoryEntry](maxlen=log_capacity)
+        self._lock = threading.Lock()
+
+    def record(self, event: GameEvent, message: dict[str, Any]) -> int:
+        """ Stamps the message encoded from an event with the next sequence number, and logs it. """
+        with self._lock:
+            self.seq += 1
+            message["seq"] = self.seq
+            self._log.append(HistoryEntry(self.seq, event, message, self._clock()))
+            if type(event) in _BOUNDARIES or self.seq - self.snapshot_seq >= self.log_capacity:
+                self._fold()
+            return self.seq
+
+    def _fold(self) -> None:
+        """ Folds the messages since the last fold into the snapshot. """
+        snapshot = self._snapshot
+        for entry in self._log:
+            if entry.seq <= self.snapshot_seq:
+                continue
+            event = entry.event
+            event_type = type(event)
+            moot = _BOUNDARIES.get(event_type)
+            if moot is not None:
+                for slot in [slot for slot, kept in snapshot.items() if isinstance(kept.event, moot)]:
+                    del snapshot[slot]
+
+            match event:
+                case PlayerLeaveEvent():
+                    for slot in [slot for slot, kept in snapshot.items()
+                                 if isinstance(kept.event, _PLAYER_STATE_EVENTS) and slot[1] == event.player_num]:
+                        del snapshot[slot]
+                case PlayerReconnectEvent():
+                    snapshot.pop((PlayerJoinEvent, event.pending_num), None)
+                case AudienceLeaveEvent():
+                    snapshot.pop((AudienceJoinEvent, event.audience_num), None)
+
+            if event_type not in _TRANSIENT_EVENTS:
+                snapshot[_slot(event)] = entry
+
+        self.snapshot_seq = self.seq
+
+    def catch_up(self, since: int, sent_to: Callable[[GameEvent], bool]) -> dict[str, Any]:
+        """
+        What a client that has every message up to since needs to catch up.
+
+        Parameters:
+            since (int): The sequence number of the latest message the client has; 0 if it has none.
+            sent_to (Callable): Tells whether the client is sent an event's message.
+
+        Returns:
+            The latest sequence number under "seq", and the messages the client is missing under "deltas", in
+            order. If some of those are no longer kept, "snapshot" holds the messages of the snapshot instead,
+            in order, and "deltas" the messages since the snapshot.
+        """
+        now = self._clock()
+        with self._lock:
+            caught_up = {"seq": self.seq}
+            if self._log and since < self._log[0].seq - 1:
+                caught_up["snapshot"] = [_as_sent_now(entry, now)
+                                         for entry in sorted(self._snapshot.values(), key=lambda entry: entry.seq)
+                                         if sent_to(entry.event)]
+                since = self.snapshot_seq
+            caught_up["deltas"] = [_as_sent_now(entry, now) for entry in self._log
+                                   if entry.seq > since and sent_to(entry.event)]
+            return caught_up
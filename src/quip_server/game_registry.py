@@ -0,0 +1,261 @@
+"""
+File: game_registry.py
+Purpose: Keep the games the server is hosting, and drop the ones nobody
+needs anymore, so a long-running server's memory stays bounded. Each game
+is kept for as long as its lifecycle state allows without any activity,
+e.g. a finished game only briefly and a lobby much longer, and the number
+of games is capped; a game past the cap makes room by evicting the
+longest idle game nobody is playing, and is refused if there is none.
+
+The games are split over shards by a hash of their id, each with a lock
+of its own, so a burst of connections to many games at once, e.g. a venue
+full of players joining, doesn't queue on a single lock; a new game is
+only created under its own shard's lock.
+"""
+import threading
+from collections import Counter
+from logging import getLogger
+from typing import Callable
+
+from quip_model.exceptions import TooManyGames
+from .config import GAME_REGISTRY_SHARDS
+from .scheduler import GameScheduler
+from .server import GameLifecycle, GameServer
+
+logger = getLogger(__name__)
+
+REAP_INTERVAL = 30  # Time (in clock seconds) between sweeps for idle games
+
+# Time (in clock seconds) a game may go without activity in each lifecycle state before it is evicted
+DEFAULT_IDLE_TTLS = {
+    GameLifecycle.CREATED: 60,
+    GameLifecycle.LOBBY: 1800,
+    GameLifecycle.PLAYING: 1800,
+    GameLifecycle.FINISHED: 120,
+    GameLifecycle.EMPTY: 300,
+}
+
+# States whose games can be evicted before their time is up to make room for a new game, as nobody is playing them
+_REPLACEABLE = (GameLifecycle.CREATED, GameLifecycle.FINISHED, GameLifecycle.EMPTY)
+
+
+class _Shard:
+    """ The games whose ids hash to one shard of the registry, and the lock that guards them. """
+
+    __slots__ = ("games", "lock")
+
+    def __init__(self):
+        self.games: dict[str, GameServer] = {}
+        self.lock = threading.Lock()
+
+
+def parse_idle_ttls(config: str) -> dict[GameLifecycle, float]:
+    """
+    Parses the idle TTL of each lifecycle state from text like
+    "lobby=3600,empty=600". States not mentioned keep their default.
+    """
+    ttls = dict[GameLifecycle, float](DEFAULT_IDLE_TTLS)
+    for entry in filter(None, (entry.strip() for entry in config.split(","))):
+        state, _, seconds = entry.partition("=")
+        ttls[GameLifecycle(state.strip())] = float(seconds)
+    return ttls
+
+
+class GameRegistry:
+    """
+    The games the server is hosting, by game id. Connections join a game
+    through the registry, so it knows which games are in use; a sweep on
+    the game scheduler evicts the games that have been idle for longer
+    than their state allows.
+    """
+
+    def __init__(self, create: Callable[[str], GameServer], scheduler: GameScheduler, max_games: int,
+                 idle_ttls: dict[GameLifecycle, float] = None, shards: int = GAME_REGISTRY_SHARDS):
+        """
+        Parameters:
+            create (Callable): Creates the server of a new game, given its id.
+            scheduler (GameScheduler): Runs the sweeps; its clock measures how long games have been idle.
+            max_games (int): The most games kept at once.
+            idle_ttls (dict): How long a game may be idle in each lifecycle state; DEFAULT_IDLE_TTLS if not given.
+            shards (int): The number of shards the games are split over.
+        """
+        self._create = create
+        self._scheduler = scheduler
+        self.max_games = max_games
+        self.idle_ttls = idle_ttls if idle_ttls is not None else DEFAULT_IDLE_TTLS
+        self._shards = tuple(_Shard() for _ in range(shards))
+
+        self._size = 0
+        """ The number of games kept, plus the places reserved for games being created. """
+
+        self._size_lock = threading.Lock()
+
+        self.evicted = Counter[GameLifecycle]()
+        """ The number of games evicted for being idle too long, by the state they were in. """
+
+        self.replaced = 0
+        """ The number of games evicted early to make room for a new one. """
+
+        self.refused = 0
+        """ The number of connections turned away because no game could make room for theirs. """
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _shard(self, game_id: str) -> _Shard:
+        return self._shards[hash(game_id) % len(self._shards)]
+
+    def _items(self) -> list[tuple[str, GameServer, _Shard]]:
+        """ Every game, with its id and shard. Each shard is locked in turn, so this isn't one consistent view. """
+        items = list[tuple[str, GameServer, _Shard]]()
+        for shard in self._shards:
+            with shard.lock:
+                items.extend((game_id, server, shard) for game_id, server in shard.games.items())
+        return items
+
+    def servers(self) -> list[GameServer]:
+        return [server for _, server, _ in self._items()]
+
+    def _reserve(self) -> bool:
+        """ Takes a place for a new game, if there is one left under max_games. """
+        with self._size_lock:
+            if self._size >= self.max_games:
+                return False
+            self._size += 1
+            return True
+
+    def _release(self, count: int = 1) -> None:
+        with self._size_lock:
+            self._size -= count
+
+    def add(self, game_id: str, server: GameServer) -> None:
+        """
+        Keeps a game that was created elsewhere, e.g. restored from a snapshot.
+
+        Raises:
+            TooManyGames: If the registry already holds max_games games.
+        """
+        if not self._reserve():
+            raise TooManyGames(f"already hosting {len(self)} games")
+        shard = self._shard(game_id)
+        with shard.lock:
+            if shard.games.setdefault(game_id, server) is not server:
+                self._release()
+
+    def join(self, game_id: str) -> GameServer:
+        """
+        Counts a new connection in to a game, creating the game if there is
+        none with that id. Every join is paired with a leave().
+
+        Raises:
+            TooManyGames: If there is no such game, and no room for another.
+        """
+        shard = self._shard(game_id)
+        with shard.lock:
+            server = shard.games.get(game_id)
+            if server is None and self._reserve():
+                server = shard.games[game_id] = self._create_reserved(game_id)
+            if server is not None:
+                server.enter()
+                return server
+
+        # Make room outside the shard's lock, as it takes the lock of the shard it evicts from
+        evicted = self._make_room()
+        if evicted is None:
+            with self._size_lock:
+                self.refused += 1
+            raise TooManyGames(f"already hosting {len(self)} games")
+
+        # The evicted game's place goes to the new one, unless another connection created the game meanwhile
+        with shard.lock:
+            server = shard.games.get(game_id)
+            if server is None:
+                server = shard.games[game_id] = self._create_reserved(game_id)
+            else:
+                self._release()
+            server.enter()
+        self._close(*evicted)
+        return server
+
+    def _create_reserved(self, game_id: str) -> GameServer:
+        """ Creates a game whose place is reserved, giving the place back if creating it fails. """
+        try:
+            return self._create(game_id)
+        except BaseException:
+            self._release()
+            raise
+
+    def leave(self, server: GameServer) -> None:
+        """ Counts a connection out of the game it joined. """
+        with self._shard(server.game_id).lock:
+            server.leave()
+
+    def _make_room(self) -> tuple[str, GameServer] | None:
+        """ Removes the longest idle game nobody is playing, if there is one. """
+        while True:
+            candidates = [(server.last_active, game_id, shard) for game_id, server, shard in self._items()
+                          if server.lifecycle in _REPLACEABLE]
+            if not candidates:
+                return None
+            _, game_id, shard = min(candidates, key=lambda candidate: candidate[0])
+            with shard.lock:
+                server = shard.games.get(game_id)
+                # Someone may have joined or evicted it since it was picked; pick again if so
+                if server is not None and server.lifecycle in _REPLACEABLE:
+                    del shard.games[game_id]
+                    with self._size_lock:
+                        self.replaced += 1
+                    return game_id, server
+
+    def reap(self) -> int:
+        """
+        Evicts every game that has been idle for longer than its state allows.
+
+        Returns:
+            The number of games evicted.
+        """
+        now = self._scheduler.now()
+        evicted = list[tuple[str, GameServer]]()
+        for shard in self._shards:
+            with shard.lock:
+                for game_id, server in list(shard.games.items()):
+                    state = server.lifecycle
+                    if now - server.last_active >= self.idle_ttls[state]:
+                        del shard.games[game_id]
+                        self.evicted[state] += 1
+                        evicted.append((game_id, server))
+        self._release(len(evicted))
+
+        # Closed outside the locks, as dropping connections can take a while
+        for game_id, server in evicted:
+            self._close(game_id, server)
+        return len(evicted)
+
+    def _close(self, game_id: str, server: GameServer) -> None:
+        logger.info(f"evicting game {game_id} ({server.lifecycle.value}, {server.connections} connections)")
+        try:
+            server.close()
+        except Exception:
+            logger.exception(f"failed to close game {game_id}")
+
+    def _sweep(self):
+        try:
+            self.reap()
+        except Exception:
+            logger.exception("sweep for idle games failed")
+        finally:
+            # A failed sweep mustn't stop the ones after it, or idle games would pile up
+            self._scheduler.call_later(REAP_INTERVAL, self._sweep)
+
+    def start(self):
+        """ Starts sweeping for idle games on the scheduler. """
+        self._scheduler.call_later(REAP_INTERVAL, self._sweep)
+
+    def stats(self) -> dict[str, int]:
+        """ The games kept in each lifecycle state, and the games evicted and connections refused so far. """
+        states = Counter(server.lifecycle for server in self.servers())
+        totals = {"games": sum(states.values()), **{state.value: states[state] for state in GameLifecycle}}
+        totals.update({f"evicted_{state.value}": self.evicted[state] for state in GameLifecycle})
+        totals["replaced"] = self.replaced
+        totals["refused"] = self.refused
+        return totals
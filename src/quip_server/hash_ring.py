@@ -0,0 +1,53 @@
+"""
+File: hash_ring.py
+Purpose: Assign game ids to workers by consistent hashing. Each worker
+holds many points on a ring of hashes, and a game belongs to the worker
+holding the first point at or after the game id's hash, so every player
+of a game is sent to the same worker, and adding a worker only moves the
+games whose hashes land on its new points, about 1/N of them.
+"""
+import bisect
+import hashlib
+from typing import Iterable
+
+RING_POINTS = 128  # Points each worker holds on the ring; more spread the games more evenly
+
+
+def _hash(key: str) -> int:
+    # Not hash(), which is salted per process; every process must agree on where a game belongs
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """ A consistent-hash ring of named workers. """
+
+    def __init__(self, workers: Iterable[str] = (), points: int = RING_POINTS):
+        self.points = points
+        self._hashes = list[int]()
+        self._owners = list[str]()
+        self.workers = list[str]()
+        for worker in workers:
+            self.add(worker)
+
+    def add(self, worker: str) -> None:
+        """ Puts a worker on the ring; it takes over the games that hash onto its points. """
+        for index in range(self.points):
+            point = _hash(f"{worker}#{index}")
+            position = bisect.bisect(self._hashes, point)
+            self._hashes.insert(position, point)
+            self._owners.insert(position, worker)
+        self.workers.append(worker)
+
+    def remove(self, worker: str) -> None:
+        """ Takes a worker off the ring; its games go to the workers holding the next points. """
+        kept = [(point, owner) for point, owner in zip(self._hashes, self._owners) if owner != worker]
+        self._hashes = [point for point, _ in kept]
+        self._owners = [owner for _, owner in kept]
+        self.workers.remove(worker)
+
+    def owner(self, game_id: str | None) -> str:
+        """ The worker a game belongs to. """
+        if not self._hashes:
+            raise LookupError("the ring has no workers")
+        position = bisect.bisect_left(self._hashes, _hash(game_id or ""))
+        return self._owners[position % len(self._owners)]
@@ -0,0 +1,75 @@
+"""
+File: heartbeat.py
+Purpose: Report the server's load to the API's game directory on a
+heartbeat, so the API places new games on the least loaded server and
+stops placing them on a server that went quiet. Each process reports on
+its own, under an id of its own; the workers of one server report the same
+public URL, and the directory adds their loads up.
+"""
+import json
+import os
+import socket
+import time
+import urllib.request
+from logging import getLogger
+from threading import Thread
+from typing import Callable
+
+logger = getLogger(__name__)
+
+NODES_PATH = "/nodes"  # Where the API takes load reports, under its base URL
+REPORT_TIMEOUT = 5  # Time (in seconds) a report is given to reach the API before it is left for the next beat
+
+
+class HeartbeatReporter:
+    """
+    Sends the load of this process to the game directory every interval,
+    on a thread of its own, so a slow or unreachable API never holds up a
+    game. A report that fails is logged, and the next beat tries again.
+    """
+
+    def __init__(self, directory_url: str, secret: str, ws_url: str, interval: float,
+                 load: Callable[[], dict[str, int]]):
+        """
+        Parameters:
+            directory_url (str): The base URL of the API.
+            secret (str): The secret the API takes reports from game servers with.
+            ws_url (str): The base WebSocket URL players reach this server at, e.g. "wss://games-2.example.com:443".
+            interval (float): Time (in seconds) between reports.
+            load (Callable): The process's "games", "connections" and "max_games".
+        """
+        self.reporter_id = f"{socket.gethostname()}-{os.getpid()}"
+        self._url = f"{directory_url.rstrip('/')}{NODES_PATH}/{self.reporter_id}"
+        self._secret = secret
+        self._ws_url = ws_url
+        self._interval = interval
+        self._load = load
+        self._failing = False
+        self._thread = Thread(target=self._run, name="HeartbeatReporter", daemon=True)
+        if not secret:
+            logger.error("GAME_NODE_SECRET is not set, so the game directory will refuse this server's reports")
+
+    def report(self) -> None:
+        body = json.dumps({"ws_url": self._ws_url, **self._load()}).encode()
+        request = urllib.request.Request(self._url, data=body, method="PUT",
+                                         headers={"Content-Type": "application/json",
+                                                  "Authorization": f"Bearer {self._secret}"})
+        with urllib.request.urlopen(request, timeout=REPORT_TIMEOUT):
+            pass
+
+    def _run(self):
+        while True:
+            try:
+                self.report()
+                if self._failing:
+                    logger.info(f"reporting to the game directory at {self._url} again")
+                self._failing = False
+            except (OSError, ValueError) as error:
+                # Logged once until reports get through again, as the API may be down for a while
+                if not self._failing:
+                    logger.warning(f"could not report to the game directory at {self._url}: {error}")
+                self._failing = True
+            time.sleep(self._interval)
+
+    def start(self):
+        self._thread.start()
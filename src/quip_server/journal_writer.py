@@ -0,0 +1,145 @@
+import os
+import time
+from collections import deque
+from logging import getLogger
+from threading import Event, Lock, Thread
+from typing import Callable
+
+from quip_model.events import GameEvent
+from quip_model.journal import JournalHeader, encode_event, encode_header, encode_input
+
+logger = getLogger(__name__)
+
+FLUSH_INTERVAL = 0.05  # Time (in seconds) between writes of the queued records
+JOURNAL_SUFFIX = ".journal"
+
+
+class GameJournal:
+    """
+    The journal of one game. The game's threads only stamp each input and
+    event with the time and queue it, which costs about as much as a list
+    append; the JournalWriter encodes and writes the records later.
+    """
+
+    __slots__ = ("path", "_clock", "_start", "_pending", "_closed")
+
+    def __init__(self, path: str, header: JournalHeader, clock: Callable[[], float] = time.monotonic):
+        self.path = path
+        """ The file the journal is written to. """
+
+        self._clock = clock
+        """ Stamps the records; live games pass their scheduler's clock. """
+
+        self._start = clock()
+
+        self._pending = deque[tuple]()
+        """ Records waiting to be written, as (elapsed, name, args) or (elapsed, event). """
+
+        self._closed = False
+        """ Set once the game is over; the writer closes the file after the last records. """
+
+        self._pending.append(header)
+
+    def record_input(self, name: str, args: tuple) -> None:
+        self._pending.append((self._clock() - self._start, name, args))
+
+    def record_event(self, event: GameEvent) -> None:
+        self._pending.append((self._clock() - self._start, event))
+
+    def close(self) -> None:
+        self._closed = True
+
+    def _drain(self) -> bytes:
+        """ Encodes the queued records. Only called by the writer. """
+        encoded = bytearray()
+        for _ in range(len(self._pending)):
+            record = self._pending.popleft()
+            match record:
+                case JournalHeader():
+                    encoded += encode_header(record)
+                case (elapsed, name, args):
+                    encoded += encode_input(elapsed, name, args)
+                case (elapsed, event):
+                    encoded += encode_event(elapsed, event)
+        return bytes(encoded)
+
+
+class JournalWriter:
+    """
+    Writes the journals of every game in the process on a thread of its
+    own. Every FLUSH_INTERVAL it writes what each journal has queued with a
+    single write per file, and every fsync_interval it fsyncs every file
+    written since the last time together, so the cost of a sync is shared
+    by all the games instead of paid per record.
+    """
+
+    def __init__(self, directory: str, fsync_interval: float = 1.0):
+        self._directory = directory
+        self._fsync_interval = fsync_interval
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = Lock()
+        self._files: dict[GameJournal, int] = {}
+        """ The open journals and their file descriptors. """
+
+        self._stopping = Event()
+        self._thread = Thread(target=self._run, name="JournalWriter", daemon=True)
+
+    def open(self, header: JournalHeader, clock: Callable[[], float] = time.monotonic) -> GameJournal:
+        """ Starts the journal of a game. """
+        # Game ids come from URLs, so hex-encode them rather than trust them as file names
+        game_name = (header.game_id or "").encode().hex()
+        file_name = f"{int(header.started * 1000)}{'-' + game_name if game_name else ''}{JOURNAL_SUFFIX}"
+        path = os.path.join(self._directory, file_name)
+        journal = GameJournal(path, header, clock)
+        descriptor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        with self._lock:
+            self._files[journal] = descriptor
+        return journal
+
+    def _write_all(self, unsynced: set[int]) -> None:
+        with self._lock:
+            files = list(self._files.items())
+
+        for journal, descriptor in files:
+            closing = journal._closed  # Read before draining, so nothing queued before close() is missed
+            data = journal._drain()
+            if data:
+                os.write(descriptor, data)
+                unsynced.add(descriptor)
+
+            if closing:
+                os.fsync(descriptor)
+                os.close(descriptor)
+                unsynced.discard(descriptor)
+                with self._lock:
+                    del self._files[journal]
+
+    def _sync_all(self, unsynced: set[int]) -> None:
+        for descriptor in unsynced:
+            os.fsync(descriptor)
+        unsynced.clear()
+
+    def _run(self):
+        unsynced = set[int]()
+        last_sync = time.monotonic()
+        while not self._stopping.wait(FLUSH_INTERVAL):
+            try:
+                self._write_all(unsynced)
+                if unsynced and time.monotonic() - last_sync >= self._fsync_interval:
+                    self._sync_all(unsynced)
+                    last_sync = time.monotonic()
+            except OSError:
+                logger.exception("failed to write journals")
+
+        # Write out and sync whatever is left before stopping
+        self._write_all(unsynced)
+        self._sync_all(unsynced)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """ Writes every queued record, syncs the files and stops the thread. """
+        self._stopping.set()
+        self._thread.join()
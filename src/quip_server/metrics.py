@@ -0,0 +1,46 @@
+import threading
+from collections import Counter
+
+from quip_model.events import GameEvent
+
+
+class EventMetrics:
+    """
+    Counts the events published by every game in the process, by type, and
+    how many bytes the publisher serialized and sent for them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()  # Sinks of different games are drained by different workers
+        self._events = Counter[str]()
+        self._encoded = Counter[str]()
+        self._serialized_bytes = Counter[str]()
+        self._sent_bytes = Counter[str]()
+
+    def record(self, event: GameEvent) -> None:
+        with self._lock:
+            self._events[event.__class__.__name__] += 1
+
+    def record_encoding(self, event: GameEvent, serialized_bytes: int, sent_bytes: int) -> None:
+        """ Records that an event was serialized into that many bytes, over every wire format, and sent as that many. """
+        name = event.__class__.__name__
+        with self._lock:
+            self._encoded[name] += 1
+            self._serialized_bytes[name] += serialized_bytes
+            self._sent_bytes[name] += sent_bytes
+
+    def snapshot(self) -> dict[str, int]:
+        """ The number of events of each type published so far. """
+        with self._lock:
+            return dict(self._events)
+
+    def encoding_totals(self) -> dict[str, tuple[int, int, int]]:
+        """ The number of events serialized so far, and the bytes serialized and sent for them, by event type. """
+        with self._lock:
+            return {name: (count, self._serialized_bytes[name], self._sent_bytes[name])
+                    for name, count in self._encoded.items()}
+
+    def bytes_per_event(self) -> dict[str, tuple[float, float]]:
+        """ The bytes serialized and the bytes sent per event so far, on average, by event type. """
+        return {name: (serialized / count, sent / count)
+                for name, (count, serialized, sent) in self.encoding_totals().items()}
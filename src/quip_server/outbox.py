@@ -0,0 +1,171 @@
+"""
+File: outbox.py
+Purpose: Queue the messages going out on each connection, so sending to a
+client on a bad network never holds up the game or the other clients.
+"""
+import threading
+from collections import deque
+from enum import Enum
+from logging import getLogger
+from typing import Callable
+
+from .config import OUTBOX_CAPACITY, OUTBOX_LAG_POLICY, OUTBOX_LAG_THRESHOLD
+
+logger = getLogger(__name__)
+
+
+class LagPolicy(Enum):
+    """ What an outbox does with new messages once its connection is lagging. """
+    COALESCE = "coalesce"  # Drop queued messages a new one makes stale; disconnect if the queue fills anyway
+    DROP = "drop"  # Drop the new message
+    DISCONNECT = "disconnect"  # Close the connection
+
+
+class Outbox:
+    """
+    A connection's bounded queue of outbound messages, already encoded in
+    its wire format. Senders only ever queue a message and return; the
+    connection's writer sends them, in order, either by blocking on get()
+    or by popping them when it is told there are some. Once more messages
+    are queued than the lag threshold, the lag policy decides what becomes
+    of the new ones.
+    """
+
+    __slots__ = ("capacity", "lag_threshold", "policy", "sent", "dropped", "coalesced", "closed", "disconnected",
+                 "_messages", "_lock", "_changed", "_idle", "_on_ready", "_on_lag")
+
+    def __init__(self, on_ready: Callable[[], None] = None, on_lag: Callable[[], None] = None,
+                 capacity: int = OUTBOX_CAPACITY, lag_threshold: int = OUTBOX_LAG_THRESHOLD,
+                 policy: LagPolicy = LagPolicy(OUTBOX_LAG_POLICY)):
+        """
+        Parameters:
+            on_ready (Callable): Called when a message is queued while the writer has nothing left to pop.
+            on_lag (Callable): Called when the lag policy disconnects the connection; it should drop the connection.
+            capacity (int): The most messages queued, past which a coalescing connection is disconnected.
+            lag_threshold (int): The number of queued messages past which the lag policy applies.
+            policy (LagPolicy): What to do with new messages while the connection is lagging.
+        """
+        self.capacity = capacity
+        self.lag_threshold = lag_threshold
+        self.policy = policy
+
+        self.sent = 0
+        """ The number of messages handed to the writer. """
+
+        self.dropped = 0
+        """ The number of messages dropped because the connection was lagging. """
+
+        self.coalesced = 0
+        """ The number of queued messages dropped because a newer one made them stale. """
+
+        self.closed = False
+        """ True once the connection is closed; nothing more is queued. """
+
+        self.disconnected = False
+        """ True if the lag policy closed the connection. """
+
+        self._messages = deque[tuple[str | None, str | bytes]]()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+        self._idle = True
+        """ True once the writer has popped every message, until the next one is queued. """
+
+        self._on_ready = on_ready
+        self._on_lag = on_lag
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    @property
+    def idle(self) -> bool:
+        """ Whether the writer has sent every message queued so far. """
+        return self._idle
+
+    def _coalesce(self, coalesce_key: str) -> None:
+        for index, (key, _) in enumerate(self._messages):
+            if key == coalesce_key:
+                del self._messages[index]
+                self.coalesced += 1
+                return
+
+    def _disconnect(self) -> None:
+        self.closed = True
+        self.disconnected = True
+        self.dropped += len(self._messages)
+        self._messages.clear()
+        self._changed.notify_all()
+
+    def offer(self, payload: str | bytes, coalesce_key: str = None) -> None:
+        """
+        Queues a message without waiting for it to be sent.
+
+        Parameters:
+            payload (str | bytes): The message, encoded in the connection's wire format.
+            coalesce_key (str): Set for messages that a newer one with the same key makes stale.
+        """
+        with self._lock:
+            if self.closed:
+                return
+
+            if len(self._messages) >= self.lag_threshold:
+                match self.policy:
+                    case LagPolicy.COALESCE:
+                        if coalesce_key is not None:
+                            self._coalesce(coalesce_key)
+                        if len(self._messages) >= self.capacity:
+                            self._disconnect()
+                    case LagPolicy.DROP:
+                        self.dropped += 1
+                        return
+                    case LagPolicy.DISCONNECT:
+                        self._disconnect()
+
+            if self.disconnected:
+                lagging = True
+            else:
+                lagging = False
+                self._messages.append((coalesce_key, payload))
+                self._changed.notify_all()
+                ready, self._idle = self._idle, False
+
+        if lagging:
+            logger.warning(f"disconnected a connection that fell {self.lag_threshold} messages behind")
+            if self._on_lag is not None:
+                self._on_lag()
+        elif ready and self._on_ready is not None:
+            self._on_ready()
+
+    def pop(self) -> str | bytes | None:
+        """ Takes the next message, or returns None if there isn't one. """
+        with self._lock:
+            if not self._messages:
+                self._idle = True
+                self._changed.notify_all()
+                return None
+            self.sent += 1
+            return self._messages.popleft()[1]
+
+    def get(self) -> str | bytes | None:
+        """ Takes the next message, waiting for one if need be. Returns None once the outbox is closed. """
+        with self._lock:
+            while not self._messages:
+                if self.closed:
+                    return None
+                self._idle = True
+                self._changed.notify_all()
+                self._changed.wait()
+            self.sent += 1
+            return self._messages.popleft()[1]
+
+    def wait_sent(self, timeout: float) -> bool:
+        """ Waits for the writer to send every message. Returns False if some were still unsent after timeout. """
+        with self._lock:
+            return self._changed.wait_for(lambda: self._idle or self.closed, timeout)
+
+    def close(self) -> None:
+        """ Stops queuing messages, e.g. because the connection closed. Messages still queued are dropped. """
+        with self._lock:
+            self.closed = True
+            self._messages.clear()
+            self._changed.notify_all()
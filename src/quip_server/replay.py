@@ -0,0 +1,197 @@
+"""
+File: replay.py
+Purpose: Feed a game journal back through a fresh GameMaster and
+GamePublisher as fast as possible, to reproduce a game that was played on
+a live server or to benchmark the event pipeline against real traffic.
+
+Run from the src folder:
+    python3 -m quip_server.replay [--wire-format FORMAT] JOURNAL [JOURNAL ...]
+"""
+import argparse
+import time
+from dataclasses import dataclass
+from logging import getLogger
+from random import Random
+
+from quip_model import snapshot
+from quip_model.clock import FakeClock
+from quip_model.events import AudienceJoinEvent, GameEvent, PlayerLeaveEvent
+from quip_model.game_master import GameMaster
+from quip_model.journal import RECORD_EVENT, RECORD_INPUT, apply_input, event_code, event_fields, read_header, \
+    read_records
+from quip_model.prompt_corpus import PromptCorpus, default_corpus
+from quip_model.wire import JSON, WIRE_FORMATS, WireFormat
+from .metrics import EventMetrics
+from .server_publisher import GamePublisher
+
+logger = getLogger(__name__)
+
+
+class _ReplayConnection:
+    """ Stands in for a client's connection; counts the messages it is sent, then drops them. """
+
+    def __init__(self, wire_format: WireFormat):
+        self.wire_format = wire_format
+        self.messages_sent = 0
+        self.bytes_sent = 0
+
+    def send(self, message):
+        self.send_encoded(self.wire_format.dumps(message))
+
+    def send_encoded(self, payload: str | bytes, coalesce_key: str = None):
+        self.messages_sent += 1
+        self.bytes_sent += len(payload)
+
+
+class _InlineBroadcaster:
+    """ Stands in for the AudienceBroadcaster, sending on the calling thread. """
+
+    def broadcast(self, payloads: dict, connections: list, coalesce_key: str = None):
+        for connection in connections:
+            connection.send_encoded(payloads[connection.wire_format], coalesce_key)
+
+
+@dataclass(slots=True)
+class ReplayResult:
+    """ What happened when a journal was replayed. """
+
+    game: GameMaster
+    """ The game, as the replay left it. """
+
+    inputs: int
+    """ The number of inputs fed to the game. """
+
+    rejected: int
+    """ The number of inputs the game raised an error for, as it would have on the live server. """
+
+    events: int
+    """ The number of events the game published during the replay. """
+
+    recorded_events: int
+    """ The number of events in the journal. """
+
+    diverged_at: int | None
+    """ The index of the first event that differs from the journal, or None if they all match. """
+
+    messages_sent: int
+    """ The number of messages the publisher sent. """
+
+    bytes_sent: int
+    """ The size of those messages, in the wire format the replay's clients spoke. """
+
+    bytes_serialized: int
+    """ The bytes the publisher serialized to send them; a message sent to many connections is serialized once. """
+
+    elapsed: float
+    """ The wall clock time the replay took, in seconds. """
+
+
+def replay(data: bytes, corpus: PromptCorpus = None, wire_format: WireFormat = JSON) -> ReplayResult:
+    """
+    Replays a journal. Inputs are applied at the times they were recorded,
+    on a FakeClock and with the game's own pacing, so deadlines and pauses
+    fall the same way they did on the live server but nothing waits.
+    Inputs are recorded as they arrive, so ones that raced each other on
+    the live server can take effect in a different order; the result's
+    diverged_at shows where that happened.
+
+    Parameters:
+        data (bytes): The contents of the journal.
+        corpus (PromptCorpus): The corpus the game drew its prompts from. Defaults to the built-in prompts.
+        wire_format (WireFormat): The wire format every client speaks.
+    """
+    records = read_records(data)
+    header = read_header(next(records))
+    corpus = corpus if corpus is not None else default_corpus()
+    if corpus.fingerprint != header.corpus_fingerprint:
+        logger.warning("the journal was recorded with different prompts; the replay will diverge")
+
+    recorded_events = list[tuple]()
+    replayed_events = list[tuple]()
+    connections = list[_ReplayConnection]()
+    rejected = 0
+
+    scheduler = FakeClock()
+    metrics = EventMetrics()
+    publisher = GamePublisher(_InlineBroadcaster(), metrics, scheduler.now)
+
+    def observe(event: GameEvent):
+        replayed_events.append((event_code(event), event_fields(event)))
+        publisher.publish(event)
+
+    game = GameMaster(observe, scheduler, rng=Random(header.seed), corpus=corpus,
+                      pacing=header.pacing)
+    if header.snapshot is not None:
+        snapshot.restore(game, header.snapshot)
+        game.resume()
+
+    def connect() -> _ReplayConnection:
+        connection = _ReplayConnection(wire_format)
+        connections.append(connection)
+        return connection
+
+    def apply(name: str, args: tuple):
+        nonlocal rejected
+        try:
+            result = apply_input(game, name, args)
+        except Exception as error:
+            logger.debug(f"{name}{args} was rejected: {error}")
+            rejected += 1
+            return
+
+        # Do what GameServer and the controllers do around these inputs
+        match name:
+            case "add_connection":
+                publisher.add_subscriber(result, connect())
+            case "add_audience_member":
+                publisher.add_audience_member(result, connect())
+                game.observer(AudienceJoinEvent(result))
+            case "remove_player":
+                game.observer(PlayerLeaveEvent(args[0]))
+
+    inputs = 0
+    for record in records:
+        if record[0] == RECORD_INPUT:
+            _, elapsed, name, args = record
+            scheduler.call_later(elapsed, apply, name, args)
+            inputs += 1
+        elif record[0] == RECORD_EVENT:
+            _, _, code, fields = record
+            recorded_events.append((code, fields))
+
+    start = time.perf_counter()
+    scheduler.run()
+    elapsed = time.perf_counter() - start
+
+    diverged_at = next((index for index, (recorded, replayed) in enumerate(zip(recorded_events, replayed_events))
+                        if recorded != replayed), None)
+    if diverged_at is None and len(recorded_events) != len(replayed_events):
+        diverged_at = min(len(recorded_events), len(replayed_events))
+
+    return ReplayResult(game, inputs, rejected, len(replayed_events), len(recorded_events), diverged_at,
+                        sum(connection.messages_sent for connection in connections),
+                        sum(connection.bytes_sent for connection in connections),
+                        sum(serialized for _, serialized, _ in metrics.encoding_totals().values()),
+                        elapsed)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("journals", nargs="+", help="journal files to replay")
+    parser.add_argument("--prompt-packs", nargs="*", help="the prompt packs the games were played with")
+    parser.add_argument("-f", "--wire-format", choices=WIRE_FORMATS, default=JSON.name,
+                        help="the wire format every client speaks")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    replay_corpus = PromptCorpus.from_files(args.prompt_packs) if args.prompt_packs else None
+    for path in args.journals:
+        with open(path, "rb") as journal_file:
+            result = replay(journal_file.read(), replay_corpus, WIRE_FORMATS[args.wire_format])
+        diverged = "matches the journal" if result.diverged_at is None else f"diverged at event {result.diverged_at}"
+        print(f"{path}: {result.inputs} inputs ({result.rejected} rejected), {result.events} events, "
+              f"{result.messages_sent} messages / {result.bytes_sent:,} bytes "
+              f"({result.bytes_serialized:,} serialized) in {result.elapsed * 1000:.1f} ms, "
+              f"{diverged}")
@@ -0,0 +1,94 @@
+import heapq
+import itertools
+from logging import getLogger
+from threading import Condition, Thread
+from typing import Callable
+
+from quip_model.clock import Clock, RealClock
+
+logger = getLogger(__name__)
+
+
+class ScheduledCall:
+    """ A call waiting in the GameScheduler's heap. """
+
+    __slots__ = ("deadline", "callback", "args", "cancelled")
+
+    def __init__(self, deadline: float, callback: Callable[..., None], args: tuple):
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+class GameScheduler:
+    """
+    Runs the deadlines and pauses of every game in the process on a single
+    thread, so the number of threads stays flat as games are added.
+    Calls are kept in a heap ordered by deadline; cancelled calls are
+    dropped when they reach the top. Deadlines are kept on the scheduler's
+    clock, so an accelerated clock speeds every game up.
+    """
+
+    def __init__(self, clock: Clock = None):
+        self.clock = clock if clock is not None else RealClock()
+        self._condition = Condition()
+        self._heap: list[tuple[float, int, ScheduledCall]] = []
+        self._sequence = itertools.count()  # Keeps calls with equal deadlines in FIFO order
+        self._is_running = False
+        self._thread = Thread(target=self._run, name="GameScheduler", daemon=True)
+
+    def now(self) -> float:
+        return self.clock.now()
+
+    def call_later(self, delay: float, callback: Callable[..., None], *args) -> ScheduledCall:
+        call = ScheduledCall(self.clock.now() + delay, callback, args)
+        with self._condition:
+            heapq.heappush(self._heap, (call.deadline, next(self._sequence), call))
+            # Only wake the thread if this call is now the next one due
+            if self._heap[0][2] is call:
+                self._condition.notify()
+        return call
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def _next_due(self) -> ScheduledCall | None:
+        with self._condition:
+            while self._is_running:
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+
+                deadline, _, call = self._heap[0]
+                if call.cancelled:
+                    heapq.heappop(self._heap)
+                    continue
+
+                remaining = deadline - self.clock.now()
+                if remaining <= 0:
+                    heapq.heappop(self._heap)
+                    return call
+
+                self._condition.wait(remaining / self.clock.rate)
+            return None
+
+    def _run(self):
+        while (call := self._next_due()) is not None:
+            try:
+                call.callback(*call.args)
+            except Exception:
+                logger.exception(f"scheduled call {call.callback} failed")
+
+    def start(self):
+        self._is_running = True
+        self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._is_running = False
+            self._condition.notify()
+        self._thread.join()
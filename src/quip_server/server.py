@@ -1,30 +1,220 @@
 import logging
+import secrets
+import time
+from enum import Enum
+from random import Random
 
-from gamecomm.server import GameConnection
-
-from quip_model.game_master import GameMaster
-from .server_controller import GameController
+from quip_model.events import *
+from quip_model import codec, snapshot
+from quip_model.exceptions import AudienceFull
+from quip_model.game_master import GameMaster, GamePhase
+from quip_model.id_allocator import IdAllocator
+from quip_model.journal import JournalHeader
+from quip_model.pacing import DEFAULT_PACING, GamePacing
+from quip_model.prompt_corpus import PromptCorpus
+from .async_listener import AsyncGameConnection
+from .audience_broadcaster import AudienceBroadcaster
+from .config import EVENT_SINKS
+from .connections import WireConnection
+from .event_bus import EventBus, Sink, parse_sink_config
+from .journal_writer import GameJournal, JournalWriter
+from .metrics import EventMetrics
+from .scheduler import GameScheduler
+from .server_controller import GameController, AudienceController
 from .server_publisher import GamePublisher
+from .sessions import SessionRegistry, requested_session
+from .snapshot_store import SnapshotStore
 from .server_ui.server_gui import ServerGUI
 
 logger = logging.getLogger(__name__)
 
+MAX_PLAYERS = 8
+
+# Events that are shown on the server's GUI
+GUI_EVENTS = (RoundStartedEvent, PlayerLeaveEvent, BeginVotingEvent, BeginPromptVotingEvent, EndPromptVotingEvent,
+              ScoreboardEvent)
+
+# The queue capacity and overflow policy of each kind of sink
+SINKS = parse_sink_config(EVENT_SINKS)
+
+
+class GameLifecycle(Enum):
+    """ Where a game is in its life on the server, which decides how long it is kept while nothing happens in it. """
+    CREATED = "created"  # Nobody has connected to it yet
+    LOBBY = "lobby"  # Players are connected, waiting for the round to start
+    PLAYING = "playing"  # The round is under way
+    FINISHED = "finished"  # The round is over
+    EMPTY = "empty"  # Everyone who connected has left before the round was over
+
 
 class GameServer:
 
-    def __init__(self, game_id: str, ui: ServerGUI):
+    def __init__(self, game_id: str, ui: ServerGUI, scheduler: GameScheduler, broadcaster: AudienceBroadcaster,
+                 bus: EventBus, metrics: EventMetrics, corpus: PromptCorpus, store: SnapshotStore = None,
+                 saved: bytes = None, journals: JournalWriter = None, pacing: GamePacing = DEFAULT_PACING,
+                 ids: IdAllocator = None):
+        """
+        Creates the server for a game, restoring the game from a snapshot if
+        one is given; a restored game keeps the pacing it was snapshotted
+        with. The game's events are carried to the publisher, the GUI, the
+        metrics and the journal by the event bus. The game is snapshotted to
+        the store, if there is one, at every phase boundary, and its inputs
+        and events are journaled if there is a journal writer. Player ids
+        come from ids if it is given, or else from the game's own allocator.
+        """
         self._game_id = game_id
-        self._publisher = GamePublisher(ui)
-        self._game = GameMaster(observer=self._publisher.publish)
+        self._publisher = GamePublisher(broadcaster, metrics, scheduler.now)
+        self._sessions = SessionRegistry()
+        self._scheduler = scheduler
+        self._store = store
+        self._journal: GameJournal | None = None
+        self._closed = False
         self.ui = ui
 
-    def handle_connection(self, connection: GameConnection):
-        if len(self._game.players) >= 8 or self._game.is_playing:
-            message = { "event": "GameFullEvent", "game-id": self._game_id }
-            connection.send(message)
+        self.connections = 0
+        """ The connections being served, counted by the GameRegistry. """
+
+        self.last_active = scheduler.now()
+        """ The scheduler's clock time of the game's latest event or connection. """
+
+        # A restored game had players, who may never come back
+        self._joined = saved is not None
+
+        # Seed the game ourselves, so a replay of its journal draws the same ids and prompts
+        seed = secrets.randbits(64)
+        sinks = [Sink("publisher", self._publish, *SINKS["publisher"]),
+                 Sink("gui", self._show_on_ui, *SINKS["gui"]),
+                 Sink("metrics", metrics.record, *SINKS["metrics"])]
+        if journals is not None:
+            self._journal = journals.open(JournalHeader(game_id, seed, corpus.fingerprint, time.time(), saved, pacing),
+                                          clock=scheduler.now)
+            sinks.append(Sink("journal", self._journal.record_event, *SINKS["journal"]))
+        observer = bus.attach(sinks)
+
+        self._game = GameMaster(observer=observer, scheduler=scheduler, rng=Random(seed), corpus=corpus,
+                                checkpoint=self._on_checkpoint if store or journals else None,
+                                recorder=self._journal.record_input if self._journal else None, pacing=pacing,
+                                ids=ids)
+
+        if saved is not None:
+            snapshot.restore(self._game, saved)
+            self._game.resume()
+
+    @property
+    def game_id(self) -> str:
+        return self._game_id
+
+    @property
+    def lifecycle(self) -> GameLifecycle:
+        if self._game.phase == GamePhase.FINISHED:
+            return GameLifecycle.FINISHED
+        if self.connections == 0:
+            return GameLifecycle.EMPTY if self._joined else GameLifecycle.CREATED
+        return GameLifecycle.PLAYING if self._game.is_playing else GameLifecycle.LOBBY
+
+    def enter(self):
+        """ Counts a connection in. Called by the GameRegistry, with its lock held. """
+        self.connections += 1
+        self._joined = True
+        self.last_active = self._scheduler.now()
+
+    def leave(self):
+        """ Counts a connection out. Called by the GameRegistry, with its lock held. """
+        self.connections -= 1
+        self.last_active = self._scheduler.now()
+
+    def close(self):
+        """
+        Drops the game for good: stops it, drops its connections, closes
+        its journal and deletes its snapshot, so it isn't restored either.
+        """
+        self._closed = True
+        self._game.stop()
+        self._publisher.disconnect_all()
+        if self._journal is not None:
+            self._journal.close()
+        if self._store is not None:
+            self._store.delete(self._game_id)
+
+    def outbox_stats(self) -> dict[str, int]:
+        """ The messages queued, sent and dropped on the game's connections, totalled. """
+        return self._publisher.outbox_stats()
+
+    def _publish(self, event: GameEvent):
+        self.last_active = self._scheduler.now()
+        self._publisher.publish(event)
+
+    def _show_on_ui(self, event: GameEvent):
+        if isinstance(event, GUI_EVENTS):
+            self.ui.event_queue.put(event)
+
+    def _on_checkpoint(self, game: GameMaster):
+        if self._closed:
             return
-        
+        finished = game.phase == GamePhase.FINISHED
+        if self._store is not None:
+            if finished:
+                self._store.delete(self._game_id)
+            else:
+                self._store.save(self._game_id, snapshot.encode(game))
+
+        if finished and self._journal is not None:
+            self._journal.close()
+
+    def _admit(self, connection: WireConnection) -> GameController | None:
+        """
+        Seats a new connection as a player, or in the audience if it arrived
+        too late to play. A connection resuming a player's session takes
+        that player's place back.
+
+        Returns:
+            The controller that handles the connection's messages, or None if the game is full.
+        """
+        token, since = requested_session(connection.path)
+        if token is not None:
+            player_num = self._sessions.player_for(token)
+            if player_num is not None:
+                return self._resume(connection, player_num, since)
+            logger.info(f"{connection} asked to resume a session that isn't open; admitting it as a new connection")
+
+        # Restored players reconnect as players, by joining with their old nickname
+        if not self._game.reconnecting and (len(self._game.players) >= MAX_PLAYERS or self._game.is_playing):
+            return self._admit_audience_member(connection)
+
         player_num = self._game.add_connection()
-        controller = GameController(connection, player_num, self._game, self.ui)
+        controller = GameController(connection, player_num, self._game, self.ui, self._publisher, self._sessions)
         self._publisher.add_subscriber(player_num, connection)
-        controller.run()
+        return controller
+
+    def _resume(self, connection: WireConnection, player_num: int, since: int) -> GameController:
+        stale = self._publisher.resume(player_num, connection, since)
+        if stale is not None:
+            # The old connection may not have noticed it dropped yet; make sure its controller stops
+            stale.outbox.close()
+            stale.abort()
+        logger.info(f"player {player_num} resumed their session on {connection}")
+        return GameController(connection, player_num, self._game, self.ui, self._publisher, self._sessions)
+
+    def _admit_audience_member(self, connection: WireConnection) -> AudienceController | None:
+        try:
+            seat = self._game.add_audience_member()
+        except AudienceFull:
+            connection.send(codec.encode(GameFullEvent(self._game_id)))
+            return None
+
+        controller = AudienceController(connection, seat, self._game, self.ui, self._publisher, self._sessions)
+        self._publisher.add_audience_member(seat, connection)
+        self._game.observer(AudienceJoinEvent(seat))
+        return controller
+
+    def handle_connection(self, connection: WireConnection):
+        """ Serves a connection on the calling thread until it closes. """
+        controller = self._admit(connection)
+        if controller is not None:
+            controller.run()
+
+    async def handle_connection_async(self, connection: AsyncGameConnection):
+        """ Serves a connection on the event loop until it closes. """
+        controller = self._admit(connection)
+        if controller is not None:
+            await controller.run_async()
@@ -1,4 +1,3 @@
-import threading
 from logging import getLogger
 
 from gamecomm.server import GameConnection, ConnectionClosed
@@ -7,6 +6,8 @@ from quip_model.events import *
 from quip_model.exceptions import *
 from quip_model.game_master import GameMaster
 from quip_model.response import PromptResponse, VoteResponse
+from .server_publisher import GamePublisher
+from .sessions import SessionRegistry
 from .server_ui.server_gui import ServerGUI
 
 logger = getLogger(__name__)
@@ -16,43 +17,40 @@ RECV_TIMEOUT = 1
 
 class GameController:
 
-    def __init__(self, connection: GameConnection, player_num: int, game: GameMaster, ui: ServerGUI):
+    def __init__(self, connection: GameConnection, player_num: int, game: GameMaster, ui: ServerGUI,
+                 publisher: GamePublisher, sessions: SessionRegistry):
         self._connection = connection
         self._player_num = player_num
         self._game = game
         self.ui = ui
+        self._publisher = publisher
+        self._sessions = sessions
 
     def _handle_start_message(self, message):
-        num_players = len(self._game.players.players)
+        num_players = len(self._game.players)
         if num_players < 3:
             raise NotEnoughPlayers(f"Need at least 3 players to start the game, only have {num_players}.")
-        game_thread = threading.Thread(target=self._game.play_round)
-        game_thread.start()
-        self.ui.event_queue.put(RoundStartedEvent(1))
+        # Returns right away; the rest of the round is driven by the game scheduler
+        self._game.play_round()
 
-    def _handle_nickname_message(self, message):
+    def _handle_nickname_message(self, message) -> str:
         nickname = message["content"]
-        self._game.accept_new_player(self._player_num, nickname)
+        # A player restored from a snapshot gets their old number back
+        self._player_num = self._game.accept_new_player(self._player_num, nickname)
         self.ui.event_queue.put(PlayerNicknameEvent(self._player_num, nickname))
+        # The token the player's client resumes their session with if its connection drops
+        return self._sessions.open(self._player_num)
 
     def _handle_responses_message(self, message):
         player_num = message["player_num"]
-        self._game.observer(PlayerResponseEvent(player_num))
 
-        # Set the responses inside the player objects
+        # Hand the responses to the game, which stores them with their prompts
         prompt_0_id = message["prompt_0_id"]
         prompt_1_id = message["prompt_1_id"]
         response_0 = message["response_0"]
         response_1 = message["response_1"]
-        player = self._game.players.get_player_by_id(player_num)
-        prompt_0 = self._game.prompts.get_prompt_by_id(prompt_0_id)
-        prompt_1 = self._game.prompts.get_prompt_by_id(prompt_1_id)
-        prompt_0.receive_response(PromptResponse(prompt_0_id, player_num, response_0))
-        prompt_1.receive_response(PromptResponse(prompt_1_id, player_num, response_1))
-        player.current_prompts = [prompt_0, prompt_1]
-
-        with self._game.responses_received_lock:
-            self._game.responses_received += 1
+        self._game.receive_responses(player_num, (PromptResponse(prompt_0_id, player_num, response_0),
+                                                  PromptResponse(prompt_1_id, player_num, response_1)))
 
         self.ui.event_queue.put(PlayerResponseEvent(player_num))
 
@@ -62,23 +60,15 @@ class GameController:
         prompt_id = message["prompt_id"]
         player_vote = message["vote"]
 
-        # Get player and prompt objects
-        player = self._game.players.get_player_by_id(player_num)
-        prompt = self._game.prompts.get_prompt_by_id(prompt_id)
-
-        # Publish vote event with player name and vote
-        self._game.observer(PlayerVoteEvent(player.name, player_vote))
+        self._game.receive_vote(VoteResponse(prompt_id, player_num, player_vote))
 
-        # Receive vote
-        vote = VoteResponse(prompt_id, player_num, player_vote)
-        prompt.receive_vote(vote)
-
-        # Update votes received in game model:
-        with self._game.votes_received_lock:
-            self._game.votes_received += 1
+    def _handle_sync_message(self, message):
+        # Answered with the messages the client missed, instead of the usual OK
+        self._publisher.catch_up(self._connection, message.get("seq", 0), player_num=self._player_num)
 
     def _handle_leave_message(self, message):
         player_num = message["player_num"]
+        self._sessions.close(player_num)
         self._game.remove_player(player_num)
         self._game.observer(PlayerLeaveEvent(player_num))
 
@@ -90,27 +80,34 @@ class GameController:
         Handles the incoming request's JSON message. 'message' is a JSON formatted message.
         """
         print(message)
+        response = {"status": "ok"}
         try:
             match message["type"]:
                 case "start":
                     self._handle_start_message(message)
                 case "nickname":
-                    self._handle_nickname_message(message)
+                    session = self._handle_nickname_message(message)
+                    if session is not None:
+                        response["session"] = session
                 case "responses":
                     self._handle_responses_message(message)
                 case "vote":
                     self._handle_vote_message(message)
                 case "leave":
                     self._handle_leave_message(message)
+                case "sync":
+                    self._handle_sync_message(message)
+                    return
                 case _:
                     pass
 
-        except (PlayerNameAlreadyInUse, PlayerResponseError, PlayerNicknameError, NotEnoughPlayers) as error:
+        except (PlayerNameAlreadyInUse, PlayerResponseError, PlayerVoteError, PlayerNicknameError,
+                NotEnoughPlayers) as error:
             self._log_and_send_error_message(error, message)
             return
 
         # If no errors occurred, send an OK message
-        self._connection.send({"status": "ok"})
+        self._connection.send(response)
 
     def run(self):
         while True:
@@ -121,3 +118,43 @@ class GameController:
                 break
             except TimeoutError:
                 pass
+
+    async def run_async(self):
+        """ Like run, for a connection served on the event loop: waits for messages without holding a thread. """
+        async for message in self._connection.messages():
+            self._handle_request(message)
+
+
+class AudienceController(GameController):
+    """
+    Handles the messages of a spectator. Spectators can only vote and leave;
+    their player number is their audience seat.
+    """
+
+    def _handle_start_message(self, message):
+        pass
+
+    def _handle_nickname_message(self, message):
+        pass
+
+    def _handle_responses_message(self, message):
+        pass
+
+    def _handle_vote_message(self, message):
+        self._game.receive_audience_vote(self._player_num, message["prompt_id"], message["vote"])
+
+    def _handle_sync_message(self, message):
+        self._publisher.catch_up(self._connection, message.get("seq", 0), seat=self._player_num)
+
+    def _handle_leave_message(self, message):
+        if self._player_num in self._game.audience:
+            self._game.remove_audience_member(self._player_num)
+
+    def run(self):
+        super().run()
+        # The connection is gone, give up the seat
+        self._handle_leave_message(None)
+
+    async def run_async(self):
+        await super().run_async()
+        self._handle_leave_message(None)
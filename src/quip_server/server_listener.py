@@ -1,32 +1,165 @@
-from threading import Lock
-
-from gamecomm.server import GameConnection, WsGameListener
+import socket
+from collections import Counter
+from random import SystemRandom
+from typing import Callable
 
+from quip_model import codec
+from quip_model.clock import AcceleratedClock, RealClock
+from quip_model.events import GameFullEvent
+from quip_model.exceptions import SnapshotError, TooManyGames
+from quip_model.id_allocator import PROCESS_ID_SPACE, IdAllocator
+from quip_model.pacing import parse_pacing
+from quip_model.prompt_corpus import PromptCorpus, default_corpus
+from .async_listener import AsyncGameConnection, AsyncGameListener
+from .audience_broadcaster import AudienceBroadcaster
+from .config import CLOCK_RATE, EVENT_BUS_WORKERS, GAME_DIRECTORY_URL, GAME_IDLE_TTLS, GAME_NODE_SECRET, \
+    GAME_PACING, HEARTBEAT_INTERVAL, JOURNAL_DIR, JOURNAL_FSYNC_INTERVAL, MAX_GAMES, PLAYER_ID_SCOPE, PROMPT_PACKS, \
+    PUBLIC_WS_URL, SERVER_MODE, SNAPSHOT_DIR
+from .connections import WireConnection, WsWireGameListener
+from .event_bus import EventBus
+from .game_registry import GameRegistry, parse_idle_ttls
+from .heartbeat import HeartbeatReporter
+from .journal_writer import JournalWriter
+from .metrics import EventMetrics
+from .scheduler import GameScheduler
 from .server import GameServer
+from .snapshot_store import SnapshotStore
 from .server_ui.server_gui import *
 
 LOCAL_IP = "0.0.0.0"
 LOCAL_PORT = 10020
+METRICS_LOG_INTERVAL = 60  # Time (in clock seconds) between logs of the event metrics
 
 logger = logging.getLogger(__name__)
 
 
 class GameListener:
 
-    def __init__(self, ui):
-        self._lock = Lock()
-        self._game_servers: dict[str, GameServer] = {}
+    def __init__(self, ui, owns: Callable[[str], bool] = None):
+        """
+        Parameters:
+            ui: The server's GUI.
+            owns (Callable): Tells whether a game is this server's to restore, when several share the snapshots.
+        """
         self._ui = ui
+        self._owns = owns
+        clock = AcceleratedClock(CLOCK_RATE) if CLOCK_RATE != 1 else RealClock()
+        self._scheduler = GameScheduler(clock)  # One timer thread drives the phases of every game
+        # The games being hosted; idle ones are evicted on the scheduler
+        self._games = GameRegistry(self._create_game_server, self._scheduler, MAX_GAMES,
+                                   parse_idle_ttls(GAME_IDLE_TTLS))
+        self._pacing = parse_pacing(GAME_PACING)  # The deadlines and pauses new games are created with
+        # Hands out the player ids of every game, if they are unique across the process; each game has its own if not
+        self._ids = IdAllocator(PROCESS_ID_SPACE, SystemRandom()) if PLAYER_ID_SCOPE == "process" else None
+        self._broadcaster = AudienceBroadcaster()  # One thread sends to the spectators of every game
+        self._corpus = self._load_corpus()  # Every game draws its prompts from this one store
+        self._store = SnapshotStore(SNAPSHOT_DIR) if SNAPSHOT_DIR else None
+        self._journals = JournalWriter(JOURNAL_DIR, JOURNAL_FSYNC_INTERVAL) if JOURNAL_DIR else None
+        self._bus = EventBus(EVENT_BUS_WORKERS)  # Carries every game's events to its publisher, GUI, metrics and journal
+        self._metrics = EventMetrics()
+        # Tells the API's game directory how loaded this process is, so it places new games where there is room
+        self._heartbeat = HeartbeatReporter(GAME_DIRECTORY_URL, GAME_NODE_SECRET, PUBLIC_WS_URL, HEARTBEAT_INTERVAL,
+                                            self._load) if GAME_DIRECTORY_URL else None
+
+    @staticmethod
+    def _load_corpus() -> PromptCorpus:
+        if not PROMPT_PACKS:
+            return default_corpus()
+
+        corpus = PromptCorpus.from_files(PROMPT_PACKS)
+        logger.info(f"loaded {len(corpus)} prompts from {len(PROMPT_PACKS)} prompt packs")
+        return corpus
+
+    def _restore_games(self):
+        """ Brings back every game that was snapshotted before the server last stopped. """
+        for game_id, saved in self._store.load_all():
+            if self._owns is not None and not self._owns(game_id):
+                continue
+            if len(self._games) >= self._games.max_games:
+                # Its snapshot is kept, for a restart with room for it
+                logger.error(f"could not restore game {game_id}: already hosting {len(self._games)} games")
+                continue
+            try:
+                server = GameServer(game_id, self._ui, self._scheduler, self._broadcaster, self._bus, self._metrics,
+                                    self._corpus, self._store, saved, self._journals, ids=self._ids)
+            except SnapshotError as error:
+                logger.error(f"could not restore game {game_id}: {error}")
+                self._store.delete(game_id)
+                continue
+            self._games.add(game_id, server)
+            logger.info(f"restored game {game_id}")
+
+    def _create_game_server(self, game_id: str) -> GameServer:
+        return GameServer(game_id, self._ui, self._scheduler, self._broadcaster, self._bus, self._metrics,
+                          self._corpus, self._store, journals=self._journals, pacing=self._pacing, ids=self._ids)
+
+    def _join(self, connection: WireConnection) -> GameServer | None:
+        """ The game a connection asks for, or None if the server has no room for it, in which case it is told so. """
+        try:
+            return self._games.join(connection.gid)
+        except TooManyGames as error:
+            logger.warning(f"refused {connection}: {error}")
+            connection.send(codec.encode(GameFullEvent(connection.gid)))
+            return None
+
+    def _load(self) -> dict[str, int]:
+        """ The games hosted, their connections and the most games hosted at once, as reported to the directory. """
+        servers = self._games.servers()
+        return {"games": len(servers), "connections": sum(server.connections for server in servers),
+                "max_games": self._games.max_games}
+
+    def _log_metrics(self):
+        logger.info(f"events published: {self._metrics.snapshot()}")
+        bytes_per_event = {name: f"{serialized:.0f}/{sent:.0f}"
+                           for name, (serialized, sent) in self._metrics.bytes_per_event().items()}
+        logger.info(f"bytes serialized/sent per event: {bytes_per_event}")
+        logger.info(f"event sinks: {self._bus.stats()}")
+        logger.info(f"games: {self._games.stats()}")
+
+        outboxes = Counter[str]()
+        for server in self._games.servers():
+            stats = server.outbox_stats()
+            outboxes["max_queued"] = max(outboxes["max_queued"], stats.pop("max_queued"))
+            outboxes.update(stats)
+        logger.info(f"connection outboxes: {dict(outboxes)}")
+        self._scheduler.call_later(METRICS_LOG_INTERVAL, self._log_metrics)
 
-    def _find_or_create_game_server(self, game_id: str) -> GameServer:
-        with self._lock:
-            if game_id not in self._game_servers:
-                self._game_servers[game_id] = GameServer(game_id, self._ui)
-            return self._game_servers[game_id]
+    def handle_connection(self, connection: WireConnection):
+        server = self._join(connection)
+        if server is None:
+            return
+        try:
+            server.handle_connection(connection)
+        finally:
+            self._games.leave(server)
 
-    def handle_connection(self, connection: GameConnection):
-        self._find_or_create_game_server(connection.gid).handle_connection(connection)
+    async def handle_connection_async(self, connection: AsyncGameConnection):
+        server = self._join(connection)
+        if server is None:
+            return
+        try:
+            await server.handle_connection_async(connection)
+        finally:
+            self._games.leave(server)
 
-    def run(self):
-        ws_listener = WsGameListener(LOCAL_IP, LOCAL_PORT, on_connection=self.handle_connection)
-        ws_listener.run()
+    def run(self, sock: socket.socket = None):
+        """ Serves connections until interrupted, on the given listening socket or else on LOCAL_IP:LOCAL_PORT. """
+        self._scheduler.start()
+        self._broadcaster.start()
+        self._bus.start()
+        self._scheduler.call_later(METRICS_LOG_INTERVAL, self._log_metrics)
+        self._games.start()
+        if self._journals is not None:
+            self._journals.start()
+        if self._store is not None:
+            self._store.start()
+            self._restore_games()
+        if self._heartbeat is not None:
+            self._heartbeat.start()
+        if SERVER_MODE == "asyncio":
+            AsyncGameListener(LOCAL_IP, LOCAL_PORT, on_connection=self.handle_connection_async, sock=sock).run()
+        else:
+            WsWireGameListener(LOCAL_IP, LOCAL_PORT, on_connection=self.handle_connection, sock=sock).run()
+        if self._store is not None:
+            # The snapshots still queued are the games' latest; write them before the process exits
+            self._store.stop()
@@ -1,178 +1,274 @@
+import time
+from collections import Counter
 from threading import Lock
+from typing import Callable, Sequence
 
-from gamecomm.server import GameConnection
+from gamecomm.server import ConnectionClosed
 
+from quip_model import codec
 from quip_model.events import *
-from .server_ui.server_gui import ServerGUI
+from quip_model.wire import WireFormat
+from .audience_broadcaster import AudienceBroadcaster
+from .connections import WireConnection
+from .game_history import GameHistory
+from .metrics import EventMetrics
 
+# Events that are only sent to the player they are about; events neither here nor in UNSENT_EVENTS go to every player
+PLAYER_EVENTS = (PlayerJoinEvent, PlayerVIPEvent, DistributePromptEvent, NicknameAlreadyExistsEvent,
+                 PlayerReconnectEvent)
 
-class GamePublisher:
+# Events that no player is sent
+UNSENT_EVENTS = (VIPLeaveEvent, AudienceJoinEvent, AudienceLeaveEvent)
+
+# Events that spectators are sent, in addition to the players
+AUDIENCE_EVENTS = (RoundStartedEvent, BeginVotingEvent, BeginPromptVotingEvent, ClientEndPromptVotingEvent,
+                   EndPromptVotingEvent, ScoreboardEvent)
+
+# Events that only matter until the next one of their type; a lagging connection is only sent the latest one queued
+COALESCED_EVENTS = (RoundStartedEvent, BeginVotingEvent, BeginPromptVotingEvent, ClientEndPromptVotingEvent,
+                    EndPromptVotingEvent, ScoreboardEvent)
 
-    def __init__(self, ui: ServerGUI):
-        self._connections: dict[int, GameConnection] = {}
+
+class GamePublisher:
+    """
+    Sends a game's events to its players and spectators. Each event is
+    encoded by quip_model.codec, stamped with the game's next sequence
+    number under "seq", and with the sequence number of the message its
+    recipient was sent before under "prev", so a client only takes a gap for
+    lost messages, not for the ones meant for others. The message is
+    serialized once for each wire format and "prev" among its recipients,
+    and the same payload is queued on the outbox of every connection it
+    goes to; the players are mostly sent the same messages, and the
+    spectators all are, so that is usually once per format. Publishing
+    never waits on a client. The game's history lets clients that fell
+    behind catch up; the countdowns in its messages run on the game's
+    clock, e.g. its scheduler's now().
+    """
+
+    def __init__(self, broadcaster: AudienceBroadcaster, metrics: EventMetrics = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self._connections: dict[int, WireConnection] = {}
+        self._audience: dict[int, WireConnection] = {}
         self._lock = Lock()
-        self.ui = ui
+        self._broadcaster = broadcaster
+        self._metrics = metrics
+        self.history = GameHistory(clock=clock)
+
+        # Held while a message is numbered and queued for the players, so a client catching up is sent either the
+        # message or a catch-up that includes it first, never a catch-up that leaves out what it was already sent
+        self._sending = Lock()
+
+        self._sent_seqs: dict[WireConnection, int] = {}
+        """ The sequence number of the latest message each player's connection was sent, or had when it joined. """
+
+        self._audience_seq = 0
+        """ The sequence number of the latest message sent to every spectator. """
+
+        # Rebuilt whenever players or spectators come or go, so sending to all of them copies nothing
+        self._players: tuple[WireConnection, ...] = ()
+        self._spectators: tuple[tuple[WireConnection, ...], Counter[WireFormat]] = ((), Counter())
+        """ The spectators, with the number of them speaking each wire format. """
+
+    def _players_changed(self):
+        self._players = tuple(self._connections.values())
+
+    def _spectators_changed(self):
+        spectators = tuple(self._audience.values())
+        self._spectators = spectators, Counter(connection.wire_format for connection in spectators)
 
-    def _handle_join_event(self, event: PlayerJoinEvent, message: dict) -> tuple[dict, list[int]]:
-        message["player_num"] = event.player_num
-        target_players = [event.player_num]
-        return message, target_players
+    def _to_all_players(self, event: GameEvent) -> Sequence[WireConnection]:
+        return self._players
 
-    def _handle_leave_event(self, event: PlayerLeaveEvent, message: dict) -> tuple[dict, list[int]]:
-        message["player_num"] = event.player_num
-        # Remove connection
+    def _to_no_players(self, event: GameEvent) -> Sequence[WireConnection]:
+        return ()
+
+    def _to_player(self, event: GameEvent) -> Sequence[WireConnection]:
+        connection = self._connections.get(event.player_num)
+        return (connection,) if connection is not None else ()
+
+    def _to_voters(self, event: BeginPromptVotingEvent) -> Sequence[WireConnection]:
+        # The two players whose responses are up don't vote on them
+        with self._lock:
+            voters = list(self._players)
+            for player_id in event.prompt.player_ids:
+                connection = self._connections.get(player_id)
+                if connection is not None:
+                    voters.remove(connection)
+        return voters
+
+    def _drop_player(self, event: PlayerLeaveEvent) -> Sequence[WireConnection]:
         with self._lock:
-            self._connections.pop(event.player_num)
-        target_players = list(self._connections.keys())
-        self.ui.event_queue.put(event)
-        return message, target_players
-
-    def _handle_nickname_event(self, event: PlayerNicknameEvent, message: dict) -> tuple[dict, list[int]]:
-        message["player_num"] = event.player_num
-        message["name"] = event.name
-        target_players = list(self._connections.keys())
-        return message, target_players
-
-    def _handle_vip_event(self, event: PlayerVIPEvent, message: dict) -> tuple[dict, list[int]]:
-        message["player_num"] = event.player_num
-        target_players = [event.player_num]
-        return message, target_players
-
-    def _handle_vip_leave_event(self, event: VIPLeaveEvent, message: dict) -> tuple[dict, list[int]]:
-        message["player_num"] = event.player_num
-        target_players = list()
-        return message, target_players
-
-    def _handle_response_event(self, event: PlayerResponseEvent, message: dict) -> tuple[dict, list[int]]:
-        message["player_num"] = event.player_num
-        target_players = list(self._connections.keys())
-        return message, target_players
-
-    def _handle_vote_event(self, event: PlayerVoteEvent, message: dict) -> tuple[dict, list[int]]:
-        message["nickname"] = event.nickname
-        message["vote"] = event.vote
-        target_players = list(self._connections.keys())
-        return message, target_players
-
-    def _handle_round_start_event(self, event: RoundStartedEvent, message: dict) -> tuple[dict, list[int]]:
-        message["round_num"] = event.round_num
-        target_players = list(self._connections.keys())
-        return message, target_players
-
-    def _handle_distribute_prompt_event(self, event: DistributePromptEvent, message: dict) -> tuple[dict, list[int]]:
-        message["player_num"] = event.player_num
-        message["prompt_0"] = event.prompt_0
-        message["prompt_1"] = event.prompt_1
-        message["prompt_0_id"] = event.prompt_0_id
-        message["prompt_1_id"] = event.prompt_1_id
-        target_players = [event.player_num]
-        return message, target_players
-
-    def _handle_begin_voting_event(self, event: BeginVotingEvent, message: dict) -> tuple[dict, list[int]]:
-        message["round"] = event.round
-        target_players = list(self._connections.keys())
-        self.ui.event_queue.put(event)
-        return message, target_players
-
-    def _handle_prompt_vote_event(self, event: BeginPromptVotingEvent, message: dict) -> tuple[dict, list[int]]:
-        message["prompt"] = event.prompt.prompt
-        message["prompt_id"] = event.prompt.id
-
-        player_0_id = event.prompt.player_ids[0]
-        player_1_id = event.prompt.player_ids[1]
-
-        message["response_0"] = event.prompt.responses[player_0_id]
-        message["response_1"] = event.prompt.responses[player_1_id]
-
-        target_players = list(self._connections.keys())
-        if player_0_id in target_players:
-            target_players.remove(player_0_id)
-
-        if player_1_id in target_players:
-            target_players.remove(player_1_id)
-
-        self.ui.event_queue.put(event)
-
-        return message, target_players
-
-    def _handle_end_prompt_vote_event(self, event: EndPromptVotingEvent, message: dict) -> tuple[dict, list[int]]:
-        message["player_0_name"] = event.player_0_name
-        message["player_0_voter_names"] = event.player_0_voter_names
-        message["player_0_points_awarded"] = event.player_0_points_awarded
-        message["player_1_name"] = event.player_1_name
-        message["player_1_voter_names"] = event.player_1_voter_names
-        message["player_1_points_awarded"] = event.player_1_points_awarded
-        message["tie"] = event.tie
-        message["winner"] = event.winner
-        message["quiplasher"] = event.quiplasher
-        self.ui.event_queue.put(event)
-        target_players = list(self._connections.keys())
-        return message, target_players
-
-    def _handle_scoreboard_event(self, event: ScoreboardEvent, message: dict) -> tuple[dict, list[int]]:
-        message["names_in_order"] = event.names_in_order
-        message["points_in_order"] = event.points_in_order
-        target_players = list(self._connections.keys())
-        self.ui.event_queue.put(event)
-        return message, target_players
-
-    def _handle_client_end_prompt_voting_event(self, event: ClientEndPromptVotingEvent, message: dict) -> tuple[
-        dict, list[int]]:
-        message["data"] = None
-        target_players = list(self._connections.keys())
-        return message, target_players
-
-    def _handle_nickname_already_in_use_event(self, event, message):
-        target_players = [event.player_num]
-        message["data"] = None
-        return message, target_players
-
-    def _event_to_dict(self, event: GameEvent) -> tuple[dict, list[int]]:
-        message = {"event": event.__class__.__name__}
-        match event:
-            case PlayerJoinEvent():
-                return self._handle_join_event(event, message)
-            case PlayerLeaveEvent():
-                return self._handle_leave_event(event, message)
-            case PlayerNicknameEvent():
-                return self._handle_nickname_event(event, message)
-            case PlayerVIPEvent():
-                return self._handle_vip_event(event, message)
-            case VIPLeaveEvent():
-                return self._handle_vip_leave_event(event, message)
-            case PlayerResponseEvent():
-                return self._handle_response_event(event, message)
-            case PlayerVoteEvent():
-                return self._handle_vote_event(event, message)
-            case RoundStartedEvent():
-                return self._handle_round_start_event(event, message)
-            case DistributePromptEvent():
-                return self._handle_distribute_prompt_event(event, message)
-            case BeginVotingEvent():
-                return self._handle_begin_voting_event(event, message)
-            case BeginPromptVotingEvent():
-                return self._handle_prompt_vote_event(event, message)
-            case EndPromptVotingEvent():
-                return self._handle_end_prompt_vote_event(event, message)
-            case ScoreboardEvent():
-                return self._handle_scoreboard_event(event, message)
-            case ClientEndPromptVotingEvent():
-                return self._handle_client_end_prompt_voting_event(event, message)
-            case NicknameAlreadyExistsEvent():
-                return self._handle_nickname_already_in_use_event(event, message)
-
-    def add_subscriber(self, player_num: int, connection: GameConnection):
+            connection = self._connections.pop(event.player_num, None)
+            self._sent_seqs.pop(connection, None)
+            self._players_changed()
+        return self._players
+
+    def _move_player(self, event: PlayerReconnectEvent) -> Sequence[WireConnection]:
+        # Move the connection over to the player it is taking back
+        with self._lock:
+            self._connections[event.player_num] = self._connections.pop(event.pending_num)
+            self._players_changed()
+        return self._to_player(event)
+
+    def _drop_audience_member(self, event: AudienceLeaveEvent) -> Sequence[WireConnection]:
         with self._lock:
+            self._audience.pop(event.audience_num, None)
+            self._spectators_changed()
+        return ()
+
+    # The players each type of event is sent to, after any bookkeeping it calls for; every player if it isn't here
+    _PLAYER_ROUTES = {
+        **dict.fromkeys(PLAYER_EVENTS, _to_player),
+        **dict.fromkeys(UNSENT_EVENTS, _to_no_players),
+        BeginPromptVotingEvent: _to_voters,
+        PlayerLeaveEvent: _drop_player,
+        PlayerReconnectEvent: _move_player,
+        AudienceLeaveEvent: _drop_audience_member,
+    }
+
+    def add_subscriber(self, player_num: int, connection: WireConnection):
+        # A new player is missing what the game sent before they joined, and catches up on their first message
+        with self._sending, self._lock:
             self._connections[player_num] = connection
+            self._sent_seqs[connection] = self.history.seq
+            self._players_changed()
 
-    def publish(self, event: GameEvent):
+    def add_audience_member(self, seat: int, connection: WireConnection):
+        with self._lock:
+            self._audience[seat] = connection
+            self._spectators_changed()
+
+    def _audience_for(self, event_type: type,
+                      event: GameEvent) -> tuple[Sequence[WireConnection], Counter[WireFormat]]:
+        """ The spectators an event is sent to, with the number of them speaking each wire format. """
+        if event_type is AudienceJoinEvent:
+            # The spectator that joined is told its seat
+            connection = self._audience.get(event.audience_num)
+            if connection is not None:
+                return (connection,), Counter((connection.wire_format,))
+        elif event_type in AUDIENCE_EVENTS:
+            return self._spectators
+        return (), Counter()
 
+    def publish(self, event: GameEvent):
+        event_type = type(event)
+        coalesce_key = event_type.__name__ if event_type in COALESCED_EVENTS else None
+        message = codec.ENCODERS[event_type](event)
+        with self._sending:
+            connections = self._PLAYER_ROUTES.get(event_type, GamePublisher._to_all_players)(self, event)
+            audience, audience_formats = self._audience_for(event_type, event)
+            seq = self.history.record(event, message)
+
+            # Serialized once for each wire format and previous sequence number among the recipients
+            payloads = dict[tuple[WireFormat, int], str | bytes]()
+
+            def payload(wire_format: WireFormat, prev: int) -> str | bytes:
+                serialized = payloads.get((wire_format, prev))
+                if serialized is None:
+                    serialized = payloads[wire_format, prev] = wire_format.dumps({**message, "prev": prev})
+                return serialized
+
+            sent_bytes = 0
+            for connection in connections:
+                player_payload = payload(connection.wire_format, self._sent_seqs.get(connection, 0))
+                self._sent_seqs[connection] = seq
+                sent_bytes += len(player_payload)
+                try:
+                    connection.send_encoded(player_payload, coalesce_key)
+                except ConnectionClosed:
+                    # The player's controller notices the closed connection and removes the player
+                    pass
+
+            audience_payloads = {wire_format: payload(wire_format, self._audience_seq)
+                                 for wire_format in audience_formats}
+            sent_bytes += sum(len(audience_payloads[wire_format]) * count
+                              for wire_format, count in audience_formats.items())
+            if event_type in AUDIENCE_EVENTS:
+                self._audience_seq = seq
+
+        if self._metrics is not None:
+            # JSON is ASCII-only, so the length of every payload is its size in bytes
+            self._metrics.record_encoding(event, sum(map(len, payloads.values())), sent_bytes)
+
+        # The players have been sent the message; hand the audience's copies off to the broadcaster
+        self._broadcaster.broadcast(audience_payloads, audience, coalesce_key)
+
+    def _catch_up(self, connection: WireConnection, since: int, player_num: int = None, seat: int = None):
+        if seat is not None:
+            def sent_to(event: GameEvent) -> bool:
+                if type(event) is AudienceJoinEvent:
+                    return event.audience_num == seat
+                return type(event) in AUDIENCE_EVENTS
+        else:
+            def sent_to(event: GameEvent) -> bool:
+                event_type = type(event)
+                if event_type in PLAYER_EVENTS:
+                    return event.player_num == player_num
+                if event_type is BeginPromptVotingEvent:
+                    return player_num not in event.prompt.player_ids
+                return event_type not in UNSENT_EVENTS
+
+        connection.send({"status": "ok", **self.history.catch_up(since, sent_to)})
+
+    def catch_up(self, connection: WireConnection, since: int, player_num: int = None, seat: int = None):
+        """
+        Sends a client the messages it missed since the given sequence number,
+        as the response to its request; see GameHistory.catch_up.
+
+        Parameters:
+            connection (WireConnection): The client's connection.
+            since (int): The sequence number of the latest message the client has.
+            player_num (int): The client's player number, if it is a player.
+            seat (int): The client's audience seat, if it is a spectator.
+        """
+        with self._sending:
+            self._catch_up(connection, since, player_num, seat)
+
+    def resume(self, player_num: int, connection: WireConnection, since: int) -> WireConnection | None:
+        """
+        Moves a player over to a new connection, e.g. after their old one
+        dropped, and sends it the messages the player missed since the given
+        sequence number before any new ones.
+
+        Returns:
+            The player's old connection, if they still had one.
+        """
+        with self._sending:
+            self._catch_up(connection, since, player_num)
+            with self._lock:
+                stale = self._connections.get(player_num)
+                self._connections[player_num] = connection
+                self._sent_seqs.pop(stale, None)
+                self._sent_seqs[connection] = self.history.seq
+                self._players_changed()
+        return stale
+
+    def disconnect_all(self):
+        """ Drops the connections of every player and spectator, e.g. because the game is being dropped. """
         with self._lock:
-            # make a "defensive" copy
-            connections = list(self._connections.values())
-            connections_with_keys = self._connections
+            connections = [*self._connections.values(), *self._audience.values()]
+        for connection in connections:
+            connection.outbox.close()
+            connection.abort()
 
-        message, target_player_nums = self._event_to_dict(event)
-        for player_num in target_player_nums:
-            connections_with_keys[player_num].send(message)
+    def queue_depths(self) -> dict[int, int]:
+        """ The number of messages queued for each player, by player number. """
+        with self._lock:
+            return {player_num: len(connection.outbox) for player_num, connection in self._connections.items()}
 
+    def outbox_stats(self) -> dict[str, int]:
+        """ The messages queued, sent and dropped on the connections of the players and spectators, totalled. """
+        with self._lock:
+            connections = [*self._connections.values(), *self._audience.values()]
+
+        totals = {"connections": len(connections), "queued": 0, "max_queued": 0, "sent": 0, "dropped": 0,
+                  "coalesced": 0, "disconnected": 0}
+        for connection in connections:
+            outbox = connection.outbox
+            totals["queued"] += len(outbox)
+            totals["max_queued"] = max(totals["max_queued"], len(outbox))
+            totals["sent"] += outbox.sent
+            totals["dropped"] += outbox.dropped
+            totals["coalesced"] += outbox.coalesced
+            totals["disconnected"] += outbox.disconnected
+        return totals
@@ -4,6 +4,7 @@ Author: Jason Dech (jasonmdech), Nolan Donovan (rndonovan)
 Created: 2 December 2023
 Purpose: Define classes for various elements of the GUI.
 """
+import math
 from abc import ABC, abstractmethod
 
 import pygame
@@ -14,6 +15,7 @@ from pygame.surface import Surface
 
 from quip_model.events import *
 from quip_model.events import GameEvent
+from quip_model.pacing import DEFAULT_PACING
 
 ColorRGB = tuple[int, int, int]
 """ Custom type to represent an RGB color. """
@@ -336,6 +338,13 @@ class UITimer:
         """Draw the timer's duration as a Text object."""
         self.text.draw(surface)
 
+    def set_duration(self, duration: float):
+        """Changes the duration, rounded up to whole seconds, and resets the timer to it."""
+        self.duration = math.ceil(duration)
+        self.time_remaining = self.duration
+        self.text.text = str(self.time_remaining)
+        self.text.surface, self.text.rect = self.text.render_text()
+
     def update_time(self, surface: Surface):
         """Decrement the time and update to the surface."""
         self.time_remaining -= 1
@@ -530,6 +539,9 @@ class PlayerJoinScreen(Screen):
         ]
         self.players: dict[int, str] = dict()
 
+        self.response_countdown = DEFAULT_PACING.response_countdown
+        """ The time the players have to respond, as sent by the game when the round starts. """
+
     def draw(self, surface: Surface):
         """Draw the screen."""
         super().draw(surface)
@@ -539,7 +551,8 @@ class PlayerJoinScreen(Screen):
     def handle_event(self, event: Event, surface: Surface):
         if event.type == VIP_GAME_START:
             return PromptAnsweringScreen(
-                PROMPT_ANSWERING_SCREEN_BG_COLOR, self.ui_width, self.ui_height, self.players
+                PROMPT_ANSWERING_SCREEN_BG_COLOR, self.ui_width, self.ui_height, self.players,
+                self.response_countdown
             )
 
         return None
@@ -595,6 +608,7 @@ class PlayerJoinScreen(Screen):
             case PlayerLeaveEvent():
                 self._handle_leave_event(event, surface)
             case RoundStartedEvent():
+                self.response_countdown = event.countdown
                 pygame.event.post(Event(VIP_GAME_START))
             case _:
                 pass
@@ -604,7 +618,8 @@ class PromptAnsweringScreen(Screen):
     """The screen that appears when players are answering prompts."""
 
     def __init__(
-            self, bg_color: ColorRGB, ui_width: int, ui_height: int, players: dict[int, str]
+            self, bg_color: ColorRGB, ui_width: int, ui_height: int, players: dict[int, str],
+            countdown: float = DEFAULT_PACING.response_countdown
     ):
         """Creates a new prompt answering screen."""
         texts = [
@@ -625,7 +640,7 @@ class PromptAnsweringScreen(Screen):
         ]
         super().__init__(bg_color, texts, ui_width, ui_height)
 
-        self.timer = UITimer(60, DEFAULT_TIMER_POSITION)
+        self.timer = UITimer(math.ceil(countdown), DEFAULT_TIMER_POSITION)
 
         self.players = players
 
@@ -753,7 +768,7 @@ class PromptVotingScreen(Screen):
         self.surface = surface
         super().__init__(bg_color, texts, ui_width, ui_height)
 
-        self.timer = UITimer(15, DEFAULT_TIMER_POSITION)
+        self.timer = UITimer(math.ceil(DEFAULT_PACING.vote_countdown), DEFAULT_TIMER_POSITION)
         self.prompt_text = Text(
             "", XL_TEXT_SIZE, TEAL, (ui_width // 2, 100)
         )
@@ -985,6 +1000,7 @@ class PromptVotingScreen(Screen):
         match event:
             case BeginPromptVotingEvent():
                 self.set_prompt(event.prompt, surface)
+                self.timer.set_duration(event.countdown)
                 self.draw(surface)
             case EndPromptVotingEvent():
                 self.draw_results(event, surface)
@@ -0,0 +1,59 @@
+"""
+File: sessions.py
+Purpose: Let a player whose connection dropped take their place back. Each
+player is given a session token when they join; a client that reconnects
+with it, in the "session" query parameter of its game URL, is bound to the
+player again instead of joining as someone new, and is sent the messages
+it missed.
+"""
+import secrets
+import threading
+from urllib.parse import parse_qs, urlparse
+
+from quip_model.protocol import SEQ, SESSION
+
+SESSION_TOKEN_BYTES = 16  # Random bytes in a session token
+
+
+def requested_session(url: str) -> tuple[str | None, int]:
+    """ The session a connection's URL (or just its path and query) asks to resume, and the latest seq it has. """
+    query = parse_qs(urlparse(url).query)
+    token = query.get(SESSION, [None])[0]
+    try:
+        seq = int(query.get(SEQ, ["0"])[0])
+    except ValueError:
+        seq = 0
+    return token, seq
+
+
+class SessionRegistry:
+    """ The resumable sessions of a game's players. """
+
+    def __init__(self):
+        self._players = dict[str, int]()
+        self._tokens = dict[int, str]()
+        self._lock = threading.Lock()
+
+    def open(self, player_num: int) -> str:
+        """ Returns the player's session token, issuing one if the player has none yet. """
+        with self._lock:
+            token = self._tokens.get(player_num)
+            if token is None:
+                token = secrets.token_urlsafe(SESSION_TOKEN_BYTES)
+                self._tokens[player_num] = token
+                self._players[token] = player_num
+            return token
+
+    def player_for(self, token: str) -> int | None:
+        """ The player a session token belongs to, or None if it isn't one of the game's open sessions. """
+        return self._players.get(token)
+
+    def close(self, player_num: int) -> None:
+        """ Ends the player's session, e.g. because they left the game. """
+        with self._lock:
+            token = self._tokens.pop(player_num, None)
+            if token is not None:
+                del self._players[token]
+
+    def __len__(self) -> int:
+        return len(self._tokens)
@@ -0,0 +1,121 @@
+import os
+import threading
+from logging import getLogger
+from typing import Iterator
+
+logger = getLogger(__name__)
+
+SNAPSHOT_SUFFIX = ".snap"
+
+
+class SnapshotStore:
+    """
+    Keeps the latest snapshot of each game as a file in a directory, so a
+    restarted server, or another one pointed at the same directory, can pick
+    the games back up. Snapshots are written on a thread of its own, so a
+    slow disk never holds up the scheduler or the event loop that the games
+    checkpoint on; only the latest snapshot of each game waiting to be
+    written is kept. A snapshot is written to a temporary file, synced,
+    renamed over the old one, and the directory synced, so neither a crash
+    nor a power loss mid-write leaves a torn snapshot.
+    """
+
+    def __init__(self, directory: str):
+        self._directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+        self._pending: dict[str | None, bytes | None] = {}
+        """ The snapshot each game is waiting to have written, or None if its snapshot is to be deleted. """
+
+        self._changed = threading.Condition()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="SnapshotWriter", daemon=True)
+
+    def _path(self, game_id: str | None) -> str:
+        # Game ids come from URLs, so hex-encode them rather than trust them as file names.
+        # The id is None when auth is off and every connection shares one game.
+        return os.path.join(self._directory, (game_id or "").encode().hex() + SNAPSHOT_SUFFIX)
+
+    def save(self, game_id: str | None, data: bytes) -> None:
+        """ Queues a game's snapshot to be written, in place of any of its snapshots not written yet. """
+        with self._changed:
+            self._pending[game_id] = data
+            self._changed.notify()
+
+    def delete(self, game_id: str | None) -> None:
+        """ Queues a game's snapshot to be deleted, along with any not written yet. """
+        with self._changed:
+            self._pending[game_id] = None
+            self._changed.notify()
+
+    def _write(self, game_id: str | None, data: bytes) -> None:
+        path = self._path(game_id)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+
+    def _remove(self, game_id: str | None) -> None:
+        try:
+            os.remove(self._path(game_id))
+        except FileNotFoundError:
+            pass
+
+    def _sync_directory(self) -> None:
+        """ Syncs the renames and removals in the directory, so they survive a power loss too. """
+        descriptor = os.open(self._directory, os.O_RDONLY)
+        try:
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+
+    def _write_all(self, pending: dict[str | None, bytes | None]) -> None:
+        for game_id, data in pending.items():
+            try:
+                if data is None:
+                    self._remove(game_id)
+                else:
+                    self._write(game_id, data)
+            except OSError:
+                logger.exception(f"failed to write the snapshot of game {game_id}")
+        try:
+            self._sync_directory()
+        except OSError:
+            logger.exception("failed to sync the snapshot directory")
+
+    def _run(self):
+        while True:
+            with self._changed:
+                while not self._pending and not self._stopping:
+                    self._changed.wait()
+                if not self._pending:
+                    return
+                pending, self._pending = self._pending, {}
+            self._write_all(pending)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """ Writes every queued snapshot and stops the thread. """
+        with self._changed:
+            self._stopping = True
+            self._changed.notify()
+        self._thread.join()
+
+    def load_all(self) -> Iterator[tuple[str | None, bytes]]:
+        """ Yields the id and snapshot of every game in the store. """
+        for file_name in os.listdir(self._directory):
+            if not file_name.endswith(SNAPSHOT_SUFFIX):
+                continue
+
+            try:
+                game_id = bytes.fromhex(file_name.removesuffix(SNAPSHOT_SUFFIX)).decode()
+            except ValueError:
+                logger.warning(f"skipping {file_name}, it is not named after a game")
+                continue
+
+            with open(os.path.join(self._directory, file_name), "rb") as file:
+                yield game_id or None, file.read()
@@ -0,0 +1,257 @@
+"""
+File: supervisor.py
+Purpose: Run the game server as several worker processes, so the games
+are spread over every core instead of sharing one GIL. The supervisor
+accepts every connection on the server's port, reads the game id from the
+path of its opening request, /ws/<game-id>, without taking it off the
+socket, and hands the socket to the worker that owns the game on a
+consistent-hash ring (see hash_ring.py), so every player of a game lands
+in the same GameMaster. The worker serves the handed-over socket as if it
+had accepted it itself, in either server mode.
+"""
+import errno
+import multiprocessing
+import os
+import selectors
+import signal
+import socket
+import time
+from collections import Counter
+from logging import getLogger
+
+from .connections import path_game_id
+from .hash_ring import HashRing
+from .server_listener import LOCAL_IP, LOCAL_PORT, GameListener
+
+logger = getLogger(__name__)
+
+ACCEPT_BACKLOG = 1024  # Connections the supervisor's socket holds before the OS refuses more
+MAX_REQUEST_LINE = 8192  # Bytes a request line may take, e.g. "GET /ws/<game-id>?format=msgpack HTTP/1.1"
+REQUEST_TIMEOUT = 10  # Time (in seconds) a connection is given to send its request line before it is dropped
+POLL_INTERVAL = 0.05  # Time (in seconds) between looks at connections whose request line is only partly in
+WORKER_CHECK_INTERVAL = 1  # Time (in seconds) between checks that every worker is still running
+STATS_LOG_INTERVAL = 60  # Time (in seconds) between logs of the connections routed to each worker
+STOP_TIMEOUT = 5  # Time (in seconds) workers are given to stop before they are killed
+
+# Workers are forked, so they start with the supervisor's settings and ring, and nothing to import
+_FORK = multiprocessing.get_context("fork")
+
+
+class HeadlessUI:
+    """ Stands in for the server's GUI in the workers, which have none; the events meant for it are dropped. """
+
+    class _Dropped:
+        def put(self, item):
+            pass
+
+    def __init__(self):
+        self.event_queue = self._Dropped()
+
+
+class HandoffSocket(socket.socket):
+    """
+    A worker's end of its channel to the supervisor, posing as a listening
+    socket: accept() returns the next connection the supervisor handed
+    over. Both the threaded and the asyncio listener can serve it.
+    """
+
+    def __init__(self, channel: socket.socket):
+        super().__init__(channel.family, channel.type, fileno=channel.detach())
+        self._supervisor_lost = False
+
+    def listen(self, backlog: int = 0) -> None:
+        pass
+
+    def _lose_supervisor(self, reason: str):
+        """ Ends the worker, as no more connections can come; a supervisor that is still running starts another. """
+        if not self._supervisor_lost:
+            self._supervisor_lost = True
+            logger.info(f"{reason}, stopping")
+            # Stops the listener like Ctrl-C would, and the worker exits once it has
+            os.kill(os.getpid(), signal.SIGINT)
+        raise ConnectionAbortedError(reason)
+
+    def accept(self) -> tuple[socket.socket, object]:
+        # Only an error about the channel itself may leave here: the listeners stop accepting on any other OSError
+        while True:
+            if self.fileno() < 0:
+                # Closed by the listener itself, to stop accepting
+                raise OSError(errno.EBADF, "the channel is closed")
+            try:
+                message, fds, _, _ = socket.recv_fds(self, 1, 1)
+            except (BlockingIOError, InterruptedError):
+                raise
+            except OSError as error:
+                self._lose_supervisor(f"the channel to the supervisor failed: {error}")
+            if not message:
+                self._lose_supervisor("the supervisor closed its channel")
+            if not fds:
+                logger.warning("the supervisor sent no connection")
+                continue
+
+            connection = socket.socket(fileno=fds[0])
+            for extra in fds[1:]:
+                os.close(extra)
+            try:
+                connection.setblocking(True)
+                return connection, connection.getpeername()
+            except OSError:
+                # The client reset before it was handed over; go on to the next connection
+                connection.close()
+
+
+def _run_worker(name: str, ring: HashRing, channel: socket.socket, inherited: list[socket.socket]):
+    # Only the worker's own channel stays open, so it sees the supervisor go
+    for inherited_socket in inherited:
+        inherited_socket.close()
+    GameListener(HeadlessUI(), owns=lambda game_id: ring.owner(game_id) == name).run(HandoffSocket(channel))
+    # The threads of the connections still open would keep the worker alive
+    os._exit(0)
+
+
+def _game_id(request_line: bytes) -> str | None:
+    """ The game id in a request line like b"GET /ws/<game-id>?format=msgpack HTTP/1.1". """
+    parts = request_line.split(b" ")
+    return path_game_id(parts[1].decode("latin-1")) if len(parts) == 3 else None
+
+
+class Supervisor:
+    """
+    Forks the workers, routes every connection to the worker that owns its
+    game, and brings back any worker that exits. Runs on a single thread,
+    so forking a worker again is safe.
+    """
+
+    def __init__(self, workers: int, local_ip: str = LOCAL_IP, local_port: int = LOCAL_PORT):
+        self._ring = HashRing(f"worker-{index}" for index in range(workers))
+        self._local_ip = local_ip
+        self._local_port = local_port
+        self._listener: socket.socket | None = None
+        self._selector = selectors.DefaultSelector()
+        self._channels: dict[str, socket.socket] = {}
+        self._processes: dict[str, multiprocessing.process.BaseProcess] = {}
+
+        self._waiting: dict[socket.socket, float] = {}
+        """ Connections whose request line isn't in yet, with the time they are dropped at. """
+
+        self._stalled: dict[socket.socket, float] = {}
+        """ Waiting connections with part of their request line in, with the time they are looked at again. """
+
+        self.routed = Counter[str]()
+        """ The number of connections handed to each worker. """
+
+    def _spawn(self, name: str):
+        parent, child = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale = self._channels.pop(name, None)
+        if stale is not None:
+            stale.close()
+        inherited = [self._listener, parent, *self._channels.values()]
+        process = _FORK.Process(target=_run_worker, args=(name, self._ring, child, inherited), name=name)
+        process.start()
+        child.close()
+        self._channels[name] = parent
+        self._processes[name] = process
+        logger.info(f"started {name} (pid {process.pid})")
+
+    def _check_workers(self):
+        for name, process in list(self._processes.items()):
+            if not process.is_alive():
+                logger.error(f"{name} exited with code {process.exitcode}, restarting it")
+                self._spawn(name)
+
+    def _accept(self):
+        try:
+            connection, _ = self._listener.accept()
+        except OSError as error:
+            logger.warning(f"accept failed: {error}")
+            return
+        connection.setblocking(False)
+        self._waiting[connection] = time.monotonic() + REQUEST_TIMEOUT
+        self._selector.register(connection, selectors.EVENT_READ)
+
+    def _route(self, connection: socket.socket):
+        """ Hands a connection to its game's worker once its request line is in, or drops it if it is bad. """
+        try:
+            head = connection.recv(MAX_REQUEST_LINE, socket.MSG_PEEK)
+        except BlockingIOError:
+            return
+        except OSError:
+            head = b""
+
+        self._selector.unregister(connection)
+        line_end = head.find(b"\r\n")
+        if line_end < 0 and head and len(head) < MAX_REQUEST_LINE:
+            # Peeking leaves the bytes on the socket, so it stays readable; look again after a while
+            self._stalled[connection] = time.monotonic() + POLL_INTERVAL
+            return
+
+        del self._waiting[connection]
+        if line_end >= 0:
+            worker = self._ring.owner(_game_id(head[:line_end]))
+            try:
+                socket.send_fds(self._channels[worker], [b"c"], [connection.fileno()])
+                self.routed[worker] += 1
+            except OSError as error:
+                logger.error(f"could not hand a connection to {worker}: {error}")
+        # The worker has its own copy of the socket now
+        connection.close()
+
+    def _drop_expired(self):
+        now = time.monotonic()
+        for connection, deadline in list(self._waiting.items()):
+            if now >= deadline:
+                del self._waiting[connection]
+                if self._stalled.pop(connection, None) is None:
+                    self._selector.unregister(connection)
+                connection.close()
+
+    def _serve(self):
+        next_check = next_stats = time.monotonic()
+        while True:
+            timeout = min([WORKER_CHECK_INTERVAL, *(at - time.monotonic() for at in self._stalled.values())])
+            for key, _ in self._selector.select(max(timeout, 0)):
+                if key.fileobj is self._listener:
+                    self._accept()
+                else:
+                    self._route(key.fileobj)
+
+            now = time.monotonic()
+            for connection, at in list(self._stalled.items()):
+                if now >= at:
+                    del self._stalled[connection]
+                    self._selector.register(connection, selectors.EVENT_READ)
+            self._drop_expired()
+
+            if now >= next_check:
+                self._check_workers()
+                next_check = now + WORKER_CHECK_INTERVAL
+            if now >= next_stats:
+                logger.info(f"connections routed: {dict(self.routed)}")
+                next_stats = now + STATS_LOG_INTERVAL
+
+    def _stop(self):
+        self._listener.close()
+        for channel in self._channels.values():
+            channel.close()
+        for name, process in self._processes.items():
+            process.join(STOP_TIMEOUT)
+            if process.is_alive():
+                logger.warning(f"{name} didn't stop, killing it")
+                process.kill()
+
+    def run(self):
+        # Stop on SIGTERM, e.g. from docker stop, the same as on Ctrl-C
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        self._listener = socket.create_server((self._local_ip, self._local_port), backlog=ACCEPT_BACKLOG)
+        self._listener.setblocking(False)
+        for name in self._ring.workers:
+            self._spawn(name)
+        self._selector.register(self._listener, selectors.EVENT_READ)
+        logger.info(f"supervisor listening on {self._local_ip}:{self._local_port} with {len(self._processes)} workers")
+        try:
+            self._serve()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._stop()
+        logger.debug("supervisor stopped")
@@ -0,0 +1,31 @@
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+
+@pytest.fixture(scope="module")
+def api_client():
+    """ The API, on an in-memory MongoDB, with the node secret "s3cret". """
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv("GAME_NODE_SECRET", "s3cret")
+        patch.setattr("pymongo.MongoClient", mongomock.MongoClient)
+        import api
+        from api.app import app
+    return app.test_client()
+
+
+REPORT = {"ws_url": "ws://10.0.0.12:10020", "games": 3, "connections": 12, "max_games": 1000}
+
+
+@pytest.mark.parametrize("headers", [{}, {"Authorization": "Bearer wrong"}, {"Authorization": "Basic czNjcmV0"}])
+def test_report_without_node_secret_is_refused(api_client, headers):
+    assert api_client.put("/nodes/rogue", json=REPORT, headers=headers).status_code == 401
+    created = api_client.post("/games", json={"creator": "ann", "creator_id": "1"}).json
+    assert not created["ws_url"].startswith(REPORT["ws_url"])
+
+
+def test_report_with_node_secret_places_games(api_client):
+    response = api_client.put("/nodes/node-1", json=REPORT, headers={"Authorization": "Bearer s3cret"})
+    assert response.status_code == 204
+    created = api_client.post("/games", json={"creator": "ann", "creator_id": "1"}).json
+    assert created["ws_url"] == f"{REPORT['ws_url']}/ws/{created['game_id']}"
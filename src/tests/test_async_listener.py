@@ -0,0 +1,53 @@
+import asyncio
+import socket
+import threading
+import time
+
+import pytest
+from gamecomm.server import ConnectionClosedOK
+from websockets.sync.client import connect
+
+from quip_server.async_listener import AsyncGameConnection, AsyncGameListener
+
+
+@pytest.fixture
+def loop():
+    """ An event loop running on a thread of its own. """
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield loop
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    loop.close()
+
+
+def test_recv_reads_messages_off_the_event_loop(loop):
+    received = []
+
+    def read(connection: AsyncGameConnection):
+        received.append(connection.recv(5))
+        with pytest.raises(TimeoutError):
+            connection.recv(0.1)
+        with pytest.raises(ConnectionClosedOK):
+            connection.recv(5)
+        received.append("closed")
+
+    async def on_connection(connection: AsyncGameConnection):
+        with pytest.raises(RuntimeError):
+            connection.recv(0.1)
+        await asyncio.to_thread(read, connection)
+
+    listener_socket = socket.create_server(("127.0.0.1", 0))
+    serving = asyncio.run_coroutine_threadsafe(
+        AsyncGameListener("127.0.0.1", 0, on_connection=on_connection, sock=listener_socket).serve(), loop)
+    host, port = listener_socket.getsockname()
+    with connect(f"ws://{host}:{port}/ws/some-game") as client:
+        client.send('{"type": "start"}')
+        time.sleep(0.5)
+
+    deadline = time.monotonic() + 5
+    while len(received) < 2 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    serving.cancel()
+    assert received == [{"type": "start"}, "closed"]
@@ -0,0 +1,107 @@
+import json
+from random import Random
+
+import pytest
+
+from quip_client.client import GameClient
+from quip_model.clock import FakeClock
+from quip_model.game_master import GameMaster
+from quip_model.response import PromptResponse, VoteResponse
+from quip_model.wire import JSON
+from quip_server.audience_broadcaster import AudienceBroadcaster
+from quip_server.server_publisher import GamePublisher
+
+
+class RecordingConnection:
+    """ Stands in for the client's connection, keeping what it sends. """
+
+    def __init__(self):
+        self.sent = []
+
+    def send(self, payload):
+        self.sent.append(json.loads(payload))
+
+
+class PlayerConnection:
+    """ Stands in for a player's connection on the server, keeping the messages queued for it. """
+
+    wire_format = JSON
+
+    def __init__(self):
+        self.messages = []
+
+    def send_encoded(self, payload, coalesce_key=None):
+        self.messages.append(json.loads(payload))
+
+
+def recording_client() -> GameClient:
+    events = []
+    game_client = GameClient("ws://127.0.0.1:1/ws/g1", on_event=events.append)
+    game_client._connection = RecordingConnection()
+    game_client.events = events
+    return game_client
+
+
+@pytest.fixture
+def client():
+    return recording_client()
+
+
+def event(seq: int, name: str = "PlayerVoteEvent", prev: int = None) -> dict:
+    return {"event": name, "seq": seq, "prev": seq - 1 if prev is None else prev}
+
+
+def test_gap_makes_client_sync_from_its_last_event(client):
+    client._handle_event(event(1))
+    client._handle_event(event(4, prev=3))
+    client._handle_event(event(5, prev=4))
+
+    assert [message["seq"] for message in client.events] == [1]
+    assert client._connection.sent == [{"type": "sync", "seq": 1}]
+
+
+def test_catch_up_handles_each_event_once_and_in_order(client):
+    client._handle_event(event(1, "RoundStartedEvent"))
+    client._handle_event(event(2, "DistributePromptEvent"))
+    client._handle_event(event(5, prev=4))
+    client._handle_sync_response({"status": "ok", "seq": 6,
+                                  "snapshot": [event(1, "RoundStartedEvent"), event(2, "DistributePromptEvent")],
+                                  "deltas": [event(4), event(5), event(6)]})
+    client._handle_event(event(6))
+    client._handle_event(event(7))
+
+    assert [message["seq"] for message in client.events] == [1, 2, 4, 5, 6, 7]
+    assert client._connection.sent == [{"type": "sync", "seq": 2}]
+
+
+def test_players_do_not_sync_during_a_round():
+    clock = FakeClock()
+    publisher = GamePublisher(AudienceBroadcaster(), clock=clock.now)
+    game = GameMaster(publisher.publish, clock, rng=Random(1))
+    # Connected before anyone joins, as a player connecting later catches up on what they missed first
+    connections = {game.add_connection(): PlayerConnection() for _ in range(3)}
+    for player_num, connection in connections.items():
+        publisher.add_subscriber(player_num, connection)
+    for player_num, name in zip(connections, ("ann", "bob", "cat")):
+        game.accept_new_player(player_num, name)
+
+    game.play_round()
+    for player in game.players:
+        game.receive_responses(player.id, tuple(PromptResponse(prompt.id, player.id, "a")
+                                                for prompt in player.current_prompts))
+    clock.advance(game.pacing.voting_start_pause)
+    while game.voting_prompt is not None:
+        prompt = game.voting_prompt
+        for player in game.players:
+            if player.id not in prompt.player_ids:
+                game.receive_vote(VoteResponse(prompt.id, player.id, 0))
+        clock.advance(game.pacing.results_pause)
+    clock.run()
+
+    for connection in connections.values():
+        player_client = recording_client()
+        for message in connection.messages:
+            player_client._handle_event(message)
+        # Every player was sent some of the others' events, and the other players' prompts and votes were left out
+        assert len(player_client.events) == len(connection.messages) < publisher.history.seq
+        assert player_client._connection.sent == []
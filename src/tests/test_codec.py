@@ -0,0 +1,78 @@
+import dataclasses
+import json
+
+import pytest
+
+from quip_model import codec
+from quip_model.events import *
+from quip_model.prompt import Prompt
+
+
+def voting_prompt() -> Prompt:
+    prompt = Prompt(7, "The worst thing to hear from your pilot", (3, 5))
+    prompt.responses[3] = "Has anyone seen my glasses?"
+    prompt.responses[5] = "Hold my drink"
+    return prompt
+
+
+SAMPLE_EVENTS = [
+    PlayerJoinEvent(3), PlayerLeaveEvent(3), VIPLeaveEvent(3), PlayerNicknameEvent(3, "zoë"),
+    PlayerResponseEvent(3), PlayerVoteEvent("player 3", 1), PlayerVIPEvent(3), RoundStartedEvent(1, 60.0),
+    DistributePromptEvent(3, "The worst thing to hear from your pilot", "A bad name for a boat", 7, 8, 60.0),
+    StopAnsweringPrompts(), BeginVotingEvent(1), BeginPromptVotingEvent(voting_prompt(), 15.0),
+    ClientEndPromptVotingEvent(),
+    EndPromptVotingEvent("ann", ["bob", "cat"], 400, "dan", [], 0, False, "", "", 2, 0),
+    ScoreboardEvent(["ann", "dan"], [1500, 1400]), NicknameAlreadyExistsEvent(3), GameFullEvent(1),
+    AudienceJoinEvent(12), AudienceLeaveEvent(12), PlayerReconnectEvent(9, 3),
+]
+
+
+def reference_message(event: GameEvent) -> dict:
+    """ The message for an event, built field by field the way it was before the encoders were compiled. """
+    match event:
+        case BeginPromptVotingEvent():
+            prompt = event.prompt
+            return {"event": "BeginPromptVotingEvent", "prompt": prompt.prompt, "prompt_id": prompt.id,
+                    "response_0": prompt.responses.get(prompt.player_ids[0], ""),
+                    "response_1": prompt.responses.get(prompt.player_ids[1], ""), "countdown": event.countdown}
+        case GameFullEvent():
+            return {"event": "GameFullEvent", "game-id": event.game_id}
+    return {"event": type(event).__name__,
+            **{field.name: getattr(event, field.name) for field in dataclasses.fields(event)}}
+
+
+def test_every_event_type_has_a_sample():
+    assert {type(event) for event in SAMPLE_EVENTS} == set(codec.EVENT_TYPES)
+
+
+@pytest.mark.parametrize("event", SAMPLE_EVENTS, ids=lambda event: type(event).__name__)
+def test_encode_matches_the_reference(event):
+    message = codec.encode(event)
+    assert message == reference_message(event)
+    assert json.loads(json.dumps(message)) == message
+    assert tuple(message) == codec.MESSAGE_KEYS[type(event)]
+
+
+@pytest.mark.parametrize("event", SAMPLE_EVENTS, ids=lambda event: type(event).__name__)
+def test_decode_undoes_encode(event):
+    message = json.loads(json.dumps(codec.encode(event)))
+    decoded = codec.decode(message)
+    assert type(decoded) is type(event)
+    assert codec.encode(decoded) == message
+    if not isinstance(event, BeginPromptVotingEvent):  # Prompts are compared by identity
+        assert decoded == event
+
+
+def test_missing_responses_are_sent_empty():
+    prompt = voting_prompt()
+    del prompt.responses[5]
+    message = codec.encode(BeginPromptVotingEvent(prompt, 15.0))
+    assert (message["response_0"], message["response_1"]) == ("Has anyone seen my glasses?", "")
+
+
+def test_fields_with_defaults_can_be_left_out():
+    # Messages from before the audience could vote don't carry its votes
+    event = EndPromptVotingEvent("ann", ["bob"], 100, "dan", [], 0, False, "ann", "")
+    message = codec.encode(event)
+    del message["player_0_audience_votes"], message["player_1_audience_votes"]
+    assert codec.decode(message) == event
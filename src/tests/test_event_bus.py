@@ -0,0 +1,14 @@
+from quip_server.event_bus import DEFAULT_SINKS, OverflowPolicy, parse_sink_config
+
+
+def test_partial_sink_config_keeps_the_other_defaults():
+    sinks = parse_sink_config("journal=8192,metrics=64:block")
+
+    assert sinks["journal"] == (8192, DEFAULT_SINKS["journal"][1])
+    assert sinks["metrics"] == (64, OverflowPolicy.BLOCK)
+    assert sinks["gui"] == DEFAULT_SINKS["gui"]
+    assert sinks["publisher"] == DEFAULT_SINKS["publisher"]
+
+
+def test_empty_sink_config_is_the_defaults():
+    assert parse_sink_config("") == DEFAULT_SINKS
@@ -0,0 +1,13 @@
+from quip_model.clock import FakeClock
+from quip_model.events import RoundStartedEvent
+from quip_server.game_history import GameHistory
+
+
+def test_catch_up_counts_down_on_the_game_clock():
+    clock = FakeClock()
+    history = GameHistory(clock=clock.now)
+    history.record(RoundStartedEvent(1, 90), {"event": "RoundStartedEvent", "round": 1, "countdown": 90})
+    clock.advance(30)
+
+    caught_up = history.catch_up(0, lambda event: True)
+    assert [message["countdown"] for message in caught_up["deltas"]] == [60]
@@ -0,0 +1,95 @@
+from random import Random
+
+import pytest
+
+from quip_model.clock import FakeClock
+from quip_model.events import BeginPromptVotingEvent, DistributePromptEvent, EndPromptVotingEvent, ScoreboardEvent
+from quip_model.exceptions import PlayerVoteError
+from quip_model.game_master import GameMaster
+from quip_model.response import PromptResponse, VoteResponse
+
+
+def responding_game(*names: str) -> tuple[GameMaster, FakeClock, list]:
+    """ A game whose players respond to their prompts as soon as they get them. """
+    clock, events = FakeClock(), []
+    game = GameMaster(events.append, clock, rng=Random(1))
+    for name in names:
+        game.accept_new_player(game.add_connection(), name)
+
+    def respond(event):
+        events.append(event)
+        if isinstance(event, DistributePromptEvent):
+            game.receive_responses(event.player_num,
+                                   (PromptResponse(event.prompt_0_id, event.player_num, "a"),
+                                    PromptResponse(event.prompt_1_id, event.player_num, "b")))
+
+    game.observer = respond
+    return game, clock, events
+
+
+def two_player_game() -> tuple[GameMaster, FakeClock, list]:
+    """ A game whose two players write every prompt, so nobody is left to vote on any of them. """
+    return responding_game("ann", "bob")
+
+
+def test_prompt_without_voters_is_announced_before_its_results():
+    game, clock, events = two_player_game()
+    game.play_round()
+    clock.run()
+
+    votes = [type(event) for event in events if isinstance(event, (BeginPromptVotingEvent, EndPromptVotingEvent))]
+    assert votes == [BeginPromptVotingEvent, EndPromptVotingEvent] * len(game.prompts)
+
+
+def test_stop_cancels_results_pause_of_prompt_without_voters():
+    game, clock, events = two_player_game()
+    game.play_round()
+    clock.advance(game.pacing.voting_start_pause)
+    assert any(isinstance(event, EndPromptVotingEvent) for event in events)
+
+    game.stop()
+    published = len(events)
+    clock.run()
+    assert len(events) == published
+
+
+def test_spectator_who_rejoins_votes_once():
+    game, clock, events = responding_game("ann", "bob", "cat")
+    game.play_round()
+    clock.advance(game.pacing.voting_start_pause)
+    prompt = game.voting_prompt
+
+    seat = game.add_audience_member()
+    game.receive_audience_vote(seat, prompt.id, 0)
+    game.remove_audience_member(seat)
+
+    assert game.add_audience_member() == seat
+    game.receive_audience_vote(seat, prompt.id, 1)
+    other_seat = game.add_audience_member()
+    game.receive_audience_vote(other_seat, prompt.id, 1)
+    assert list(prompt.audience_votes) == [0, 2]
+
+
+@pytest.mark.parametrize("vote", [-1, 2])
+def test_vote_for_a_response_that_does_not_exist_is_refused(vote):
+    game, clock, events = responding_game("ann", "bob", "cat")
+    game.play_round()
+    clock.advance(game.pacing.voting_start_pause)
+    prompt = game.voting_prompt
+    voter = next(player.id for player in game.players if player.id not in prompt.player_ids)
+
+    with pytest.raises(PlayerVoteError):
+        game.receive_vote(VoteResponse(prompt.id, voter, vote))
+    assert voter not in prompt.voters
+
+
+def test_failed_checkpoint_does_not_stop_the_game():
+    game, clock, events = responding_game("ann", "bob", "cat")
+
+    def checkpoint(_):
+        raise RuntimeError("disk full")
+
+    game.checkpoint = checkpoint
+    game.play_round()
+    clock.run()
+    assert any(isinstance(event, ScoreboardEvent) for event in events)
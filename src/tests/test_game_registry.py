@@ -0,0 +1,17 @@
+from quip_model.clock import FakeClock
+from quip_server.game_registry import REAP_INTERVAL, GameRegistry
+
+
+def test_failed_sweep_still_schedules_the_next():
+    clock = FakeClock()
+    registry = GameRegistry(create=lambda game_id: None, scheduler=clock, max_games=1)
+    sweeps = []
+
+    def reap():
+        sweeps.append(clock.now())
+        raise RuntimeError("sweep failed")
+
+    registry.reap = reap
+    registry.start()
+    clock.advance(REAP_INTERVAL * 2)
+    assert sweeps == [REAP_INTERVAL, REAP_INTERVAL * 2]
@@ -0,0 +1,37 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from quip_server.heartbeat import HeartbeatReporter
+
+
+@pytest.fixture
+def directory():
+    """ A stand-in for the API's game directory, keeping the reports it is sent. """
+    reports = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_PUT(self):
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            reports.append((self.path, self.headers["Authorization"], json.loads(body)))
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}", reports
+    server.shutdown()
+
+
+def test_report_is_sent_with_the_node_secret(directory):
+    url, reports = directory
+    load = {"games": 3, "connections": 12, "max_games": 1000}
+    reporter = HeartbeatReporter(url, "s3cret", "ws://10.0.0.12:10020", 10, lambda: load)
+    reporter.report()
+
+    assert reports == [(f"/nodes/{reporter.reporter_id}", "Bearer s3cret", {"ws_url": "ws://10.0.0.12:10020", **load})]
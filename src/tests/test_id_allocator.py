@@ -0,0 +1,54 @@
+from random import Random
+
+import pytest
+
+from quip_model.exceptions import IdSpaceExhausted
+from quip_model.id_allocator import IdAllocator
+
+
+def test_allocates_every_id_once_then_runs_out():
+    ids = IdAllocator(50, Random(1))
+    taken = [ids.allocate() for _ in range(50)]
+
+    assert sorted(taken) == list(range(1, 51))
+    assert len(ids) == 50
+    with pytest.raises(IdSpaceExhausted):
+        ids.allocate()
+
+
+def test_churn_never_hands_out_a_taken_id():
+    rng = Random(2)
+    ids = IdAllocator(64, Random(3))
+    taken = set()
+    for step in range(5000):
+        if taken and (len(taken) == 64 or rng.random() < 0.45):
+            id_ = rng.choice(sorted(taken))
+            ids.release(id_)
+            taken.remove(id_)
+        elif rng.random() < 0.2:
+            id_ = rng.randint(1, 64)
+            assert ids.reserve(id_) == (id_ not in taken)
+            taken.add(id_)
+        else:
+            id_ = ids.allocate()
+            assert id_ not in taken
+            taken.add(id_)
+        assert len(ids) == len(taken)
+        assert all(id_ in ids for id_ in taken)
+
+
+def test_reserve_and_release_check_their_id():
+    ids = IdAllocator(10, Random(4))
+    assert ids.reserve(7)
+    assert not ids.reserve(7)
+    assert 7 in ids and 8 not in ids
+    assert all(ids.allocate() != 7 for _ in range(9))
+
+    with pytest.raises(ValueError):
+        ids.reserve(11)
+    with pytest.raises(ValueError):
+        ids.release(0)
+    ids.release(7)
+    with pytest.raises(ValueError):
+        ids.release(7)
+    assert ids.allocate() == 7
@@ -0,0 +1,109 @@
+import threading
+
+from quip_server.outbox import LagPolicy, Outbox
+
+
+def lagging_outbox(policy: LagPolicy, capacity: int = 6) -> tuple[Outbox, list[bool]]:
+    """ An outbox whose writer never sends, and a list that grows each time it asks for its connection to be closed. """
+    lags = []
+    outbox = Outbox(on_lag=lambda: lags.append(True), capacity=capacity, lag_threshold=3, policy=policy)
+    return outbox, lags
+
+
+def drain(outbox: Outbox) -> list[str]:
+    messages = []
+    while (message := outbox.pop()) is not None:
+        messages.append(message)
+    return messages
+
+
+def test_messages_are_sent_in_order():
+    ready = []
+    outbox = Outbox(on_ready=lambda: ready.append(True), lag_threshold=3, policy=LagPolicy.DROP)
+    outbox.offer("a")
+    outbox.offer("b")
+    assert len(ready) == 1
+    assert drain(outbox) == ["a", "b"]
+    assert outbox.idle and outbox.sent == 2
+
+    outbox.offer("c")
+    assert len(ready) == 2
+    assert drain(outbox) == ["c"]
+
+
+def test_coalesce_keeps_the_latest_of_each_key():
+    outbox, lags = lagging_outbox(LagPolicy.COALESCE)
+    for message, key in [("a", None), ("timer 1", "timer"), ("b", None), ("timer 2", "timer"), ("c", None),
+                         ("timer 3", "timer")]:
+        outbox.offer(message, key)
+
+    assert drain(outbox) == ["a", "b", "c", "timer 3"]
+    assert outbox.coalesced == 2
+    assert outbox.dropped == 0
+    assert not lags
+
+
+def test_coalesce_only_applies_while_lagging():
+    outbox, lags = lagging_outbox(LagPolicy.COALESCE)
+    outbox.offer("timer 1", "timer")
+    outbox.offer("timer 2", "timer")
+    assert drain(outbox) == ["timer 1", "timer 2"]
+    assert outbox.coalesced == 0
+
+
+def test_coalesce_disconnects_once_the_queue_is_full():
+    outbox, lags = lagging_outbox(LagPolicy.COALESCE)
+    for index in range(6):
+        outbox.offer(str(index))
+    assert not lags
+
+    outbox.offer("timer", "timer")
+    assert lags == [True]
+    assert outbox.closed and outbox.disconnected
+    assert outbox.dropped == 6
+    assert outbox.pop() is None
+
+    outbox.offer("late")
+    assert lags == [True]
+    assert len(outbox) == 0
+
+
+def test_drop_drops_new_messages_while_lagging():
+    outbox, lags = lagging_outbox(LagPolicy.DROP)
+    for index in range(5):
+        outbox.offer(str(index), "timer")
+
+    assert outbox.dropped == 2
+    assert drain(outbox) == ["0", "1", "2"]
+    outbox.offer("5")
+    assert drain(outbox) == ["5"]
+    assert not lags and not outbox.closed
+
+
+def test_disconnect_closes_the_connection_once_lagging():
+    outbox, lags = lagging_outbox(LagPolicy.DISCONNECT)
+    for index in range(3):
+        outbox.offer(str(index))
+    assert not lags
+
+    outbox.offer("3")
+    assert lags == [True]
+    assert outbox.disconnected
+    assert outbox.dropped == 3
+    assert outbox.get() is None
+
+
+def test_get_waits_for_a_message_and_returns_none_once_closed():
+    outbox = Outbox()
+    received = []
+    writer = threading.Thread(target=lambda: received.extend(iter(outbox.get, None)))
+    writer.start()
+
+    outbox.offer("a")
+    outbox.offer("b")
+    assert outbox.wait_sent(5)
+    outbox.close()
+    writer.join(5)
+    assert not writer.is_alive()
+    assert received == ["a", "b"]
+    assert not outbox.disconnected
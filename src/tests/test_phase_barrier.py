@@ -0,0 +1,53 @@
+from quip_model.phase_barrier import PhaseBarrier, PhaseResult
+
+
+def test_last_arrival_releases_once():
+    barrier, results = PhaseBarrier(), []
+    barrier.open([1, 2], results.append)
+
+    assert barrier.arrive(1)
+    assert not barrier.arrive(1)
+    assert not barrier.arrive(3)
+    assert results == []
+    assert barrier.arrive(2)
+    assert not barrier.arrive(2)
+    assert results == [PhaseResult(frozenset({1, 2}), frozenset(), False)]
+
+
+def test_expiry_reports_who_missed_the_deadline():
+    barrier, results = PhaseBarrier(), []
+    generation = barrier.open([1, 2, 3], results.append)
+    barrier.arrive(2)
+    barrier.expire(generation)
+    barrier.arrive(1)
+
+    assert results == [PhaseResult(frozenset({2}), frozenset({1, 3}), True)]
+
+
+def test_deadline_of_an_old_phase_does_not_end_the_next():
+    barrier, first, second = PhaseBarrier(), [], []
+    old = barrier.open([1], first.append)
+    barrier.arrive(1)
+    new = barrier.open([1, 2], second.append)
+
+    barrier.expire(old)
+    assert second == []
+    barrier.expire(new)
+    assert second == [PhaseResult(frozenset(), frozenset({1, 2}), True)]
+    assert len(first) == 1
+
+
+def test_leaving_player_is_not_waited_on():
+    barrier, results = PhaseBarrier(), []
+    barrier.open([1, 2], results.append)
+    barrier.arrive(1)
+    barrier.discard(2)
+
+    assert results == [PhaseResult(frozenset({1}), frozenset(), False)]
+
+
+def test_phase_without_players_is_released_after_it_opens():
+    barrier, calls = PhaseBarrier(), []
+    generation = barrier.open([], lambda result: calls.append(result), on_open=calls.append)
+
+    assert calls == [generation, PhaseResult(frozenset(), frozenset(), False)]
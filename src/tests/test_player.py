@@ -0,0 +1,32 @@
+from quip_model.player import Player, PlayerList
+
+
+def players_with_ids(*ids: int) -> PlayerList:
+    players = PlayerList()
+    for player_id in ids:
+        players.append(Player(player_id))
+    return players
+
+
+def test_positions_follow_removals_and_sorting():
+    players = players_with_ids(7, 3, 9, 1)
+    players.remove_player_by_id(3)
+    assert [players[index].id for index in range(len(players))] == [7, 9, 1]
+    assert [players.get_index_by_id(player_id) for player_id in (7, 9, 1)] == [0, 1, 2]
+
+    assert players.pop(0).id == 7
+    players.get_player_by_id(1).points = 100
+    players.sort()
+    assert [player.id for player in players] == [1, 9]
+    assert players.get_index_by_id(1) == 0 and players[-1].id == 9
+
+
+def test_removals_leave_the_positions_to_the_next_lookup():
+    players = players_with_ids(*range(10))
+    for player_id in (2, 5, 8):
+        players.remove_player_by_id(player_id)
+    assert players._ordered is None
+
+    assert players.get_index_by_id(9) == 6
+    players.append(Player(11))
+    assert players[-1].id == 11 and players.get_index_by_id(11) == 7
@@ -0,0 +1,20 @@
+import pytest
+
+from quip_model.prompt import Prompt, PromptList
+
+
+def test_prompt_list_is_slotted():
+    with pytest.raises(AttributeError):
+        PromptList().extra = 1
+
+
+def test_prompt_positions_follow_appends_and_removals():
+    prompts = PromptList()
+    for prompt_id in range(4):
+        prompts.append(Prompt(prompt_id, f"prompt {prompt_id}", (1, 2)))
+    assert [prompts[index].id for index in range(4)] == [0, 1, 2, 3]
+
+    prompts.remove_prompt_by_id(1)
+    assert prompts.get_index_by_id(3) == 2 and prompts[1].id == 2
+    assert prompts.pop(0).id == 0
+    assert [prompt.id for prompt in prompts] == [2, 3]
@@ -0,0 +1,32 @@
+from collections import Counter
+from random import Random
+
+import pytest
+
+from quip_model.exceptions import NotEnoughPlayers
+from quip_model.prompt_assignment import assign_prompts
+
+
+@pytest.mark.parametrize("num_players", [2, 3, 4, 7, 8, 50])
+def test_every_player_answers_two_prompts_with_someone_else(num_players):
+    player_ids = [1000 + index * 7 for index in range(num_players)]
+    for seed in range(20):
+        pairs = assign_prompts(player_ids, Random(seed))
+
+        assert len(pairs) == num_players
+        assert all(first != second for first, second in pairs)
+        assert Counter(player_id for pair in pairs for player_id in pair) == dict.fromkeys(player_ids, 2)
+        if num_players > 2:
+            # Nobody answers both prompts with the same partner
+            assert len({frozenset(pair) for pair in pairs}) == num_players
+
+
+def test_players_are_not_reordered_in_place():
+    player_ids = [3, 1, 2]
+    assign_prompts(player_ids, Random(1))
+    assert player_ids == [3, 1, 2]
+
+
+def test_one_player_cannot_be_paired():
+    with pytest.raises(NotEnoughPlayers):
+        assign_prompts([1], Random(1))
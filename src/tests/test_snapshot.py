@@ -0,0 +1,108 @@
+from random import Random
+
+import pytest
+
+from quip_model import snapshot
+from quip_model.clock import FakeClock
+from quip_model.exceptions import SnapshotError
+from quip_model.game_master import GameMaster, GamePhase
+from quip_model.pacing import DEFAULT_PACING, GamePacing
+from quip_model.simulator import SimulatedGame
+
+from test_game_master import responding_game
+
+
+def restored(game: GameMaster) -> GameMaster:
+    return snapshot.restore(GameMaster(lambda event: None, FakeClock(), rng=Random(2)), snapshot.encode(game))
+
+
+def restore(data: bytes) -> GameMaster:
+    return snapshot.restore(GameMaster(lambda event: None, FakeClock(), rng=Random(2)), data)
+
+
+def test_round_trip_at_every_checkpoint():
+    pacing = GamePacing(response_countdown=30, vote_countdown=10)
+    clock = FakeClock()
+    simulated = SimulatedGame(clock, 5, Random(4), miss_rate=0.2, pacing=pacing)
+    snapshots = []
+    simulated.game.checkpoint = lambda game: snapshots.append(snapshot.encode(game))
+    simulated.game.play_round()
+    clock.run()
+
+    assert simulated.finished
+    phases = set()
+    for data in snapshots:
+        copy = restore(data)
+        phases.add(copy.phase)
+        assert copy.pacing == pacing
+        assert snapshot.encode(copy) == data
+    assert {GamePhase.RESPONSES, GamePhase.VOTING, GamePhase.RESULTS} <= phases
+
+
+def test_restored_players_keep_their_points_and_prompts():
+    game, clock, events = responding_game("ann", "bob", "cat")
+    game.play_round()
+    game.players.get_player_by_name("bob").points = 300
+
+    copy = restored(game)
+    assert copy.players.get_player_by_name("bob").points == 300
+    assert [player.name for player in copy.players] == ["ann", "bob", "cat"]
+    assert copy.reconnecting == {player.id for player in game.players}
+    for player in copy.players:
+        assert [prompt.id for prompt in player.current_prompts] == \
+            [prompt.id for prompt in game.players.get_player_by_id(player.id).current_prompts]
+
+
+def with_version(data: bytes, version: int) -> bytes:
+    return data[:4] + bytes([version]) + data[5:]
+
+
+@pytest.mark.parametrize("version", [0, snapshot.SNAPSHOT_VERSION + 1, 255])
+def test_unknown_versions_are_refused(version):
+    game, clock, events = responding_game("ann", "bob", "cat")
+    with pytest.raises(SnapshotError, match=f"version {version}"):
+        restore(with_version(snapshot.encode(game), version))
+
+
+def test_version_1_snapshots_keep_the_pacing_the_game_was_made_with():
+    game, clock, events = responding_game("ann", "bob", "cat")
+    game.pacing = GamePacing(response_countdown=90)
+    game.play_round()
+    data = snapshot.encode(game)
+    header_size, pacing_size = snapshot._HEADER.size, snapshot._PACING.size
+    version_1 = with_version(data[:header_size], 1) + data[header_size + pacing_size:]
+
+    copy = restore(version_1)
+    assert copy.pacing == DEFAULT_PACING
+    assert copy.phase == game.phase
+    assert snapshot.encode(copy)[header_size + pacing_size:] == data[header_size + pacing_size:]
+
+
+def test_damaged_snapshots_are_refused():
+    game, clock, events = responding_game("ann", "bob", "cat")
+    game.play_round()
+    data = snapshot.encode(game)
+
+    with pytest.raises(SnapshotError, match="not a game snapshot"):
+        restore(b"XSNP" + data[4:])
+    with pytest.raises(SnapshotError, match="too short"):
+        restore(data[:10])
+    with pytest.raises(SnapshotError, match="trailing"):
+        restore(data + b"\0")
+    for length in range(snapshot._HEADER.size, len(data), 7):
+        with pytest.raises(SnapshotError):
+            restore(data[:length])
+
+
+def test_restore_takes_back_audience_votes_on_the_open_prompt():
+    game, clock, events = responding_game("ann", "bob", "cat")
+    game.play_round()
+    clock.advance(game.pacing.voting_start_pause)
+    seat = game.add_audience_member()
+    game.receive_audience_vote(seat, game.voting_prompt.id, 1)
+
+    copy = restored(game)
+    assert copy.phase == GamePhase.VOTING
+    prompt = copy.prompts[copy.phase_index]
+    assert list(prompt.audience_votes) == [0, 0]
+    prompt.receive_audience_vote(seat, 0)
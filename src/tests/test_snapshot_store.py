@@ -0,0 +1,16 @@
+from quip_server.snapshot_store import SnapshotStore
+
+
+def test_snapshots_are_written_on_the_writer_thread(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    store.save("g1", b"first")
+    store.save("g1", b"latest")
+    store.save("g2", b"gone")
+    store.delete("g2")
+    store.save(None, b"shared")
+    assert list(store.load_all()) == []
+
+    store.start()
+    store.stop()
+    assert sorted(store.load_all(), key=str) == [("g1", b"latest"), (None, b"shared")]
+    assert not [path for path in tmp_path.iterdir() if path.suffix == ".tmp"]
@@ -0,0 +1,98 @@
+import signal
+import socket
+import struct
+import threading
+import time
+
+import pytest
+from websockets.sync.client import connect
+
+from quip_server import supervisor
+from quip_server.connections import WsWireGameListener
+from quip_server.supervisor import HandoffSocket
+
+
+@pytest.fixture
+def channel():
+    """ The supervisor's end of a worker's channel, and the worker's HandoffSocket. """
+    parent, child = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+    handoff = HandoffSocket(child)
+    yield parent, handoff
+    parent.close()
+    handoff.close()
+
+
+@pytest.fixture
+def server_socket():
+    listener = socket.create_server(("127.0.0.1", 0))
+    yield listener
+    listener.close()
+
+
+def reset_connection(listener: socket.socket) -> socket.socket:
+    """ The server's side of a connection whose client reset it. """
+    client = socket.create_connection(listener.getsockname())
+    connection, _ = listener.accept()
+    client.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+    client.close()
+    time.sleep(0.05)
+    return connection
+
+
+def hand_over(parent: socket.socket, connection: socket.socket):
+    socket.send_fds(parent, [b"c"], [connection.fileno()])
+    connection.close()
+
+
+def test_accept_skips_connection_reset_before_handoff(channel, server_socket):
+    parent, handoff = channel
+    hand_over(parent, reset_connection(server_socket))
+    client = socket.create_connection(server_socket.getsockname())
+    good, _ = server_socket.accept()
+    hand_over(parent, good)
+
+    connection, address = handoff.accept()
+    assert address == client.getsockname()
+    connection.close()
+    client.close()
+
+
+def test_accept_ends_worker_when_supervisor_closes_channel(channel, monkeypatch):
+    parent, handoff = channel
+    signals = []
+    monkeypatch.setattr(supervisor.os, "kill", lambda pid, sig: signals.append(sig))
+    parent.close()
+
+    for _ in range(2):
+        with pytest.raises(ConnectionAbortedError):
+            handoff.accept()
+    assert signals == [signal.SIGINT]
+
+
+def test_listener_keeps_serving_after_client_reset(channel, server_socket):
+    parent, handoff = channel
+    served = threading.Event()
+    listener = WsWireGameListener("127.0.0.1", 0, on_connection=lambda connection: served.set(), sock=handoff)
+    thread = threading.Thread(target=listener._run, daemon=True)
+    thread.start()
+
+    hand_over(parent, reset_connection(server_socket))
+    host, port = server_socket.getsockname()
+    opened = threading.Event()
+
+    def open_game():
+        with connect(f"ws://{host}:{port}/ws/g1", open_timeout=5):
+            opened.set()
+            # Closing right away could race the listener's handler for the socket
+            served.wait(5)
+
+    client = threading.Thread(target=open_game, daemon=True)
+    client.start()
+    connection, _ = server_socket.accept()
+    hand_over(parent, connection)
+    client.join(5)
+
+    assert opened.is_set()
+    assert served.wait(5)
+    listener._server.shutdown()
+    thread.join(5)
@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+from quip_model import codec, wire
+from quip_model.wire import JSON, WIRE_FORMATS
+
+from test_codec import SAMPLE_EVENTS
+
+BINARY_FORMATS = ["msgpack", "cbor"]
+
+
+def binary_format(name: str) -> wire.WireFormat:
+    if name not in WIRE_FORMATS:
+        pytest.skip(f"{name} is not installed")
+    return WIRE_FORMATS[name]
+
+
+def sample_messages() -> list[dict]:
+    """ Every event as sent to clients, with the sequence numbers they carry, and the messages clients send. """
+    messages = [{**codec.encode(event), "seq": seq, "prev": seq - 1} for seq, event in enumerate(SAMPLE_EVENTS, 1)]
+    messages.append({"type": "vote", "content": {"prompt_id": 7, "vote": 1}})
+    messages.append({"type": "sync", "content": {"seq": 12, "session": "8f3a"}, "unknown key": [1, None, 2.5]})
+    return messages
+
+
+def test_json_is_plain_text():
+    for message in sample_messages():
+        payload = JSON.dumps(message)
+        assert isinstance(payload, str)
+        assert json.loads(payload) == message
+        assert JSON.loads(payload) == message
+
+
+@pytest.mark.parametrize("name", BINARY_FORMATS)
+def test_binary_round_trips_match_json(name):
+    wire_format = binary_format(name)
+    assert wire_format.binary
+    for message in sample_messages():
+        payload = wire_format.dumps(message)
+        assert isinstance(payload, bytes)
+        assert wire_format.loads(payload) == JSON.loads(JSON.dumps(message))
+        assert len(payload) < len(JSON.dumps(message).encode())
+
+
+@pytest.mark.parametrize("name", BINARY_FORMATS)
+def test_binary_formats_read_json_from_text_frames(name):
+    wire_format = binary_format(name)
+    message = codec.encode(SAMPLE_EVENTS[0])
+    assert wire_format.loads(JSON.dumps(message)) == message
+
+
+@pytest.mark.parametrize("name", BINARY_FORMATS)
+@pytest.mark.parametrize("payload", [b"\xc1\xff\x00", b"\x01", b""])
+def test_payloads_that_are_not_messages_are_value_errors(name, payload):
+    with pytest.raises(ValueError):
+        binary_format(name).loads(payload)
+
+
+def test_compact_replaces_known_keys_and_events():
+    message = {**codec.encode(SAMPLE_EVENTS[0]), "seq": 4, "extra": "kept"}
+    compacted = wire.compact(message)
+    assert all(type(key) is int for key in compacted if key != "extra")
+    assert compacted["extra"] == "kept"
+    assert type(compacted[wire.WIRE_KEYS.index("event")]) is int
+    assert wire.expand(compacted) == message
+    assert wire.expand(wire.compact({"event": "NotAnEvent"})) == {"event": "NotAnEvent"}
+
+
+def test_requested_format():
+    assert wire.requested_format("/ws/game") is JSON
+    assert wire.requested_format("/ws/game?format=nonsense") is JSON
+    for name, wire_format in WIRE_FORMATS.items():
+        assert wire.requested_format(wire.with_format("ws://host:10020/ws/game", name)) is wire_format
+        assert wire.requested_format(wire.with_format("/ws/game?token=abc", name)) is wire_format
+    assert wire.with_format("/ws/game", None) == "/ws/game"